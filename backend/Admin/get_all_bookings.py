@@ -1,6 +1,7 @@
 import json
 import boto3
 import os
+import re
 from datetime import datetime
 from decimal import Decimal
 from boto3.dynamodb.conditions import Attr
@@ -12,6 +13,16 @@ dynamodb = boto3.resource('dynamodb')
 BOOKING_TABLE = os.environ.get('BOOKING_TABLE_NAME', 'dalscooter-booking-table')
 table = dynamodb.Table(BOOKING_TABLE)
 
+# ?fields= support: attribute names must be plain top-level names
+FIELD_NAME_PATTERN = re.compile(r'^[A-Za-z][A-Za-z0-9_]{0,63}$')
+
+# Fields computed by this handler and the stored attributes they are derived from
+DERIVED_FIELDS = {
+    'status': ['accessCode', 'isUsed'],
+    'startTimeFormatted': ['startTime'],
+    'endTimeFormatted': ['endTime']
+}
+
 def get_cors_headers():
     """Return CORS headers for API responses"""
     return {
@@ -21,6 +32,42 @@ def get_cors_headers():
         'Content-Type': 'application/json'
     }
 
+def parse_fields(query_params):
+    """
+    Parse ?fields=a,b,c. Returns (response_fields, read_fields), or (None, None)
+    when the full items were requested. read_fields also includes whatever the
+    handler needs to sort bookings and compute derived fields.
+    """
+    raw_fields = (query_params or {}).get('fields')
+    if not raw_fields:
+        return None, None
+
+    response_fields = ['bookingId']
+    for field in raw_fields.split(','):
+        field = field.strip()
+        if not field or field in response_fields:
+            continue
+        if not FIELD_NAME_PATTERN.match(field):
+            raise ValueError(f'Invalid field name: {field}')
+        response_fields.append(field)
+
+    read_fields = ['bookingId', 'startTime']
+    for field in response_fields:
+        for source in DERIVED_FIELDS.get(field, [field]):
+            if source not in read_fields:
+                read_fields.append(source)
+    return response_fields, read_fields
+
+def projection_params(read_fields):
+    """Build scan parameters projecting only read_fields"""
+    if not read_fields:
+        return {}
+    names = {f'#p{index}': field for index, field in enumerate(read_fields)}
+    return {
+        'ProjectionExpression': ', '.join(names.keys()),
+        'ExpressionAttributeNames': names
+    }
+
 class DecimalEncoder(json.JSONEncoder):
     """Helper class to encode Decimal objects to JSON"""
     def default(self, o):
@@ -56,17 +103,27 @@ def handler(event, context):
         
         # For now, we'll assume any authorization header means admin access
         # In production, verify the JWT token and check for admin role
+
+        try:
+            response_fields, read_fields = parse_fields(event.get('queryStringParameters'))
+        except ValueError as e:
+            return {
+                'statusCode': 400,
+                'headers': get_cors_headers(),
+                'body': json.dumps({'error': str(e)})
+            }
+        scan_kwargs = projection_params(read_fields)
         
         # Get all bookings from DynamoDB
         table = dynamodb.Table(BOOKING_TABLE)
         
         # Scan all bookings (in production, consider pagination for large datasets)
-        response = table.scan()
+        response = table.scan(**scan_kwargs)
         bookings = response['Items']
         
         # Continue scanning if there are more items
         while 'LastEvaluatedKey' in response:
-            response = table.scan(ExclusiveStartKey=response['LastEvaluatedKey'])
+            response = table.scan(ExclusiveStartKey=response['LastEvaluatedKey'], **scan_kwargs)
             bookings.extend(response['Items'])
         
         # Sort bookings by creation time (newest first)
@@ -103,6 +160,12 @@ def handler(event, context):
                 except:
                     enhanced_booking['endTimeFormatted'] = enhanced_booking['endTime']
             
+            if response_fields:
+                enhanced_booking = {
+                    field: enhanced_booking[field]
+                    for field in response_fields if field in enhanced_booking
+                }
+            
             enhanced_bookings.append(enhanced_booking)
         
         return {
@@ -1,6 +1,9 @@
 import json
 import boto3
 import os
+import time
+import hashlib
+import math
 from decimal import Decimal
 
 # AWS clients
@@ -8,16 +11,47 @@ dynamodb = boto3.resource('dynamodb')
 
 # Environment variables
 BIKES_TABLE = os.environ['BIKES_TABLE_NAME']
+CACHE_TTL_SECONDS = int(os.environ.get('AVAILABILITY_CACHE_TTL_SECONDS', '30'))
+COUNTERS_TABLE = os.environ.get('BIKE_COUNTERS_TABLE_NAME')
 
-# Initialize DynamoDB table
+# Initialize DynamoDB tables
 bikes_table = dynamodb.Table(BIKES_TABLE)
+counters_table = dynamodb.Table(COUNTERS_TABLE) if COUNTERS_TABLE else None
+
+VALID_BIKE_TYPES = ['Gyroscooter', 'eBikes', 'Segway']
+
+# Attributes the public endpoint may return (?fields= picks a subset).
+# accessCode and the geohash index attributes are never exposed.
+PUBLIC_BIKE_FIELDS = [
+    'bikeId', 'bikeType', 'hourlyRate', 'status', 'franchiseId',
+    'features', 'location', 'createdAt', 'updatedAt', 'isActive'
+]
+
+# Nearby search settings (geoCell-geohash-index)
+GEOHASH_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOCELL_PRECISION = 5
+MAX_SEARCH_PRECISION = 7
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE_LAT = 111.32
+DEFAULT_RADIUS_KM = 1.0
+MAX_RADIUS_KM = 10.0
+DEFAULT_NEARBY_LIMIT = 10
+MAX_NEARBY_LIMIT = 50
+
+# Materialized counters maintained by bike_availability_counters
+COUNTER_BUCKETS = ['available', 'rented', 'maintenance', 'out_of_service', 'inactive']
+
+# Warm-instance snapshot cache: (bikeType, location, fields) -> {'body', 'etag', 'expiresAt'}
+MAX_CACHE_ENTRIES = 64
+_availability_cache = {}
 
 def get_cors_headers():
     """Return CORS headers for API responses"""
     return {
         'Access-Control-Allow-Origin': '*',
-        'Access-Control-Allow-Headers': 'Content-Type,Authorization',
-        'Access-Control-Allow-Methods': 'GET,OPTIONS'
+        'Access-Control-Allow-Headers': 'Content-Type,Authorization,If-None-Match',
+        'Access-Control-Allow-Methods': 'GET,OPTIONS',
+        'Access-Control-Expose-Headers': 'ETag'
     }
 
 def decimal_default(obj):
@@ -26,11 +60,393 @@ def decimal_default(obj):
         return float(obj)
     raise TypeError
 
+def get_request_header(event, name):
+    """Case-insensitive lookup of a request header"""
+    headers = event.get('headers') or {}
+    name = name.lower()
+    for key, value in headers.items():
+        if key.lower() == name:
+            return value
+    return None
+
+def parse_fields(query_params):
+    """Return the public fields requested via ?fields= (all public fields by default)"""
+    raw_fields = query_params.get('fields')
+    if not raw_fields:
+        return tuple(PUBLIC_BIKE_FIELDS)
+    fields = ['bikeId']
+    for field in raw_fields.split(','):
+        field = field.strip()
+        if not field or field in fields:
+            continue
+        if field not in PUBLIC_BIKE_FIELDS:
+            raise ValueError(f'Unknown field: {field}. Allowed fields: {", ".join(PUBLIC_BIKE_FIELDS)}')
+        fields.append(field)
+    return tuple(fields)
+
+def apply_projection(query_kwargs, fields):
+    """Add a ProjectionExpression for the given fields to query parameters"""
+    names = query_kwargs.setdefault('ExpressionAttributeNames', {})
+    placeholders = []
+    for index, field in enumerate(fields):
+        placeholder = f'#p{index}'
+        names[placeholder] = field
+        placeholders.append(placeholder)
+    query_kwargs['ProjectionExpression'] = ', '.join(placeholders)
+    return query_kwargs
+
+def trim_bike(bike, fields):
+    """Drop attributes that were only read for server-side filtering"""
+    return {field: bike[field] for field in fields if field in bike}
+
+def load_bikes(bike_type, read_fields):
+    """
+    Read every active, available bike, following LastEvaluatedKey across pages.
+    A bikeType filter is served from bikeType-index; otherwise status-index
+    narrows the read to available bikes. Only read_fields are fetched.
+    """
+    if bike_type:
+        query_kwargs = {
+            'IndexName': 'bikeType-index',
+            'KeyConditionExpression': 'bikeType = :bikeType',
+            'FilterExpression': '#status = :status AND isActive = :isActive',
+            'ExpressionAttributeNames': {'#status': 'status'},
+            'ExpressionAttributeValues': {
+                ':bikeType': bike_type,
+                ':status': 'available',
+                ':isActive': True
+            }
+        }
+    else:
+        query_kwargs = {
+            'IndexName': 'status-index',
+            'KeyConditionExpression': '#status = :status',
+            'FilterExpression': 'isActive = :isActive',
+            'ExpressionAttributeNames': {'#status': 'status'},
+            'ExpressionAttributeValues': {
+                ':status': 'available',
+                ':isActive': True
+            }
+        }
+
+    apply_projection(query_kwargs, read_fields)
+
+    bikes = []
+    while True:
+        response = bikes_table.query(**query_kwargs)
+        bikes.extend(response.get('Items', []))
+        last_key = response.get('LastEvaluatedKey')
+        if not last_key:
+            return bikes
+        query_kwargs['ExclusiveStartKey'] = last_key
+
+def matches_location(bike, location):
+    """Case-insensitive match of the location filter against the bike's address"""
+    address = (bike.get('location') or {}).get('address') or ''
+    return location in address.lower()
+
+def build_snapshot(bike_type, location, fields):
+    """Serialize the availability payload once and fingerprint it for the ETag"""
+    read_fields = list(fields)
+    for extra in ('location', 'updatedAt'):
+        if extra not in read_fields:
+            read_fields.append(extra)
+
+    bikes = load_bikes(bike_type, read_fields)
+    if location:
+        bikes = [bike for bike in bikes if matches_location(bike, location)]
+    last_updated = bikes[0].get('updatedAt') if bikes else None
+    body = json.dumps({
+        'success': True,
+        'bikes': [trim_bike(bike, fields) for bike in bikes],
+        'totalBikes': len(bikes),
+        'lastUpdated': last_updated
+    }, default=decimal_default)
+    etag = '"' + hashlib.sha256(body.encode('utf-8')).hexdigest()[:32] + '"'
+    return {
+        'body': body,
+        'etag': etag,
+        'expiresAt': time.time() + CACHE_TTL_SECONDS
+    }
+
+def get_snapshot(bike_type, location, fields):
+    """Return a cached snapshot, rebuilding it from DynamoDB once the TTL has passed"""
+    cache_key = (bike_type or '', location or '', fields)
+    now = time.time()
+    snapshot = _availability_cache.get(cache_key)
+    if snapshot and snapshot['expiresAt'] > now:
+        return snapshot
+
+    # Location is free text, so keep the number of cached variants bounded
+    if len(_availability_cache) >= MAX_CACHE_ENTRIES:
+        for key in [k for k, v in _availability_cache.items() if v['expiresAt'] <= now]:
+            del _availability_cache[key]
+        while len(_availability_cache) >= MAX_CACHE_ENTRIES:
+            del _availability_cache[next(iter(_availability_cache))]
+
+    snapshot = build_snapshot(bike_type, location, fields)
+    _availability_cache[cache_key] = snapshot
+    return snapshot
+
+def encode_geohash(latitude, longitude, precision):
+    """Encode a latitude/longitude pair as a base32 geohash string"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    geohash = []
+    bits = 0
+    bit_count = 0
+    even_bit = True
+
+    while len(geohash) < precision:
+        if even_bit:
+            mid = (lon_range[0] + lon_range[1]) / 2
+            if longitude >= mid:
+                bits = (bits << 1) | 1
+                lon_range[0] = mid
+            else:
+                bits = bits << 1
+                lon_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if latitude >= mid:
+                bits = (bits << 1) | 1
+                lat_range[0] = mid
+            else:
+                bits = bits << 1
+                lat_range[1] = mid
+        even_bit = not even_bit
+        bit_count += 1
+
+        if bit_count == 5:
+            geohash.append(GEOHASH_BASE32[bits])
+            bits = 0
+            bit_count = 0
+
+    return ''.join(geohash)
+
+def geohash_cell_size(precision):
+    """Return (lat_degrees, lon_degrees) covered by one geohash cell"""
+    total_bits = precision * 5
+    lon_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lon_bits)
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance between two points in kilometres"""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+def covering_cells(latitude, longitude, radius_km):
+    """
+    Return the geohash prefixes whose cells cover the search circle's bounding box.
+    Picks the finest precision whose cells are at least radius_km across, so a
+    small radius is usually covered by the centre cell and its neighbours.
+    """
+    lat_delta = radius_km / KM_PER_DEGREE_LAT
+    lon_delta = radius_km / (KM_PER_DEGREE_LAT * max(math.cos(math.radians(latitude)), 0.01))
+
+    precision = GEOCELL_PRECISION
+    for candidate in range(MAX_SEARCH_PRECISION, GEOCELL_PRECISION, -1):
+        cell_lat, cell_lon = geohash_cell_size(candidate)
+        if cell_lat >= lat_delta and cell_lon >= lon_delta:
+            precision = candidate
+            break
+
+    cell_lat, cell_lon = geohash_cell_size(precision)
+    min_lat, max_lat = max(latitude - lat_delta, -90.0), min(latitude + lat_delta, 90.0)
+    min_lon, max_lon = longitude - lon_delta, longitude + lon_delta
+
+    lat_steps = [min_lat + i * cell_lat for i in range(int((max_lat - min_lat) / cell_lat) + 1)] + [max_lat]
+    lon_steps = [min_lon + i * cell_lon for i in range(int((max_lon - min_lon) / cell_lon) + 1)] + [max_lon]
+
+    cells = set()
+    for lat in lat_steps:
+        for lon in lon_steps:
+            # Wrap longitude across the antimeridian
+            wrapped_lon = ((lon + 180.0) % 360.0) - 180.0
+            cells.add(encode_geohash(lat, wrapped_lon, precision))
+    return sorted(cells)
+
+def load_bikes_in_cell(prefix, read_fields):
+    """Query active, available bikes whose geohash starts with the given prefix"""
+    query_kwargs = {
+        'IndexName': 'geoCell-geohash-index',
+        'KeyConditionExpression': 'geoCell = :geoCell',
+        'FilterExpression': '#status = :status AND isActive = :isActive',
+        'ExpressionAttributeNames': {'#status': 'status'},
+        'ExpressionAttributeValues': {
+            ':geoCell': prefix[:GEOCELL_PRECISION],
+            ':status': 'available',
+            ':isActive': True
+        }
+    }
+    if len(prefix) > GEOCELL_PRECISION:
+        query_kwargs['KeyConditionExpression'] += ' AND begins_with(geohash, :prefix)'
+        query_kwargs['ExpressionAttributeValues'][':prefix'] = prefix
+    apply_projection(query_kwargs, read_fields)
+
+    bikes = []
+    while True:
+        response = bikes_table.query(**query_kwargs)
+        bikes.extend(response.get('Items', []))
+        last_key = response.get('LastEvaluatedKey')
+        if not last_key:
+            return bikes
+        query_kwargs['ExclusiveStartKey'] = last_key
+
+def parse_nearby_params(query_params):
+    """Validate nearby-search query parameters (raises ValueError on bad input)"""
+    try:
+        latitude = float(query_params['latitude'])
+        longitude = float(query_params['longitude'])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError('latitude and longitude are required numeric parameters')
+    if not (-90.0 <= latitude <= 90.0) or not (-180.0 <= longitude <= 180.0):
+        raise ValueError('latitude/longitude out of range')
+
+    try:
+        radius_km = float(query_params.get('radiusKm') or DEFAULT_RADIUS_KM)
+        limit = int(query_params.get('limit') or DEFAULT_NEARBY_LIMIT)
+    except (TypeError, ValueError):
+        raise ValueError('radiusKm and limit must be numeric')
+    if radius_km <= 0 or radius_km > MAX_RADIUS_KM:
+        raise ValueError(f'radiusKm must be between 0 and {MAX_RADIUS_KM}')
+    if limit < 1:
+        raise ValueError('limit must be greater than 0')
+
+    return latitude, longitude, radius_km, min(limit, MAX_NEARBY_LIMIT)
+
+def handle_nearby_bikes(event):
+    """
+    Return the nearest available bikes within radiusKm of (latitude, longitude).
+    Only the geohash cells covering the search area are queried.
+    """
+    query_params = event.get('queryStringParameters') or {}
+    try:
+        latitude, longitude, radius_km, limit = parse_nearby_params(query_params)
+        fields = parse_fields(query_params)
+    except ValueError as e:
+        return {
+            'statusCode': 400,
+            'headers': get_cors_headers(),
+            'body': json.dumps({
+                'success': False,
+                'message': str(e)
+            })
+        }
+
+    read_fields = list(fields) + (['location'] if 'location' not in fields else [])
+
+    candidates = {}
+    for prefix in covering_cells(latitude, longitude, radius_km):
+        for bike in load_bikes_in_cell(prefix, read_fields):
+            candidates[bike['bikeId']] = bike
+
+    nearby = []
+    for bike in candidates.values():
+        location = bike.get('location') or {}
+        distance = haversine_km(latitude, longitude,
+                                float(location['latitude']), float(location['longitude']))
+        if distance <= radius_km:
+            bike = trim_bike(bike, fields)
+            bike['distanceKm'] = round(distance, 3)
+            nearby.append(bike)
+
+    nearby.sort(key=lambda bike: bike['distanceKm'])
+    nearby = nearby[:limit]
+
+    return {
+        'statusCode': 200,
+        'headers': get_cors_headers(),
+        'body': json.dumps({
+            'success': True,
+            'bikes': nearby,
+            'count': len(nearby),
+            'radiusKm': radius_km
+        }, default=decimal_default)
+    }
+
+def format_counter(counter_id, item):
+    """Normalize a counter row, defaulting missing buckets to zero"""
+    franchise_id, bike_type = counter_id.split('#', 1)
+    item = item or {}
+    counts = {bucket: int(item.get(bucket, 0)) for bucket in COUNTER_BUCKETS}
+    return {
+        'franchiseId': franchise_id,
+        'bikeType': bike_type,
+        'counts': counts,
+        'total': sum(counts.values()),
+        'updatedAt': item.get('updatedAt')
+    }
+
+def handle_availability_summary(event):
+    """
+    Return materialized availability counters.
+    With bikeType: one get_item. Without: the franchise total plus a
+    per-type breakdown in a single batch_get_item.
+    """
+    if counters_table is None:
+        return {
+            'statusCode': 503,
+            'headers': get_cors_headers(),
+            'body': json.dumps({
+                'success': False,
+                'message': 'Availability counters are not configured'
+            })
+        }
+
+    query_params = event.get('queryStringParameters') or {}
+    franchise_id = query_params.get('franchiseId') or 'ALL'
+    bike_type = query_params.get('bikeType')
+
+    if bike_type and bike_type not in VALID_BIKE_TYPES:
+        return {
+            'statusCode': 400,
+            'headers': get_cors_headers(),
+            'body': json.dumps({
+                'success': False,
+                'message': f'Invalid bike type. Must be one of: {", ".join(VALID_BIKE_TYPES)}'
+            })
+        }
+
+    if bike_type:
+        counter_id = f'{franchise_id}#{bike_type}'
+        response = counters_table.get_item(Key={'counterId': counter_id})
+        body = {
+            'success': True,
+            'summary': format_counter(counter_id, response.get('Item'))
+        }
+    else:
+        counter_ids = [f'{franchise_id}#ALL'] + [f'{franchise_id}#{t}' for t in VALID_BIKE_TYPES]
+        items = {}
+        request_items = {COUNTERS_TABLE: {'Keys': [{'counterId': c} for c in counter_ids]}}
+        while request_items:
+            response = dynamodb.batch_get_item(RequestItems=request_items)
+            for item in response.get('Responses', {}).get(COUNTERS_TABLE, []):
+                items[item['counterId']] = item
+            request_items = response.get('UnprocessedKeys') or None
+        body = {
+            'success': True,
+            'summary': format_counter(counter_ids[0], items.get(counter_ids[0])),
+            'byBikeType': [format_counter(c, items.get(c)) for c in counter_ids[1:]]
+        }
+
+    return {
+        'statusCode': 200,
+        'headers': get_cors_headers(),
+        'body': json.dumps(body, default=decimal_default)
+    }
+
 def lambda_handler(event, context):
     """
     Public endpoint for bike availability display
-    Shows available bikes without requiring authentication
-    Supports filtering by bike type and location
+    Shows active, available bikes without requiring authentication
+    Supports filtering by bike type (bikeType-index) and location (address match)
+    and trimming the payload with ?fields=
+    Responses are cached per warm instance and carry an ETag;
+    a matching If-None-Match returns 304 with no body.
     """
     print(f"Event: {json.dumps(event, indent=2)}")
     
@@ -43,25 +459,59 @@ def lambda_handler(event, context):
         }
     
     try:
+        resource = event.get('resource', '')
+        if resource.endswith('/nearby'):
+            return handle_nearby_bikes(event)
+        if resource.endswith('/summary'):
+            return handle_availability_summary(event)
+
         # Get query parameters
         query_params = event.get('queryStringParameters') or {}
         bike_type = query_params.get('bikeType')
-        location = query_params.get('location')
-        
-        # Get all bikes from the table
-        response = bikes_table.scan()
+        location = (query_params.get('location') or '').strip().lower()
+
+        try:
+            fields = parse_fields(query_params)
+        except ValueError as e:
+            return {
+                'statusCode': 400,
+                'headers': get_cors_headers(),
+                'body': json.dumps({
+                    'success': False,
+                    'message': str(e)
+                })
+            }
+
+        if bike_type and bike_type not in VALID_BIKE_TYPES:
+            return {
+                'statusCode': 400,
+                'headers': get_cors_headers(),
+                'body': json.dumps({
+                    'success': False,
+                    'message': f'Invalid bike type. Must be one of: {", ".join(VALID_BIKE_TYPES)}'
+                })
+            }
         
-        bikes = response.get('Items', [])
+        snapshot = get_snapshot(bike_type, location, fields)
+
+        headers = get_cors_headers()
+        headers['ETag'] = snapshot['etag']
+        headers['Cache-Control'] = f'public, max-age={CACHE_TTL_SECONDS}'
+
+        if_none_match = get_request_header(event, 'If-None-Match') or ''
+        # Compare weakly: proxies may add a W/ prefix when they compress the body
+        client_etags = [tag.strip().replace('W/', '', 1) for tag in if_none_match.split(',')]
+        if snapshot['etag'] in client_etags or '*' in client_etags:
+            return {
+                'statusCode': 304,
+                'headers': headers,
+                'body': ''
+            }
         
         return {
             'statusCode': 200,
-            'headers': get_cors_headers(),
-            'body': json.dumps({
-                'success': True,
-                'bikes': bikes,
-                'totalBikes': len(bikes),
-                'lastUpdated': bikes[0]['updatedAt'] if bikes else None
-            }, default=decimal_default)
+            'headers': headers,
+            'body': snapshot['body']
         }
         
     except Exception as e:
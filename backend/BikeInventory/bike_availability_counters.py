@@ -0,0 +1,217 @@
+"""
+Bike Availability Counter Aggregator
+====================================
+Consumes the bikes table DynamoDB stream and keeps materialized counters
+(available / rented / maintenance / ...) per franchiseId x bikeType, so
+summary widgets can read fleet availability with a single get_item.
+
+Each bike contributes to four counter rows:
+    {franchiseId}#{bikeType}, {franchiseId}#ALL, ALL#{bikeType}, ALL#ALL
+
+Each stream record's counter changes are applied in one transaction, and a
+failure reports that record's sequence number (ReportBatchItemFailures), so
+Lambda retries from the failed record without re-adding the ones before it.
+The transaction's ClientRequestToken is the record's eventID, so a whole
+batch replayed within DynamoDB's 10-minute idempotency window (e.g. after a
+timeout) is not applied twice either.
+
+Invoke with {"action": "rebuild"} to recompute every counter from a full
+scan. It must be run:
+  * once after deployment (the stream starts at LATEST), and
+  * whenever a batch lands in the stream failure queue (retries exhausted;
+    the skipped records were never counted), or a batch was replayed more
+    than 10 minutes after a timeout / crash - both show up as drift.
+"""
+import json
+import boto3
+import os
+from collections import defaultdict
+from datetime import datetime
+
+# AWS clients
+dynamodb = boto3.resource('dynamodb')
+
+# Environment variables
+BIKES_TABLE = os.environ['BIKES_TABLE_NAME']
+COUNTERS_TABLE = os.environ['BIKE_COUNTERS_TABLE_NAME']
+
+# Initialize DynamoDB tables
+bikes_table = dynamodb.Table(BIKES_TABLE)
+counters_table = dynamodb.Table(COUNTERS_TABLE)
+
+# Buckets a bike can be counted in. Inactive bikes (e.g. currently booked)
+# are counted separately regardless of their status.
+COUNTER_BUCKETS = ['available', 'rented', 'maintenance', 'out_of_service', 'inactive']
+ALL = 'ALL'
+
+def counter_keys(franchise_id, bike_type):
+    """Return the counter rows a bike contributes to"""
+    return [
+        f'{franchise_id}#{bike_type}',
+        f'{franchise_id}#{ALL}',
+        f'{ALL}#{bike_type}',
+        f'{ALL}#{ALL}'
+    ]
+
+def classify(franchise_id, bike_type, status, is_active):
+    """Return (franchiseId, bikeType, bucket) for a bike, or None if it cannot be counted"""
+    if not bike_type:
+        return None
+    bucket = status if is_active else 'inactive'
+    if bucket not in COUNTER_BUCKETS:
+        return None
+    return franchise_id or 'default', bike_type, bucket
+
+def classify_image(image):
+    """Classify a bike from a DynamoDB stream image (typed attribute values)"""
+    if not image:
+        return None
+    return classify(
+        image.get('franchiseId', {}).get('S'),
+        image.get('bikeType', {}).get('S'),
+        image.get('status', {}).get('S'),
+        image.get('isActive', {}).get('BOOL', False)
+    )
+
+def classify_item(item):
+    """Classify a bike from a deserialized table item"""
+    return classify(
+        item.get('franchiseId'),
+        item.get('bikeType'),
+        item.get('status'),
+        bool(item.get('isActive', False))
+    )
+
+def collect_deltas(records):
+    """Fold stream records into net counter deltas: {counterId: {bucket: delta}}"""
+    deltas = defaultdict(lambda: defaultdict(int))
+    for record in records:
+        if record.get('eventSource') != 'aws:dynamodb':
+            continue
+        old = classify_image(record['dynamodb'].get('OldImage'))
+        new = classify_image(record['dynamodb'].get('NewImage'))
+        if old == new:
+            continue
+        if old:
+            for counter_id in counter_keys(old[0], old[1]):
+                deltas[counter_id][old[2]] -= 1
+        if new:
+            for counter_id in counter_keys(new[0], new[1]):
+                deltas[counter_id][new[2]] += 1
+    return deltas
+
+def apply_deltas(deltas, updated_at, request_token=None):
+    """
+    Apply net deltas with one ADD update per counter row, all in a single
+    transaction so the change is applied completely or not at all
+    """
+    transact_items = []
+    for counter_id, bucket_deltas in deltas.items():
+        changes = {bucket: delta for bucket, delta in bucket_deltas.items() if delta}
+        if not changes:
+            continue
+
+        franchise_id, bike_type = counter_id.split('#', 1)
+        add_parts = []
+        expression_names = {}
+        expression_values = {
+            ':franchiseId': franchise_id,
+            ':bikeType': bike_type,
+            ':updatedAt': updated_at
+        }
+        for bucket, delta in changes.items():
+            add_parts.append(f'#{bucket} :{bucket}')
+            expression_names[f'#{bucket}'] = bucket
+            expression_values[f':{bucket}'] = delta
+
+        transact_items.append({'Update': {
+            'TableName': COUNTERS_TABLE,
+            'Key': {'counterId': counter_id},
+            'UpdateExpression': (
+                'SET franchiseId = :franchiseId, bikeType = :bikeType, updatedAt = :updatedAt '
+                'ADD ' + ', '.join(add_parts)
+            ),
+            'ExpressionAttributeNames': expression_names,
+            'ExpressionAttributeValues': expression_values
+        }})
+
+    if not transact_items:
+        return 0
+    transact_kwargs = {'TransactItems': transact_items}
+    if request_token:
+        transact_kwargs['ClientRequestToken'] = request_token
+    dynamodb.meta.client.transact_write_items(**transact_kwargs)
+    return len(transact_items)
+
+def apply_record(record):
+    """Apply one stream record's counter changes; returns how many counter rows changed"""
+    stream_data = record.get('dynamodb', {})
+    created_at = stream_data.get('ApproximateCreationDateTime')
+    if created_at is None:
+        # No stable timestamp: the request would differ on replay, so skip the token
+        return apply_deltas(collect_deltas([record]), datetime.utcnow().isoformat())
+    # A replayed transaction must carry identical parameters for the token to match
+    updated_at = datetime.utcfromtimestamp(float(created_at)).isoformat()
+    return apply_deltas(collect_deltas([record]), updated_at, record.get('eventID'))
+
+def rebuild_counters():
+    """Recompute every counter from a full scan of the bikes table"""
+    totals = defaultdict(lambda: defaultdict(int))
+    scan_kwargs = {
+        'ProjectionExpression': 'franchiseId, bikeType, #status, isActive',
+        'ExpressionAttributeNames': {'#status': 'status'}
+    }
+    while True:
+        response = bikes_table.scan(**scan_kwargs)
+        for item in response.get('Items', []):
+            classified = classify_item(item)
+            if not classified:
+                continue
+            for counter_id in counter_keys(classified[0], classified[1]):
+                totals[counter_id][classified[2]] += 1
+        last_key = response.get('LastEvaluatedKey')
+        if not last_key:
+            break
+        scan_kwargs['ExclusiveStartKey'] = last_key
+
+    now = datetime.utcnow().isoformat()
+    with counters_table.batch_writer() as batch:
+        for counter_id, buckets in totals.items():
+            franchise_id, bike_type = counter_id.split('#', 1)
+            item = {
+                'counterId': counter_id,
+                'franchiseId': franchise_id,
+                'bikeType': bike_type,
+                'updatedAt': now
+            }
+            for bucket in COUNTER_BUCKETS:
+                item[bucket] = buckets.get(bucket, 0)
+            batch.put_item(Item=item)
+    return len(totals)
+
+def lambda_handler(event, context):
+    """Apply bikes-table stream changes to the availability counters"""
+    if event.get('action') == 'rebuild':
+        rebuilt = rebuild_counters()
+        print(f"Rebuilt {rebuilt} availability counters")
+        return {
+            'statusCode': 200,
+            'body': json.dumps({'rebuiltCounters': rebuilt})
+        }
+
+    records = event.get('Records', [])
+    print(f"Processing {len(records)} bike stream records")
+
+    updated = 0
+    for index, record in enumerate(records):
+        try:
+            updated += apply_record(record)
+        except Exception as e:
+            # Stream records are ordered: report the first failure so Lambda
+            # retries from it, leaving the records before it applied once
+            sequence_number = record['dynamodb']['SequenceNumber']
+            print(f"Failed to apply record {sequence_number} ({index + 1}/{len(records)}): {str(e)}")
+            return {'batchItemFailures': [{'itemIdentifier': sequence_number}]}
+
+    print(f"Applied {len(records)} records, {updated} counter updates")
+    return {'batchItemFailures': []}
@@ -4,10 +4,13 @@ import os
 import uuid
 import secrets
 import base64
+import re
+import time
 import traceback
 from datetime import datetime, timedelta
 from decimal import Decimal
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
 # Configure logging - disabled for debugging
 # logger = logging.getLogger()
@@ -28,6 +31,39 @@ bikes_table = dynamodb.Table(BIKES_TABLE)
 discount_codes_table = dynamodb.Table(DISCOUNT_CODES_TABLE)
 user_discount_usage_table = dynamodb.Table(USER_DISCOUNT_USAGE_TABLE)
 
+VALID_BIKE_TYPES = ['Gyroscooter', 'eBikes', 'Segway']
+
+# Pagination limits for the bike listing
+MAX_PAGE_SIZE = 200
+
+# Attribute names accepted in ?fields= (top-level attributes only)
+FIELD_NAME_PATTERN = re.compile(r'^[A-Za-z][A-Za-z0-9_]{0,63}$')
+
+# Bulk import limits (each row is a conditional put_item, retried when throttled)
+MAX_BULK_ROWS = 1000
+BULK_WRITE_WORKERS = 10
+BATCH_WRITE_MAX_RETRIES = 5
+BATCH_WRITE_BASE_DELAY = 0.05
+THROTTLE_ERROR_CODES = ('ProvisionedThroughputExceededException', 'ThrottlingException', 'RequestLimitExceeded')
+
+# Batch delete limits
+MAX_BATCH_DELETE = 100
+BATCH_DELETE_WORKERS = 10
+
+# Filterable attributes and their GSIs, most selective first.
+# When several filters are combined the first one present drives the query.
+BIKE_FILTER_INDEXES = [
+    ('franchiseId', 'franchiseId-index'),
+    ('status', 'status-index'),
+    ('bikeType', 'bikeType-index'),
+]
+
+# Geohash settings for the spatial index (geoCell-geohash-index).
+# geoCell is the coarse partition key; geohash is the full-precision sort key.
+GEOHASH_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 9
+GEOCELL_PRECISION = 5
+
 def get_cors_headers():
     """Return CORS headers for API responses"""
     return {
@@ -78,6 +114,96 @@ def verify_franchise_user(event):
     except Exception as e:
         return False, f"Authentication error: {str(e)}"
 
+def encode_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    """Encode a latitude/longitude pair as a base32 geohash string"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    geohash = []
+    bits = 0
+    bit_count = 0
+    even_bit = True
+
+    while len(geohash) < precision:
+        if even_bit:
+            mid = (lon_range[0] + lon_range[1]) / 2
+            if longitude >= mid:
+                bits = (bits << 1) | 1
+                lon_range[0] = mid
+            else:
+                bits = bits << 1
+                lon_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if latitude >= mid:
+                bits = (bits << 1) | 1
+                lat_range[0] = mid
+            else:
+                bits = bits << 1
+                lat_range[1] = mid
+        even_bit = not even_bit
+        bit_count += 1
+
+        if bit_count == 5:
+            geohash.append(GEOHASH_BASE32[bits])
+            bits = 0
+            bit_count = 0
+
+    return ''.join(geohash)
+
+def geo_index_attributes(location):
+    """Return the geohash/geoCell attributes for a bike location map"""
+    geohash = encode_geohash(float(location['latitude']), float(location['longitude']))
+    return {
+        'geohash': geohash,
+        'geoCell': geohash[:GEOCELL_PRECISION]
+    }
+
+def backfill_geo_index():
+    """
+    Add geohash/geoCell to bikes created before the spatial index existed, so
+    they show up in nearby search. Invoke once with {"action": "backfill_geo"}.
+    Each update is conditional on the coordinates it was computed from, so a
+    concurrent location edit (which sets its own geohash) is never overwritten.
+    """
+    updated = 0
+    scan_kwargs = {
+        'FilterExpression': 'attribute_exists(#location.latitude) AND attribute_exists(#location.longitude) '
+                            'AND attribute_not_exists(geohash)',
+        'ProjectionExpression': 'bikeId, #location',
+        'ExpressionAttributeNames': {'#location': 'location'}
+    }
+    client = bikes_table.meta.client
+    while True:
+        response = bikes_table.scan(**scan_kwargs)
+        for bike in response.get('Items', []):
+            location = bike['location']
+            try:
+                geo_attributes = geo_index_attributes(location)
+            except (ArithmeticError, ValueError, TypeError) as e:
+                print(f"Skipping bike {bike['bikeId']} with invalid location: {str(e)}")
+                continue
+            try:
+                bikes_table.update_item(
+                    Key={'bikeId': bike['bikeId']},
+                    UpdateExpression='SET geohash = :geohash, geoCell = :geoCell',
+                    ConditionExpression='attribute_not_exists(geohash) AND '
+                                        '#location.latitude = :latitude AND #location.longitude = :longitude',
+                    ExpressionAttributeNames={'#location': 'location'},
+                    ExpressionAttributeValues={
+                        ':geohash': geo_attributes['geohash'],
+                        ':geoCell': geo_attributes['geoCell'],
+                        ':latitude': location['latitude'],
+                        ':longitude': location['longitude']
+                    }
+                )
+                updated += 1
+            except client.exceptions.ConditionalCheckFailedException:
+                print(f"Bike {bike['bikeId']} changed during backfill, skipped")
+        last_key = response.get('LastEvaluatedKey')
+        if not last_key:
+            return updated
+        scan_kwargs['ExclusiveStartKey'] = last_key
+
 def decimal_default(obj):
     """JSON serializer for objects not serializable by default json code"""
     if isinstance(obj, Decimal):
@@ -88,8 +214,19 @@ def lambda_handler(event, context):
     """
     Main handler for bike inventory management operations
     Supports: GET (list bikes), POST (add bike), PUT (update bike), DELETE (remove bike)
+    Bulk: POST /bikes/bulk (import), DELETE /bikes with {"bikeIds": [...]} (retire)
+    Maintenance: {"action": "backfill_geo"} adds the spatial index keys to older bikes
     """
     print(f"Event: {json.dumps(event, indent=2)}")
+
+    # One-off maintenance action, invoked directly rather than through API Gateway
+    if event.get('action') == 'backfill_geo':
+        updated = backfill_geo_index()
+        print(f"Backfilled geohash on {updated} bikes")
+        return {
+            'statusCode': 200,
+            'body': json.dumps({'backfilled': updated})
+        }
     
     # Handle CORS preflight
     if event['httpMethod'] == 'OPTIONS':
@@ -119,10 +256,14 @@ def lambda_handler(event, context):
         if method == 'GET':
             return handle_get_bikes(event)
         elif method == 'POST':
+            if event.get('resource', '').endswith('/bulk'):
+                return handle_bulk_import(event)
             return handle_add_bike(event)
         elif method == 'PUT':
             return handle_update_bike(event)
         elif method == 'DELETE':
+            if not (event.get('pathParameters') or {}).get('bikeId'):
+                return handle_batch_delete_bikes(event)
             return handle_delete_bike(event)
         else:
             return {
@@ -147,97 +288,209 @@ def lambda_handler(event, context):
             })
         }
 
+# Cursor scope when the listing scans the base table instead of a GSI
+TABLE_SCAN_CURSOR_SCOPE = 'table'
+
+def encode_cursor(last_evaluated_key, index_name=None):
+    """
+    Encode a DynamoDB LastEvaluatedKey as an opaque, URL-safe cursor, tagged
+    with the index it came from so it cannot be replayed against another one
+    """
+    if not last_evaluated_key:
+        return None
+    payload = {'index': index_name or TABLE_SCAN_CURSOR_SCOPE, 'key': last_evaluated_key}
+    raw = json.dumps(payload, default=decimal_default, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('utf-8').rstrip('=')
+
+def decode_cursor(cursor, index_name=None):
+    """
+    Decode an opaque cursor back into an ExclusiveStartKey (raises ValueError
+    if malformed or issued for a different index / filter combination)
+    """
+    if not cursor:
+        return None
+    try:
+        # Add padding if needed
+        padding = len(cursor) % 4
+        if padding:
+            cursor += '=' * (4 - padding)
+        payload = json.loads(base64.urlsafe_b64decode(cursor).decode('utf-8'))
+    except Exception:
+        raise ValueError('Invalid pagination cursor')
+    if not isinstance(payload, dict) or not isinstance(payload.get('key'), dict) or 'bikeId' not in payload['key']:
+        raise ValueError('Invalid pagination cursor')
+    if payload.get('index') != (index_name or TABLE_SCAN_CURSOR_SCOPE):
+        raise ValueError('Pagination cursor does not match the requested filters')
+    return payload['key']
+
+def parse_page_size(query_params):
+    """Return the requested page size, or None when the caller wants every page"""
+    limit = query_params.get('limit')
+    if limit in (None, ''):
+        return None
+    try:
+        page_size = int(limit)
+    except (ValueError, TypeError):
+        raise ValueError('limit must be an integer')
+    if page_size < 1:
+        raise ValueError('limit must be greater than 0')
+    return min(page_size, MAX_PAGE_SIZE)
+
+def parse_fields(query_params, required_fields):
+    """
+    Parse a comma-separated ?fields= list. Returns None when no projection was
+    requested; otherwise the requested names plus the required ones.
+    """
+    raw_fields = query_params.get('fields')
+    if not raw_fields:
+        return None
+    fields = []
+    for field in raw_fields.split(','):
+        field = field.strip()
+        if not field:
+            continue
+        if not FIELD_NAME_PATTERN.match(field):
+            raise ValueError(f'Invalid field name: {field}')
+        if field not in fields:
+            fields.append(field)
+    for field in required_fields:
+        if field not in fields:
+            fields.append(field)
+    return fields
+
+def apply_projection(params, fields):
+    """Add a ProjectionExpression for the given fields to query/scan parameters"""
+    if not fields:
+        return params
+    names = params.setdefault('ExpressionAttributeNames', {})
+    placeholders = []
+    for index, field in enumerate(fields):
+        placeholder = f'#p{index}'
+        names[placeholder] = field
+        placeholders.append(placeholder)
+    params['ProjectionExpression'] = ', '.join(placeholders)
+    return params
+
+def build_bike_list_request(filters, include_inactive):
+    """
+    Build query/scan parameters for the bike listing.
+    The most selective filter is served from its GSI; the remaining
+    filters (and the isActive check) become a FilterExpression.
+    """
+    params = {}
+    names = {}
+    values = {}
+    filter_parts = []
+
+    key_attr = None
+    for attr, index_name in BIKE_FILTER_INDEXES:
+        if filters.get(attr):
+            key_attr = attr
+            params['IndexName'] = index_name
+            params['KeyConditionExpression'] = f'#{attr} = :{attr}'
+            break
+
+    for attr, _ in BIKE_FILTER_INDEXES:
+        if not filters.get(attr):
+            continue
+        names[f'#{attr}'] = attr
+        values[f':{attr}'] = filters[attr]
+        if attr != key_attr:
+            filter_parts.append(f'#{attr} = :{attr}')
+
+    if not include_inactive:
+        filter_parts.append('isActive = :isActive')
+        values[':isActive'] = True
+
+    if filter_parts:
+        params['FilterExpression'] = ' AND '.join(filter_parts)
+    if names:
+        params['ExpressionAttributeNames'] = names
+    if values:
+        params['ExpressionAttributeValues'] = values
+
+    operation = bikes_table.query if key_attr else bikes_table.scan
+    return operation, params
+
 def handle_get_bikes(event):
-    """Handle GET request to list bikes"""
+    """
+    Handle GET request to list bikes.
+    Filters (bikeType, status, franchiseId) can be combined. When `limit` is
+    given a single page is returned along with `nextCursor`; otherwise every
+    page is followed so the result is never truncated at 1 MB.
+    `fields` (comma-separated) limits the attributes read and returned.
+    """
     try:
         # Get query parameters
         query_params = event.get('queryStringParameters') or {}
-        bike_type = query_params.get('bikeType')
-        status = query_params.get('status')
-        franchise_id = query_params.get('franchiseId')
+        filters = {attr: query_params.get(attr) for attr, _ in BIKE_FILTER_INDEXES}
         include_inactive = query_params.get('includeInactive', 'false').lower() == 'true'
-        
-        # Build query based on parameters with optional active filter
-        if bike_type:
-            if include_inactive:
-                response = bikes_table.query(
-                    IndexName='bikeType-index',
-                    KeyConditionExpression='bikeType = :bikeType',
-                    ExpressionAttributeValues={
-                        ':bikeType': bike_type
-                    }
-                )
-            else:
-                response = bikes_table.query(
-                    IndexName='bikeType-index',
-                    KeyConditionExpression='bikeType = :bikeType',
-                    FilterExpression='isActive = :isActive',
-                    ExpressionAttributeValues={
-                        ':bikeType': bike_type,
-                        ':isActive': True
-                    }
-                )
-        elif status:
-            if include_inactive:
-                response = bikes_table.query(
-                    IndexName='status-index',
-                    KeyConditionExpression='#status = :status',
-                    ExpressionAttributeNames={'#status': 'status'},
-                    ExpressionAttributeValues={
-                        ':status': status
-                    }
-                )
-            else:
-                response = bikes_table.query(
-                    IndexName='status-index',
-                    KeyConditionExpression='#status = :status',
-                    FilterExpression='isActive = :isActive',
-                    ExpressionAttributeNames={'#status': 'status'},
-                    ExpressionAttributeValues={
-                        ':status': status,
-                        ':isActive': True
-                    }
-                )
-        elif franchise_id:
-            if include_inactive:
-                response = bikes_table.query(
-                    IndexName='franchiseId-index',
-                    KeyConditionExpression='franchiseId = :franchiseId',
-                    ExpressionAttributeValues={
-                        ':franchiseId': franchise_id
-                    }
-                )
-            else:
-                response = bikes_table.query(
-                    IndexName='franchiseId-index',
-                    KeyConditionExpression='franchiseId = :franchiseId',
-                    FilterExpression='isActive = :isActive',
-                    ExpressionAttributeValues={
-                        ':franchiseId': franchise_id,
-                        ':isActive': True
+
+        operation, params = build_bike_list_request(filters, include_inactive)
+        index_name = params.get('IndexName')
+
+        try:
+            page_size = parse_page_size(query_params)
+            start_key = decode_cursor(query_params.get('cursor'), index_name)
+            fields = parse_fields(query_params, ['bikeId'])
+        except ValueError as e:
+            return {
+                'statusCode': 400,
+                'headers': get_cors_headers(),
+                'body': json.dumps({
+                    'success': False,
+                    'message': str(e)
+                })
+            }
+
+        apply_projection(params, fields)
+
+        # Keep reading until the page is full or the table/index is exhausted.
+        # Limit is shrunk on every call so LastEvaluatedKey always points at
+        # the last item we returned and the cursor never skips bikes.
+        bikes = []
+        while True:
+            if start_key:
+                params['ExclusiveStartKey'] = start_key
+            if page_size:
+                params['Limit'] = page_size - len(bikes)
+
+            try:
+                response = operation(**params)
+            except bikes_table.meta.client.exceptions.ClientError as e:
+                # A well-formed cursor whose key DynamoDB still rejects (e.g. a
+                # key that does not fit the index) is the caller's error
+                if 'ExclusiveStartKey' in params and not bikes \
+                        and e.response.get('Error', {}).get('Code') == 'ValidationException':
+                    return {
+                        'statusCode': 400,
+                        'headers': get_cors_headers(),
+                        'body': json.dumps({
+                            'success': False,
+                            'message': 'Invalid pagination cursor'
+                        })
                     }
-                )
-        else:
-            if include_inactive:
-                response = bikes_table.scan()
-            else:
-                response = bikes_table.scan(
-                    FilterExpression='isActive = :isActive',
-                    ExpressionAttributeValues={':isActive': True}
-                )
-        
-        bikes = response.get('Items', [])
-        
+                raise
+            bikes.extend(response.get('Items', []))
+            start_key = response.get('LastEvaluatedKey')
+
+            if not start_key or (page_size and len(bikes) >= page_size):
+                break
+
+        next_cursor = encode_cursor(start_key, index_name)
+
         return {
             'statusCode': 200,
             'headers': get_cors_headers(),
             'body': json.dumps({
                 'success': True,
                 'bikes': bikes,
-                'count': len(bikes)
+                'count': len(bikes),
+                'nextCursor': next_cursor,
+                'hasMore': next_cursor is not None
             }, default=decimal_default)
         }
-        
+
     except Exception as e:
         print(f"Error getting bikes: {str(e)}")
         return {
@@ -249,39 +502,49 @@ def handle_get_bikes(event):
             })
         }
 
-def handle_add_bike(event):
-    """Handle POST request to add a new bike"""
-    try:
-        body = json.loads(event['body'])
-        
-        # Validate required fields
-        required_fields = ['bikeType', 'accessCode', 'hourlyRate']
-        for field in required_fields:
-            if not body.get(field):
-                return {
-                    'statusCode': 400,
-                    'headers': get_cors_headers(),
-                    'body': json.dumps({
-                        'success': False,
-                        'message': f'Missing required field: {field}'
-                    })
-                }
-        
-        # Validate bike type
-        valid_bike_types = ['Gyroscooter', 'eBikes', 'Segway']
-        if body['bikeType'] not in valid_bike_types:
-            return {
-                'statusCode': 400,
-                'headers': get_cors_headers(),
-                'body': json.dumps({
-                    'success': False,
-                    'message': f'Invalid bike type. Must be one of: {", ".join(valid_bike_types)}'
-                })
-            }
-        
-        # Generate unique bike ID
+def nested_map_updates(map_updates, replace_parents=False):
+    """
+    Build SET parts, names and values for map attributes updated key by key
+    ({attribute: {key: value}}). Keys are set in place by document path, so
+    concurrent edits to other keys survive; with replace_parents each map is
+    SET whole instead (for items where the attribute is missing or not a map).
+    """
+    parts, names, values = [], {}, {}
+    for attribute, updates in map_updates.items():
+        names[f'#{attribute}'] = attribute
+        if replace_parents:
+            parts.append(f'#{attribute} = :{attribute}')
+            values[f':{attribute}'] = updates
+            continue
+        for key, value in updates.items():
+            parts.append(f'#{attribute}.#{attribute}_{key} = :{attribute}_{key}')
+            names[f'#{attribute}_{key}'] = key
+            values[f':{attribute}_{key}'] = value
+    return parts, names, values
+
+def build_bike_item(body, bike_id=None):
+    """
+    Validate a bike payload and build the DynamoDB item.
+    Returns (bike_item, None) on success or (None, error_message) on failure.
+    """
+    if not isinstance(body, dict):
+        return None, 'Bike must be a JSON object'
+
+    # Validate required fields
+    required_fields = ['bikeType', 'accessCode', 'hourlyRate']
+    for field in required_fields:
+        if not body.get(field):
+            return None, f'Missing required field: {field}'
+
+    # Validate bike type
+    if body['bikeType'] not in VALID_BIKE_TYPES:
+        return None, f'Invalid bike type. Must be one of: {", ".join(VALID_BIKE_TYPES)}'
+
+    # Generate unique bike ID
+    if not bike_id:
         bike_id = f"{body['bikeType'][:3].upper()}-{str(uuid.uuid4())[:8].upper()}"
-        
+
+    try:
         # Create bike item
         bike_item = {
             'bikeId': bike_id,
@@ -303,8 +566,30 @@ def handle_add_bike(event):
             },
             'createdAt': datetime.utcnow().isoformat(),
             'updatedAt': datetime.utcnow().isoformat(),
-            'isActive': True
+            'isActive': True,
+            'version': 1
         }
+        bike_item.update(geo_index_attributes(bike_item['location']))
+    except (ArithmeticError, ValueError, TypeError):
+        return None, 'Invalid numeric value for hourlyRate, features or location'
+
+    return bike_item, None
+
+def handle_add_bike(event):
+    """Handle POST request to add a new bike"""
+    try:
+        body = json.loads(event['body'])
+
+        bike_item, error = build_bike_item(body)
+        if error:
+            return {
+                'statusCode': 400,
+                'headers': get_cors_headers(),
+                'body': json.dumps({
+                    'success': False,
+                    'message': error
+                })
+            }
         
         # Save to DynamoDB
         bikes_table.put_item(Item=bike_item)
@@ -339,8 +624,230 @@ def handle_add_bike(event):
             })
         }
 
+def parse_bulk_body(raw_body):
+    """
+    Parse a bulk request body: a JSON array, {"bikes": [...]}, or NDJSON.
+    Returns a list of (row, parse_error) tuples, one per input row.
+    """
+    raw_body = raw_body or ''
+    try:
+        parsed = json.loads(raw_body)
+        if isinstance(parsed, dict) and isinstance(parsed.get('bikes'), list):
+            parsed = parsed['bikes']
+        if isinstance(parsed, list):
+            return [(row, None) for row in parsed]
+        return [(parsed, None)]
+    except json.JSONDecodeError:
+        pass
+
+    # Fall back to NDJSON: one bike per non-empty line
+    rows = []
+    for line in raw_body.splitlines():
+        if not line.strip():
+            continue
+        try:
+            rows.append((json.loads(line), None))
+        except json.JSONDecodeError as e:
+            rows.append((None, f'Invalid JSON: {str(e)}'))
+    return rows
+
+def fetch_existing_bikes(bike_ids):
+    """batch_get_item the given bike IDs (100 per request) and return {bikeId: item}"""
+    existing = {}
+    bike_ids = list(bike_ids)
+    for start in range(0, len(bike_ids), 100):
+        request_items = {BIKES_TABLE: {
+            'Keys': [{'bikeId': bike_id} for bike_id in bike_ids[start:start + 100]],
+            'ProjectionExpression': 'bikeId, createdAt, #status, isActive, #version',
+            'ExpressionAttributeNames': {'#status': 'status', '#version': 'version'}
+        }}
+        while request_items:
+            response = dynamodb.batch_get_item(RequestItems=request_items)
+            for item in response.get('Responses', {}).get(BIKES_TABLE, []):
+                existing[item['bikeId']] = item
+            request_items = response.get('UnprocessedKeys') or None
+    return existing
+
+def put_bike_conditionally(bike_item, current):
+    """
+    Write one imported bike. A create must not find an existing bike and an
+    update must find the bike still at the version it was read at, so a
+    concurrent edit is never silently overwritten. Throttled writes are
+    retried with exponential backoff. Returns 'written', 'conflict' or 'throttled'.
+    """
+    client = bikes_table.meta.client
+    if current is None:
+        condition = {'ConditionExpression': 'attribute_not_exists(bikeId)'}
+    elif 'version' in current:
+        condition = {
+            'ConditionExpression': '#version = :readVersion',
+            'ExpressionAttributeNames': {'#version': 'version'},
+            'ExpressionAttributeValues': {':readVersion': current['version']}
+        }
+    else:
+        condition = {
+            'ConditionExpression': 'attribute_exists(bikeId) AND attribute_not_exists(#version)',
+            'ExpressionAttributeNames': {'#version': 'version'}
+        }
+
+    for attempt in range(BATCH_WRITE_MAX_RETRIES + 1):
+        if attempt:
+            time.sleep(min(BATCH_WRITE_BASE_DELAY * (2 ** attempt), 2))
+        try:
+            bikes_table.put_item(Item=bike_item, **condition)
+            return 'written'
+        except client.exceptions.ConditionalCheckFailedException:
+            return 'conflict'
+        except client.exceptions.ClientError as e:
+            if e.response.get('Error', {}).get('Code') not in THROTTLE_ERROR_CODES:
+                raise
+    return 'throttled'
+
+def handle_bulk_import(event):
+    """
+    Handle POST /bikes/bulk: create or replace many bikes in one call.
+    Rows without bikeId are created; rows with bikeId replace that bike while
+    keeping its createdAt, status and isActive (and bumping its version). Every row is validated first,
+    then valid rows are written with conditional puts: a row whose bike was
+    created or changed by someone else since it was read gets a 409 result
+    instead of overwriting that change. A result is returned per input row.
+    """
+    try:
+        rows = parse_bulk_body(event.get('body'))
+        if not rows:
+            return {
+                'statusCode': 400,
+                'headers': get_cors_headers(),
+                'body': json.dumps({
+                    'success': False,
+                    'message': 'Request body must contain at least one bike'
+                })
+            }
+        if len(rows) > MAX_BULK_ROWS:
+            return {
+                'statusCode': 400,
+                'headers': get_cors_headers(),
+                'body': json.dumps({
+                    'success': False,
+                    'message': f'Too many bikes in one request (max {MAX_BULK_ROWS})'
+                })
+            }
+
+        # Validate every row in one pass before writing anything
+        results = []
+        bike_items = []
+        seen_ids = set()
+        for index, (row, parse_error) in enumerate(rows):
+            bike_id = row.get('bikeId') if isinstance(row, dict) else None
+            if parse_error:
+                bike_item, error = None, parse_error
+            elif bike_id is not None and (not isinstance(bike_id, str) or not bike_id.strip()):
+                bike_item, error = None, 'bikeId must be a non-empty string'
+            else:
+                bike_item, error = build_bike_item(row, bike_id)
+            if bike_item and bike_item['bikeId'] in seen_ids:
+                bike_item, error = None, f"Duplicate bikeId in request: {bike_item['bikeId']}"
+            if error:
+                results.append({'row': index, 'success': False, 'message': error})
+                continue
+            seen_ids.add(bike_item['bikeId'])
+            results.append({'row': index, 'success': True, 'bikeId': bike_item['bikeId']})
+            bike_items.append(bike_item)
+
+        # Rows that name an existing bike are updates: keep lifecycle fields
+        update_ids = [row['bikeId'] for row, _ in rows if isinstance(row, dict) and row.get('bikeId')]
+        existing = fetch_existing_bikes(set(update_ids) & seen_ids) if update_ids else {}
+        for bike_item in bike_items:
+            current = existing.get(bike_item['bikeId'])
+            if current:
+                bike_item['createdAt'] = current.get('createdAt', bike_item['createdAt'])
+                bike_item['status'] = current.get('status', bike_item['status'])
+                bike_item['isActive'] = current.get('isActive', bike_item['isActive'])
+                bike_item['version'] = int(current.get('version', 0)) + 1
+
+        outcomes = {}
+        if bike_items:
+            with ThreadPoolExecutor(max_workers=BULK_WRITE_WORKERS) as executor:
+                written = executor.map(
+                    lambda bike_item: put_bike_conditionally(bike_item, existing.get(bike_item['bikeId'])),
+                    bike_items
+                )
+                outcomes = dict(zip((bike_item['bikeId'] for bike_item in bike_items), written))
+
+        for result in results:
+            if result['success']:
+                outcome = outcomes[result['bikeId']]
+                if outcome == 'conflict':
+                    result['success'] = False
+                    result['statusCode'] = 409
+                    result['message'] = (
+                        'Bike was modified concurrently; re-read it and retry this row'
+                        if result['bikeId'] in existing else
+                        'Bike was created concurrently; retry this row as an update'
+                    )
+                elif outcome == 'throttled':
+                    result['success'] = False
+                    result['message'] = 'Write was throttled; retry this row'
+                else:
+                    result['action'] = 'updated' if result['bikeId'] in existing else 'created'
+
+        succeeded = sum(1 for result in results if result['success'])
+        failed = len(results) - succeeded
+
+        return {
+            'statusCode': 200 if failed == 0 else (207 if succeeded else 400),
+            'headers': get_cors_headers(),
+            'body': json.dumps({
+                'success': failed == 0,
+                'message': f'{succeeded} bikes written, {failed} failed',
+                'succeeded': succeeded,
+                'failed': failed,
+                'results': results
+            }, default=decimal_default)
+        }
+
+    except Exception as e:
+        print(f"Error in bulk bike import: {str(e)}")
+        print(f"Traceback: {traceback.format_exc()}")
+        return {
+            'statusCode': 500,
+            'headers': get_cors_headers(),
+            'body': json.dumps({
+                'success': False,
+                'message': f'Error importing bikes: {str(e)}'
+            })
+        }
+
+def parse_expected_version(event, body):
+    """
+    Return the bike version the caller expects to overwrite, or None.
+    Taken from the body's `version` field or an If-Match header.
+    Raises ValueError if it is not a non-negative integer.
+    """
+    expected = body.get('version')
+    if expected is None:
+        headers = event.get('headers') or {}
+        expected = headers.get('If-Match') or headers.get('if-match')
+        if expected is not None:
+            expected = str(expected).strip().strip('"')
+    if expected is None:
+        return None
+    try:
+        expected = int(expected)
+    except (ValueError, TypeError):
+        raise ValueError('version must be an integer')
+    if expected < 0:
+        raise ValueError('version must be an integer')
+    return expected
+
 def handle_update_bike(event):
-    """Handle PUT request to update bike information"""
+    """
+    Handle PUT request to update bike information.
+    Performs a single conditional update_item: the bike must exist and, when
+    the caller sends `version` (or If-Match), still be at that version.
+    Nested features/location fields are updated in place by document path,
+    so concurrent edits to other fields are never overwritten.
+    """
     try:
         # Get bike ID from path parameters
         path_params = event.get('pathParameters') or {}
@@ -372,39 +879,33 @@ def handle_update_bike(event):
                     'message': f'Invalid JSON in request body: {str(e)}'
                 })
             }
-        
-        # Check if bike exists and is active before updating
-        try:
-            existing_bike_response = bikes_table.get_item(Key={'bikeId': bike_id})
-            print(f"DynamoDB get_item response: {existing_bike_response}")
-        except Exception as e:
-            print(f"Error fetching bike from DynamoDB: {str(e)}")
+
+        if not isinstance(body, dict):
             return {
-                'statusCode': 500,
+                'statusCode': 400,
                 'headers': get_cors_headers(),
                 'body': json.dumps({
                     'success': False,
-                    'message': f'Database error: {str(e)}'
+                    'message': 'Request body must be a JSON object'
                 })
             }
-            
-        if 'Item' not in existing_bike_response:
+
+        try:
+            expected_version = parse_expected_version(event, body)
+        except ValueError as e:
             return {
-                'statusCode': 404,
+                'statusCode': 400,
                 'headers': get_cors_headers(),
                 'body': json.dumps({
                     'success': False,
-                    'message': 'Bike not found'
+                    'message': str(e)
                 })
             }
-            
-        existing_bike = existing_bike_response['Item']
-        # Allow updating inactive bikes for admin operations
-        # Removed the isActive check to allow admins to reactivate bikes
         
         # Build update expression step by step
         update_parts = []
         expression_values = {}
+        expression_attribute_names = {'#version': 'version'}
         
         # Always update the timestamp
         update_parts.append("updatedAt = :updatedAt")
@@ -461,6 +962,7 @@ def handle_update_bike(event):
                     })
                 }
             update_parts.append("#status = :status")
+            expression_attribute_names['#status'] = 'status'
             expression_values[':status'] = body['status']
                 
         # Handle explicit isActive updates
@@ -468,26 +970,32 @@ def handle_update_bike(event):
             update_parts.append("isActive = :isActive")
             expression_values[':isActive'] = bool(body['isActive'])
             
+        # Nested map fields are collected here and turned into SET parts below
+        map_updates = {}
+
         if 'features' in body:
+            features_data = body['features']
+            if not isinstance(features_data, dict):
+                return {
+                    'statusCode': 400,
+                    'headers': get_cors_headers(),
+                    'body': json.dumps({
+                        'success': False,
+                        'message': 'features must be an object'
+                    })
+                }
             try:
-                features_data = body['features']
-                if isinstance(features_data, dict):
-                    features = {}
-                    # Handle each feature field
-                    if 'heightAdjustment' in features_data:
-                        features['heightAdjustment'] = bool(features_data['heightAdjustment'])
-                    if 'batteryLife' in features_data:
-                        features['batteryLife'] = Decimal(str(features_data['batteryLife']))
-                    if 'maxSpeed' in features_data:
-                        features['maxSpeed'] = Decimal(str(features_data['maxSpeed']))
-                    if 'weight' in features_data:
-                        features['weight'] = Decimal(str(features_data['weight']))
-                else:
-                    features = features_data
-                    
-                update_parts.append("features = :features")
-                expression_values[':features'] = features
-            except (ValueError, TypeError) as e:
+                # Update each provided feature in place
+                feature_values = {}
+                if 'heightAdjustment' in features_data:
+                    feature_values['heightAdjustment'] = bool(features_data['heightAdjustment'])
+                if 'batteryLife' in features_data:
+                    feature_values['batteryLife'] = Decimal(str(features_data['batteryLife']))
+                if 'maxSpeed' in features_data:
+                    feature_values['maxSpeed'] = Decimal(str(features_data['maxSpeed']))
+                if 'weight' in features_data:
+                    feature_values['weight'] = Decimal(str(features_data['weight']))
+            except (ArithmeticError, ValueError, TypeError) as e:
                 return {
                     'statusCode': 400,
                     'headers': get_cors_headers(),
@@ -496,39 +1004,55 @@ def handle_update_bike(event):
                         'message': f'Invalid features data: {str(e)}'
                     })
                 }
+            if not feature_values:
+                return {
+                    'statusCode': 400,
+                    'headers': get_cors_headers(),
+                    'body': json.dumps({
+                        'success': False,
+                        'message': 'features must include heightAdjustment, batteryLife, maxSpeed or weight'
+                    })
+                }
+            map_updates['features'] = feature_values
                 
         if 'location' in body:
+            location_data = body['location']
+            if not isinstance(location_data, dict):
+                return {
+                    'statusCode': 400,
+                    'headers': get_cors_headers(),
+                    'body': json.dumps({
+                        'success': False,
+                        'message': 'location must be an object'
+                    })
+                }
+            has_latitude = 'latitude' in location_data
+            has_longitude = 'longitude' in location_data
+            # The geohash needs both coordinates, so they move together
+            if has_latitude != has_longitude:
+                return {
+                    'statusCode': 400,
+                    'headers': get_cors_headers(),
+                    'body': json.dumps({
+                        'success': False,
+                        'message': 'latitude and longitude must be updated together'
+                    })
+                }
             try:
-                location_data = body['location']
-                if isinstance(location_data, dict):
-                    location = {}
-                    
-                    # Start with existing location data
-                    existing_location = existing_bike.get('location', {})
-                    if existing_location:
-                        location.update(existing_location)
-                    
-                    # Update with new data
-                    if 'address' in location_data:
-                        location['address'] = str(location_data['address'])
-                    if 'latitude' in location_data:
-                        location['latitude'] = Decimal(str(location_data['latitude']))
-                    if 'longitude' in location_data:
-                        location['longitude'] = Decimal(str(location_data['longitude']))
-                        
-                    # Ensure we have required fields
-                    if 'latitude' not in location:
-                        location['latitude'] = Decimal('44.6360')  # Default Halifax latitude
-                    if 'longitude' not in location:
-                        location['longitude'] = Decimal('-63.5909')  # Default Halifax longitude
-                    if 'address' not in location:
-                        location['address'] = 'Dalhousie University, Halifax, NS'
-                else:
-                    location = location_data
-                    
-                update_parts.append("#location = :location")
-                expression_values[':location'] = location
-            except (ValueError, TypeError) as e:
+                location_values = {}
+                if 'address' in location_data:
+                    location_values['address'] = str(location_data['address'])
+                if has_latitude:
+                    location_values['latitude'] = Decimal(str(location_data['latitude']))
+                    location_values['longitude'] = Decimal(str(location_data['longitude']))
+
+                    # Keep the spatial index in step with the new coordinates
+                    geo_attributes = geo_index_attributes(location_values)
+                    update_parts.append("geohash = :geohash")
+                    update_parts.append("geoCell = :geoCell")
+                    expression_values[':geohash'] = geo_attributes['geohash']
+                    expression_values[':geoCell'] = geo_attributes['geoCell']
+            except (ArithmeticError, ValueError, TypeError) as e:
                 return {
                     'statusCode': 400,
                     'headers': get_cors_headers(),
@@ -537,9 +1061,19 @@ def handle_update_bike(event):
                         'message': f'Invalid location data: {str(e)}'
                     })
                 }
+            if not location_values:
+                return {
+                    'statusCode': 400,
+                    'headers': get_cors_headers(),
+                    'body': json.dumps({
+                        'success': False,
+                        'message': 'location must include address or latitude/longitude'
+                    })
+                }
+            map_updates['location'] = location_values
         
         # Validate that we have something to update besides timestamp
-        if len(update_parts) == 1:  # Only updatedAt
+        if len(update_parts) == 1 and not map_updates:  # Only updatedAt
             return {
                 'statusCode': 400,
                 'headers': get_cors_headers(),
@@ -548,35 +1082,84 @@ def handle_update_bike(event):
                     'message': 'No valid fields provided for update'
                 })
             }
+
+        # Every write bumps the version so concurrent editors can detect it
+        update_parts.append("#version = if_not_exists(#version, :zero) + :one")
+        expression_values[':zero'] = 0
+        expression_values[':one'] = 1
+
+        # Bike must exist; in optimistic mode it must also be unchanged.
+        # Bikes created before versioning have no version and count as 0.
+        condition_expression = 'attribute_exists(bikeId)'
+        if expected_version is not None:
+            if expected_version == 0:
+                condition_expression += ' AND attribute_not_exists(#version)'
+            else:
+                condition_expression += ' AND #version = :expectedVersion'
+                expression_values[':expectedVersion'] = expected_version
         
-        # Build the final update expression
-        update_expression = "SET " + ", ".join(update_parts)
-        
-        # Handle reserved keywords
-        expression_attribute_names = {}
-        if '#status' in update_expression:
-            expression_attribute_names['#status'] = 'status'
-        if '#location' in update_expression:
-            expression_attribute_names['#location'] = 'location'
-        
-        print(f"Update expression: {update_expression}")
-        print(f"Expression values: {json.dumps(expression_values, default=str)}")
-        print(f"Expression attribute names: {expression_attribute_names}")
-        
-        # Update the bike in DynamoDB
+        # Update the bike in DynamoDB. Map fields are first set in place by
+        # document path; if the stored attribute is missing or not a map that
+        # path is invalid, so retry once replacing those maps outright.
+        client = bikes_table.meta.client
+        replace_parents = False
         try:
-            update_params = {
-                'Key': {'bikeId': bike_id},
-                'UpdateExpression': update_expression,
-                'ExpressionAttributeValues': expression_values,
-                'ReturnValues': 'ALL_NEW'
-            }
-            
-            if expression_attribute_names:
-                update_params['ExpressionAttributeNames'] = expression_attribute_names
-                
-            response = bikes_table.update_item(**update_params)
+            while True:
+                map_parts, map_names, map_values = nested_map_updates(map_updates, replace_parents)
+                update_expression = "SET " + ", ".join(update_parts + map_parts)
+                attempt_condition = condition_expression
+                if replace_parents:
+                    # Never replace a map another request created meanwhile
+                    attempt_condition += ''.join(
+                        f' AND (attribute_not_exists(#{attribute}) OR NOT attribute_type(#{attribute}, :mapType))'
+                        for attribute in map_updates
+                    )
+                    map_values[':mapType'] = 'M'
+
+                print(f"Update expression: {update_expression}")
+                print(f"Condition expression: {attempt_condition}")
+                try:
+                    response = bikes_table.update_item(
+                        Key={'bikeId': bike_id},
+                        UpdateExpression=update_expression,
+                        ConditionExpression=attempt_condition,
+                        ExpressionAttributeNames=dict(expression_attribute_names, **map_names),
+                        ExpressionAttributeValues=dict(expression_values, **map_values),
+                        ReturnValues='ALL_NEW',
+                        ReturnValuesOnConditionCheckFailure='ALL_OLD'
+                    )
+                    break
+                except client.exceptions.ConditionalCheckFailedException:
+                    raise
+                except client.exceptions.ClientError as e:
+                    if replace_parents or not map_updates or \
+                            e.response.get('Error', {}).get('Code') != 'ValidationException':
+                        raise
+                    print(f"Nested map update rejected ({str(e)}), replacing the maps")
+                    replace_parents = True
             print(f"DynamoDB update successful")
+
+        except bikes_table.meta.client.exceptions.ConditionalCheckFailedException as condition_error:
+            current = condition_error.response.get('Item')
+            if not current:
+                return {
+                    'statusCode': 404,
+                    'headers': get_cors_headers(),
+                    'body': json.dumps({
+                        'success': False,
+                        'message': 'Bike not found'
+                    })
+                }
+            current_version = int(current.get('version', {}).get('N', 0))
+            return {
+                'statusCode': 409,
+                'headers': get_cors_headers(),
+                'body': json.dumps({
+                    'success': False,
+                    'message': 'Bike was modified by another request. Reload and try again.',
+                    'currentVersion': current_version
+                })
+            }
             
         except Exception as dynamo_error:
             print(f"DynamoDB error: {str(dynamo_error)}")
@@ -612,6 +1195,27 @@ def handle_update_bike(event):
             })
         }
 
+def delete_bike_if_allowed(bike_id):
+    """
+    Delete a bike in one conditional delete_item: it must exist and must not
+    be rented. Returns (status_code, message).
+    """
+    try:
+        bikes_table.meta.client.delete_item(
+            TableName=BIKES_TABLE,
+            Key={'bikeId': bike_id},
+            ConditionExpression='attribute_exists(bikeId) AND #status <> :rented',
+            ExpressionAttributeNames={'#status': 'status'},
+            ExpressionAttributeValues={':rented': 'rented'},
+            ReturnValuesOnConditionCheckFailure='ALL_OLD'
+        )
+        return 200, 'Bike deleted successfully'
+    except bikes_table.meta.client.exceptions.ConditionalCheckFailedException as condition_error:
+        # ALL_OLD tells us which half of the condition failed
+        if not condition_error.response.get('Item'):
+            return 404, 'Bike not found'
+        return 400, 'Cannot delete bike that is currently rented'
+
 def handle_delete_bike(event):
     """Handle DELETE request to remove a bike"""
     try:
@@ -631,51 +1235,108 @@ def handle_delete_bike(event):
                 })
             }
 
-        # Check if bike exists before deleting
-        response = bikes_table.get_item(Key={'bikeId': bike_id})
-        if 'Item' not in response:
+        # Hard delete, guarded by existence and not-rented conditions
+        status_code, message = delete_bike_if_allowed(bike_id)
+        
+        return {
+            'statusCode': status_code,
+            'headers': get_cors_headers(),
+            'body': json.dumps({
+                'success': status_code == 200,
+                'message': message
+            })
+        }
+        
+    except Exception as e:
+        print(f"Error deleting bike: {str(e)}")
+        return {
+            'statusCode': 500,
+            'headers': get_cors_headers(),
+            'body': json.dumps({
+                'success': False,
+                'message': f'Error deleting bike: {str(e)}'
+            })
+        }
+
+def handle_batch_delete_bikes(event):
+    """
+    Handle DELETE /bikes with a {"bikeIds": [...]} body to retire many bikes.
+    Each bike gets its own conditional delete (BatchWriteItem cannot carry
+    conditions); the deletes run concurrently and a result is returned per bike.
+    """
+    try:
+        try:
+            body = json.loads(event.get('body') or '{}')
+        except json.JSONDecodeError:
+            return {
+                'statusCode': 400,
+                'headers': get_cors_headers(),
+                'body': json.dumps({
+                    'success': False,
+                    'message': 'Invalid JSON in request body'
+                })
+            }
+
+        bike_ids = body.get('bikeIds') if isinstance(body, dict) else None
+        if (not isinstance(bike_ids, list) or not bike_ids
+                or not all(isinstance(bike_id, str) and bike_id for bike_id in bike_ids)):
             return {
-                'statusCode': 404,
+                'statusCode': 400,
                 'headers': get_cors_headers(),
                 'body': json.dumps({
                     'success': False,
-                    'message': 'Bike not found'
+                    'message': 'bikeIds must be a non-empty list of bike IDs'
                 })
             }
-            
-        bike = response['Item']
-        print(f"Found bike: {json.dumps(bike, default=str)}")
-        
-        # Check if bike is currently rented/active
-        if bike.get('status') == 'rented':
+        bike_ids = list(dict.fromkeys(bike_ids))
+        if len(bike_ids) > MAX_BATCH_DELETE:
             return {
                 'statusCode': 400,
                 'headers': get_cors_headers(),
                 'body': json.dumps({
                     'success': False,
-                    'message': 'Cannot delete bike that is currently rented'
+                    'message': f'Too many bikes in one request (max {MAX_BATCH_DELETE})'
                 })
             }
-        
-        # Hard delete by removing the item from the database
-        bikes_table.delete_item(Key={'bikeId': bike_id})
-        
+
+        def delete_one(bike_id):
+            try:
+                status_code, message = delete_bike_if_allowed(bike_id)
+            except Exception as e:
+                print(f"Error deleting bike {bike_id}: {str(e)}")
+                status_code, message = 500, f'Error deleting bike: {str(e)}'
+            return {
+                'bikeId': bike_id,
+                'success': status_code == 200,
+                'statusCode': status_code,
+                'message': message
+            }
+
+        with ThreadPoolExecutor(max_workers=BATCH_DELETE_WORKERS) as executor:
+            results = list(executor.map(delete_one, bike_ids))
+
+        deleted = sum(1 for result in results if result['success'])
+        failed = len(results) - deleted
+
         return {
-            'statusCode': 200,
+            'statusCode': 200 if failed == 0 else (207 if deleted else 400),
             'headers': get_cors_headers(),
             'body': json.dumps({
-                'success': True,
-                'message': 'Bike deleted successfully'
+                'success': failed == 0,
+                'message': f'{deleted} bikes deleted, {failed} failed',
+                'deleted': deleted,
+                'failed': failed,
+                'results': results
             })
         }
-        
+
     except Exception as e:
-        print(f"Error deleting bike: {str(e)}")
+        print(f"Error in batch bike delete: {str(e)}")
         return {
             'statusCode': 500,
             'headers': get_cors_headers(),
             'body': json.dumps({
                 'success': False,
-                'message': f'Error deleting bike: {str(e)}'
+                'message': f'Error deleting bikes: {str(e)}'
             })
         }
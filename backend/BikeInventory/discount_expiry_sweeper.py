@@ -0,0 +1,136 @@
+"""
+Discount Code Expiry Sweeper
+============================
+Scheduled Lambda that marks expired discount codes as 'expired', so the
+admin GET path never has to write.
+
+Codes carry an `expiryDate` hour bucket (YYYY-MM-DDTHH) that is the hash key
+of expiryDate-index. Each run queries the buckets from EXPIRY_SWEEP_LOOKBACK_HOURS
+ago up to the current hour, and deactivates the active codes whose
+expiry_date has passed with concurrent conditional updates.
+
+Invoke with {"action": "backfill"} once to add expiryDate to active codes
+created before the bucket attribute existed.
+"""
+import json
+import boto3
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+# AWS clients
+dynamodb = boto3.resource('dynamodb')
+
+# Environment variables
+DISCOUNT_CODES_TABLE = os.environ['DISCOUNT_CODES_TABLE_NAME']
+LOOKBACK_HOURS = int(os.environ.get('EXPIRY_SWEEP_LOOKBACK_HOURS', '72'))
+
+# Initialize DynamoDB table
+discount_codes_table = dynamodb.Table(DISCOUNT_CODES_TABLE)
+
+EXPIRY_BUCKET_FORMAT = '%Y-%m-%dT%H'
+UPDATE_WORKERS = 8
+
+def expiry_bucket(expiry_date):
+    """Return the expiryDate-index bucket for an expiry datetime"""
+    return expiry_date.strftime(EXPIRY_BUCKET_FORMAT)
+
+def find_expired_codes(now):
+    """Query each hour bucket in the lookback window for active, expired codes"""
+    expired = []
+    for hours_ago in range(LOOKBACK_HOURS, -1, -1):
+        query_kwargs = {
+            'IndexName': 'expiryDate-index',
+            'KeyConditionExpression': 'expiryDate = :bucket',
+            'FilterExpression': '#status = :active AND expiry_date <= :now',
+            'ProjectionExpression': 'codeId',
+            'ExpressionAttributeNames': {'#status': 'status'},
+            'ExpressionAttributeValues': {
+                ':bucket': expiry_bucket(now - timedelta(hours=hours_ago)),
+                ':active': 'active',
+                ':now': now.isoformat()
+            }
+        }
+        while True:
+            response = discount_codes_table.query(**query_kwargs)
+            expired.extend(item['codeId'] for item in response.get('Items', []))
+            last_key = response.get('LastEvaluatedKey')
+            if not last_key:
+                break
+            query_kwargs['ExclusiveStartKey'] = last_key
+    return expired
+
+def deactivate_code(code_id, now):
+    """Mark one code expired; skip it if someone changed its status meanwhile"""
+    client = discount_codes_table.meta.client
+    try:
+        client.update_item(
+            TableName=DISCOUNT_CODES_TABLE,
+            Key={'codeId': code_id},
+            UpdateExpression='SET #status = :expired, updatedAt = :now',
+            ConditionExpression='#status = :active',
+            ExpressionAttributeNames={'#status': 'status'},
+            ExpressionAttributeValues={
+                ':expired': 'expired',
+                ':active': 'active',
+                ':now': now.isoformat()
+            }
+        )
+        return True
+    except client.exceptions.ConditionalCheckFailedException:
+        return False
+
+def backfill_expiry_buckets():
+    """Add expiryDate to active codes that predate the bucket attribute"""
+    updated = 0
+    query_kwargs = {
+        'IndexName': 'status-index',
+        'KeyConditionExpression': '#status = :active',
+        'FilterExpression': 'attribute_not_exists(expiryDate)',
+        'ProjectionExpression': 'codeId, expiry_date',
+        'ExpressionAttributeNames': {'#status': 'status'},
+        'ExpressionAttributeValues': {':active': 'active'}
+    }
+    while True:
+        response = discount_codes_table.query(**query_kwargs)
+        for item in response.get('Items', []):
+            discount_codes_table.update_item(
+                Key={'codeId': item['codeId']},
+                UpdateExpression='SET expiryDate = :bucket',
+                ExpressionAttributeValues={
+                    ':bucket': expiry_bucket(datetime.fromisoformat(item['expiry_date']))
+                }
+            )
+            updated += 1
+        last_key = response.get('LastEvaluatedKey')
+        if not last_key:
+            return updated
+        query_kwargs['ExclusiveStartKey'] = last_key
+
+def lambda_handler(event, context):
+    """Deactivate discount codes whose expiry_date has passed"""
+    if (event or {}).get('action') == 'backfill':
+        updated = backfill_expiry_buckets()
+        print(f"Backfilled expiryDate on {updated} discount codes")
+        return {
+            'statusCode': 200,
+            'body': json.dumps({'backfilled': updated})
+        }
+
+    now = datetime.utcnow()
+    expired_ids = find_expired_codes(now)
+    print(f"Found {len(expired_ids)} expired discount codes")
+
+    deactivated = 0
+    if expired_ids:
+        with ThreadPoolExecutor(max_workers=UPDATE_WORKERS) as executor:
+            deactivated = sum(executor.map(lambda code_id: deactivate_code(code_id, now), expired_ids))
+
+    print(f"Deactivated {deactivated} discount codes")
+    return {
+        'statusCode': 200,
+        'body': json.dumps({
+            'expired': len(expired_ids),
+            'deactivated': deactivated
+        })
+    }
@@ -5,6 +5,10 @@ import uuid
 import secrets
 import string
 import base64
+import hashlib
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from decimal import Decimal
 
@@ -19,6 +23,55 @@ USER_DISCOUNT_USAGE_TABLE = os.environ['USER_DISCOUNT_USAGE_TABLE_NAME']
 discount_codes_table = dynamodb.Table(DISCOUNT_CODES_TABLE)
 user_discount_usage_table = dynamodb.Table(USER_DISCOUNT_USAGE_TABLE)
 
+# Hour bucket written to `expiryDate`, the hash key of expiryDate-index that
+# the expiry sweeper queries (see discount_expiry_sweeper.py)
+EXPIRY_BUCKET_FORMAT = '%Y-%m-%dT%H'
+
+# Every code owns a claim item keyed by the code itself ({codeId: 'CODE#XYZ'}).
+# Claims are written with attribute_not_exists in the same transaction as the
+# code, so two codes can never share a value. Claims carry no status or code
+# attribute and therefore stay out of status-index and code-index.
+CODE_CLAIM_PREFIX = 'CODE#'
+CODES_PER_TRANSACTION = 50  # claim + code per entry, TransactWriteItems allows 100 actions
+MAX_CODE_ATTEMPTS = 5
+MAX_CAMPAIGN_CODES = 5000
+CAMPAIGN_WORKERS = 8
+
+# Bloom filter of active code values, stored as a single item and read by
+# verify_discount to reject definite misses without querying code-index.
+# Must use the same hashing as verify_discount.bloom_positions.
+#
+# The filter must never miss a live code, but status-index is eventually
+# consistent, so a rebuild alone can lag behind a write:
+#   * writers record their codes *before* writing them, one recent-write
+#     item per batch ('FILTER#active-codes#recent#<seq>', numbered from the
+#     writeSeq counter on the recent item and expired by TTL), and every
+#     rebuild unions the codes recorded in the last CODE_FILTER_RECENT_SECONDS
+#     into what status-index returns;
+#   * the filter item also carries lastCodeWriteAt, which writers move
+#     forward and rebuilds leave alone. verify_discount caches the item for
+#     DISCOUNT_FILTER_TTL_SECONDS and only trusts a miss when the cached
+#     builtAt is newer than the cached lastCodeWriteAt, so a code created
+#     while an instance holds an older copy can be rejected until it reloads.
+CODE_FILTER_ID = 'FILTER#active-codes'
+CODE_FILTER_RECENT_ID = 'FILTER#active-codes#recent'
+CODE_FILTER_RECENT_SECONDS = 300
+CODE_FILTER_RECENT_TTL_SECONDS = 86400  # recent-write items linger for TTL well past the window
+CODE_FILTER_RECENT_BATCH = 25
+CODE_FILTER_FALSE_POSITIVE_RATE = 0.01
+
+# Usage report limits: codes per report, default window, and number of time buckets
+MAX_REPORT_CODES = 25
+DEFAULT_REPORT_DAYS = 30
+MAX_REPORT_BUCKETS = 1000
+REPORT_BUCKET_WIDTHS = {'hour': timedelta(hours=1), 'day': timedelta(days=1)}
+REPORT_BUCKET_PREFIX = {'hour': 13, 'day': 10}  # usedDate ISO prefix length per bucket
+# BatchGetItem retries for unprocessed keys (throttling)
+BATCH_GET_MAX_RETRIES = 5
+BATCH_GET_BASE_DELAY = 0.05
+# HyperLogLog precision for the cross-code unique user estimate (4096 registers, ~1.6% error)
+HLL_PRECISION = 12
+
 def get_cors_headers():
     """Return CORS headers for API responses"""
     return {
@@ -80,10 +133,400 @@ def generate_discount_code(length=8):
     characters = string.ascii_uppercase + string.digits
     return ''.join(secrets.choice(characters) for _ in range(length))
 
+def validate_code_settings(body):
+    """Validate the settings shared by single and campaign code creation; return an error message or None"""
+    for field in ['discountPercentage', 'expiryHours']:
+        if field not in body:
+            return f'Missing required field: {field}'
+
+    # Validate discount percentage (5% to 15%)
+    if not (5 <= body['discountPercentage'] <= 15):
+        return 'Discount percentage must be between 5% and 15%'
+
+    # Validate expiry hours (0-48 hours, 0-2 days)
+    if not (0 <= body['expiryHours'] <= 48):
+        return 'Expiry time must be between 0 and 48 hours (0-2 days)'
+
+    return None
+
+def build_code_item(body, discount_code, expiry_date, default_usage_limit=100, campaign_id=None):
+    """Build a discount code item from validated request settings"""
+    discount_percentage = body['discountPercentage']
+    now = datetime.utcnow().isoformat()
+    code_item = {
+        'codeId': str(uuid.uuid4()),
+        'code': discount_code,
+        'discount_percentage': Decimal(str(discount_percentage)),  # Changed from discountPercentage
+        'status': 'active',
+        'expiry_date': expiry_date.isoformat(),  # Changed from expiryDate
+        'expiryDate': expiry_date.strftime(EXPIRY_BUCKET_FORMAT),  # expiryDate-index bucket
+        'expiryTimestamp': int(expiry_date.timestamp()),  # For TTL
+        'usageLimit': body.get('usageLimit', default_usage_limit),
+        'usageCount': 0,
+        'description': body.get('description', f'{discount_percentage}% off DalScooter rental'),
+        'created_at': now,  # Changed from createdAt
+        'createdBy': body.get('createdBy', 'franchise-operator'),
+        'is_active': True,  # Changed from isActive
+        'franchise_id': body.get('franchiseId', 'default'),  # Added franchise_id
+        'updated_at': now  # Added updated_at
+    }
+    if campaign_id:
+        code_item['campaignId'] = campaign_id
+    return code_item
+
+def code_write_actions(code_item):
+    """Return the claim + code Put actions that create one code atomically"""
+    claim_item = {
+        'codeId': CODE_CLAIM_PREFIX + code_item['code'],
+        'claimedBy': code_item['codeId'],
+        'expiryTimestamp': code_item['expiryTimestamp']  # Claim expires with its code
+    }
+    return [
+        {'Put': {
+            'TableName': DISCOUNT_CODES_TABLE,
+            'Item': claim_item,
+            'ConditionExpression': 'attribute_not_exists(codeId)'
+        }},
+        {'Put': {
+            'TableName': DISCOUNT_CODES_TABLE,
+            'Item': code_item,
+            'ConditionExpression': 'attribute_not_exists(codeId)'
+        }}
+    ]
+
+def write_codes(code_items, used_codes):
+    """
+    Create up to CODES_PER_TRANSACTION codes in one transaction. Entries whose
+    claim already exists get a fresh code (recorded for the code filter) and
+    the transaction is retried. Callers record the initial codes with
+    record_code_writes first. Raises once MAX_CODE_ATTEMPTS is exhausted.
+    """
+    client = discount_codes_table.meta.client
+    for attempt in range(MAX_CODE_ATTEMPTS):
+        actions = []
+        for code_item in code_items:
+            actions.extend(code_write_actions(code_item))
+        try:
+            client.transact_write_items(TransactItems=actions)
+            return code_items
+        except client.exceptions.TransactionCanceledException as e:
+            reasons = e.response.get('CancellationReasons', [])
+            collided = [
+                index // 2 for index, reason in enumerate(reasons)
+                if reason.get('Code') == 'ConditionalCheckFailed'
+            ]
+            for index in collided:
+                code_items[index]['code'] = generate_unique_code(used_codes)
+            if collided:
+                record_code_writes([code_items[index]['code'] for index in collided])
+            print(f"Code transaction cancelled (attempt {attempt + 1}), regenerated {len(collided)} colliding codes")
+            if not collided:
+                # Conflict with a concurrent transaction; back off before retrying
+                time.sleep(0.05 * (2 ** attempt))
+    raise RuntimeError(f'Could not create {len(code_items)} discount codes after {MAX_CODE_ATTEMPTS} attempts')
+
+def generate_unique_code(used_codes):
+    """Generate a code not already used within this request"""
+    while True:
+        discount_code = generate_discount_code()
+        if discount_code not in used_codes:
+            used_codes.add(discount_code)
+            return discount_code
+
+def bloom_positions(code, size, hashes):
+    """Return the bit positions for a code (double hashing over one sha256 digest)"""
+    digest = hashlib.sha256(code.encode('utf-8')).digest()
+    h1 = int.from_bytes(digest[:8], 'big')
+    h2 = int.from_bytes(digest[8:16], 'big') | 1
+    return [(h1 + i * h2) % size for i in range(hashes)]
+
+def build_code_filter(codes):
+    """Build a Bloom filter sized for the codes at CODE_FILTER_FALSE_POSITIVE_RATE; return (bits, size, hashes)"""
+    n = max(len(codes), 1)
+    size = math.ceil(-n * math.log(CODE_FILTER_FALSE_POSITIVE_RATE) / (math.log(2) ** 2))
+    size = max(64, (size + 7) // 8 * 8)
+    hashes = max(1, round(size / n * math.log(2)))
+    bits = bytearray(size // 8)
+    for code in codes:
+        for position in bloom_positions(code, size, hashes):
+            bits[position >> 3] |= 1 << (position & 7)
+    return bytes(bits), size, hashes
+
+def record_code_writes(codes):
+    """
+    Record codes about to become active, before they are written: each call
+    takes the next writeSeq and stores its codes in their own recent-write
+    item, so rebuilds can include them while status-index catches up, and
+    lastCodeWriteAt tells verify_discount that filters built before now may
+    not contain them.
+    """
+    now = datetime.utcnow()
+    client = discount_codes_table.meta.client
+    # REMOVE drops the single writes map that recent writes used to be kept in
+    response = discount_codes_table.update_item(
+        Key={'codeId': CODE_FILTER_RECENT_ID},
+        UpdateExpression='ADD writeSeq :one REMOVE writes',
+        ExpressionAttributeValues={':one': 1},
+        ReturnValues='UPDATED_NEW'
+    )
+    write_seq = int(response['Attributes']['writeSeq'])
+    discount_codes_table.put_item(
+        Item={
+            'codeId': f'{CODE_FILTER_RECENT_ID}#{write_seq}',
+            'writtenAt': now.isoformat(),
+            'codes': list(codes),
+            'expiryTimestamp': int(now.timestamp()) + CODE_FILTER_RECENT_TTL_SECONDS  # For TTL
+        }
+    )
+
+    try:
+        discount_codes_table.update_item(
+            Key={'codeId': CODE_FILTER_ID},
+            UpdateExpression='SET lastCodeWriteAt = :now',
+            ConditionExpression='attribute_not_exists(lastCodeWriteAt) OR lastCodeWriteAt < :now',
+            ExpressionAttributeValues={':now': now.isoformat()}
+        )
+    except client.exceptions.ConditionalCheckFailedException:
+        pass  # A later write already moved it forward
+
+def batch_get_recent_writes(write_seqs):
+    """
+    Strongly consistent BatchGetItem of the given recent-write items,
+    retrying unprocessed keys with exponential backoff. Returns {seq: item};
+    items that expired or are still being written are absent.
+    """
+    request_items = {
+        DISCOUNT_CODES_TABLE: {
+            'Keys': [{'codeId': f'{CODE_FILTER_RECENT_ID}#{seq}'} for seq in write_seqs],
+            'ConsistentRead': True
+        }
+    }
+    writes = {}
+    for attempt in range(BATCH_GET_MAX_RETRIES + 1):
+        if attempt:
+            time.sleep(min(BATCH_GET_BASE_DELAY * (2 ** attempt), 2))
+        response = dynamodb.batch_get_item(RequestItems=request_items)
+        for item in response.get('Responses', {}).get(DISCOUNT_CODES_TABLE, []):
+            writes[int(item['codeId'].rsplit('#', 1)[1])] = item
+        request_items = response.get('UnprocessedKeys')
+        if not request_items:
+            return writes
+    unprocessed = len(request_items[DISCOUNT_CODES_TABLE]['Keys'])
+    raise RuntimeError(f'Could not read {unprocessed} recent code writes after {BATCH_GET_MAX_RETRIES} retries')
+
+def load_recent_codes(built_at):
+    """
+    Return codes recorded within CODE_FILTER_RECENT_SECONDS, walking the
+    recent-write items back from the newest writeSeq until one is older than
+    the window (or a whole batch has already expired)
+    """
+    item = discount_codes_table.get_item(Key={'codeId': CODE_FILTER_RECENT_ID}, ConsistentRead=True).get('Item')
+    newest_seq = int((item or {}).get('writeSeq', 0))
+    cutoff = (datetime.fromisoformat(built_at) - timedelta(seconds=CODE_FILTER_RECENT_SECONDS)).isoformat()
+    codes = set()
+    for batch_end in range(newest_seq, 0, -CODE_FILTER_RECENT_BATCH):
+        write_seqs = range(batch_end, max(batch_end - CODE_FILTER_RECENT_BATCH, 0), -1)
+        writes = batch_get_recent_writes(write_seqs)
+        if not writes:
+            break
+        reached_cutoff = False
+        for seq in write_seqs:
+            entry = writes.get(seq)
+            if not entry:
+                continue  # Expired, or its writer has not stored it (nor its codes) yet
+            if entry['writtenAt'] < cutoff:
+                reached_cutoff = True
+            else:
+                codes.update(entry['codes'])
+        if reached_cutoff:
+            break
+    return codes
+
+def rebuild_code_filter(added_codes=(), removed_codes=()):
+    """
+    Rebuild the active-code Bloom filter from status-index minus
+    removed_codes, plus codes recorded recently (which status-index may not
+    show yet) and the caller's own added_codes. The filter is written with
+    update_item, keeping lastCodeWriteAt, and conditional on builtAt so a
+    slower, older rebuild cannot overwrite a newer one. If the rebuild fails
+    the filter bits are dropped, and verify_discount falls back to querying
+    code-index for every code.
+    """
+    built_at = datetime.utcnow().isoformat()
+    try:
+        codes = set()
+        query_kwargs = {
+            'IndexName': 'status-index',
+            'KeyConditionExpression': '#status = :active',
+            'ProjectionExpression': 'code',
+            'ExpressionAttributeNames': {'#status': 'status'},
+            'ExpressionAttributeValues': {':active': 'active'}
+        }
+        while True:
+            response = discount_codes_table.query(**query_kwargs)
+            codes.update(item['code'] for item in response.get('Items', []))
+            last_key = response.get('LastEvaluatedKey')
+            if not last_key:
+                break
+            query_kwargs['ExclusiveStartKey'] = last_key
+        # Removed before the union so a concurrent reactivation (recorded in
+        # recent writes) wins over a deactivation
+        codes.difference_update(removed_codes)
+        codes.update(load_recent_codes(built_at))
+        codes.update(added_codes)
+
+        bits, size, hashes = build_code_filter(codes)
+        client = discount_codes_table.meta.client
+        try:
+            discount_codes_table.update_item(
+                Key={'codeId': CODE_FILTER_ID},
+                UpdateExpression='SET bits = :bits, #size = :size, hashes = :hashes, '
+                                 'codeCount = :codeCount, builtAt = :builtAt',
+                ConditionExpression='attribute_not_exists(builtAt) OR builtAt < :builtAt',
+                ExpressionAttributeNames={'#size': 'size'},
+                ExpressionAttributeValues={
+                    ':bits': bits,
+                    ':size': size,
+                    ':hashes': hashes,
+                    ':codeCount': len(codes),
+                    ':builtAt': built_at
+                }
+            )
+        except client.exceptions.ConditionalCheckFailedException:
+            # The newer rebuild started after our codes were recorded, so it includes them
+            print("Skipped code filter write, a newer rebuild already finished")
+            return
+        print(f"Rebuilt code filter: {len(codes)} codes, {size} bits, {hashes} hashes")
+    except Exception as e:
+        print(f"Error rebuilding code filter, dropping it: {str(e)}")
+        # Keep lastCodeWriteAt: an older rebuild that lands later must still be distrusted
+        discount_codes_table.update_item(
+            Key={'codeId': CODE_FILTER_ID},
+            UpdateExpression='REMOVE bits, #size, hashes, codeCount, builtAt',
+            ExpressionAttributeNames={'#size': 'size'}
+        )
+
+def hll_add(registers, value):
+    """Add a value to a HyperLogLog register array"""
+    hashed = int.from_bytes(hashlib.sha256(value.encode('utf-8')).digest()[:8], 'big')
+    index = hashed >> (64 - HLL_PRECISION)
+    remainder = hashed & ((1 << (64 - HLL_PRECISION)) - 1)
+    rank = (64 - HLL_PRECISION) - remainder.bit_length() + 1
+    if rank > registers[index]:
+        registers[index] = rank
+
+def hll_estimate(registers):
+    """Estimate the number of distinct values added to a HyperLogLog register array"""
+    m = len(registers)
+    estimate = (0.7213 / (1 + 1.079 / m)) * m * m / sum(2.0 ** -r for r in registers)
+    zeros = registers.count(0)
+    if estimate <= 2.5 * m and zeros:
+        # Small-range correction (linear counting)
+        estimate = m * math.log(m / zeros)
+    return int(round(estimate))
+
+def parse_report_params(query_params):
+    """Validate report query parameters; return (params, error message)"""
+    code_ids = [c.strip() for c in (query_params.get('codeId') or '').split(',') if c.strip()]
+    if not code_ids:
+        return None, 'codeId is required (comma-separate up to 25 codes)'
+    if len(code_ids) > MAX_REPORT_CODES:
+        return None, f'At most {MAX_REPORT_CODES} codes per report'
+
+    bucket = query_params.get('bucket', 'day')
+    if bucket not in REPORT_BUCKET_WIDTHS:
+        return None, 'bucket must be one of: hour, day'
+
+    try:
+        end = datetime.fromisoformat(query_params['to']) if query_params.get('to') else datetime.utcnow()
+        if query_params.get('to') and len(query_params['to']) == 10:
+            # Date-only upper bound covers the whole day
+            end += timedelta(days=1) - timedelta(microseconds=1)
+        start = (datetime.fromisoformat(query_params['from']) if query_params.get('from')
+                 else end - timedelta(days=DEFAULT_REPORT_DAYS))
+    except ValueError:
+        return None, 'from and to must be ISO dates (YYYY-MM-DD or YYYY-MM-DDTHH:MM:SS)'
+    if start > end:
+        return None, 'from must be before to'
+    if (end - start) / REPORT_BUCKET_WIDTHS[bucket] > MAX_REPORT_BUCKETS:
+        return None, f'Range too large for {bucket} buckets (max {MAX_REPORT_BUCKETS})'
+
+    return {
+        'codeIds': list(dict.fromkeys(code_ids)),
+        'bucket': bucket,
+        'from': start.isoformat(),
+        'to': end.isoformat()
+    }, None
+
+def new_usage_totals():
+    """Return an empty redemption / revenue accumulator"""
+    return {
+        'redemptions': 0,
+        'originalAmount': Decimal('0'),
+        'discountAmount': Decimal('0'),
+        'redemptionsWithoutAmount': 0
+    }
+
+def add_usage(totals, usage):
+    """Fold one usage row into an accumulator"""
+    totals['redemptions'] += 1
+    if 'originalAmount' in usage:
+        totals['originalAmount'] += usage['originalAmount']
+        totals['discountAmount'] += usage.get('discountAmount', Decimal('0'))
+    else:
+        totals['redemptionsWithoutAmount'] += 1
+
+def format_usage_totals(totals):
+    """Add net revenue to an accumulator for the response"""
+    return dict(totals, netRevenue=totals['originalAmount'] - totals['discountAmount'])
+
+def aggregate_code_usage(code_id, params, user_registers):
+    """
+    Stream one code's usage rows from codeId-usedDate-index page by page.
+    Memory is bounded by the number of time buckets, not by redemptions.
+    """
+    prefix_length = REPORT_BUCKET_PREFIX[params['bucket']]
+    totals = new_usage_totals()
+    series = {}
+    query_kwargs = {
+        'IndexName': 'codeId-usedDate-index',
+        'KeyConditionExpression': 'codeId = :codeId AND usedDate BETWEEN :from AND :to',
+        'ProjectionExpression': 'userId, usedDate, originalAmount, discountAmount',
+        'ExpressionAttributeValues': {
+            ':codeId': code_id,
+            ':from': params['from'],
+            ':to': params['to']
+        }
+    }
+    while True:
+        response = user_discount_usage_table.query(**query_kwargs)
+        for usage in response.get('Items', []):
+            add_usage(totals, usage)
+            bucket_key = usage['usedDate'][:prefix_length]
+            if bucket_key not in series:
+                series[bucket_key] = new_usage_totals()
+            add_usage(series[bucket_key], usage)
+            hll_add(user_registers, usage['userId'])
+        last_key = response.get('LastEvaluatedKey')
+        if not last_key:
+            break
+        query_kwargs['ExclusiveStartKey'] = last_key
+
+    report = format_usage_totals(totals)
+    # Usage rows are keyed by (userId, codeId), so each user redeems a code at most once
+    report['uniqueUsers'] = totals['redemptions']
+    report['series'] = [
+        dict(format_usage_totals(bucket_totals), bucket=bucket_key)
+        for bucket_key, bucket_totals in sorted(series.items())
+    ]
+    return report
+
 def lambda_handler(event, context):
     """
     Main handler for discount code management operations
-    Supports: GET (list codes), POST (create code), PUT (update code), DELETE (deactivate code)
+    Supports: GET (list codes), GET /report (usage analytics), POST (create code),
+    POST /campaign (create codes in bulk),
+    PUT (update code), DELETE (deactivate code)
     """
     print(f"Event: {json.dumps(event, indent=2)}")
     
@@ -110,8 +553,12 @@ def lambda_handler(event, context):
         
         method = event['httpMethod']
         
-        if method == 'GET':
+        if method == 'GET' and event.get('resource', '').endswith('/report'):
+            return handle_usage_report(event)
+        elif method == 'GET':
             return handle_get_discount_codes(event)
+        elif method == 'POST' and event.get('resource', '').endswith('/campaign'):
+            return handle_create_campaign(event)
         elif method == 'POST':
             return handle_create_discount_code(event)
         elif method == 'PUT':
@@ -147,33 +594,33 @@ def handle_get_discount_codes(event):
         status = query_params.get('status', 'active')
         
         if status:
-            response = discount_codes_table.query(
-                IndexName='status-index',
-                KeyConditionExpression='#status = :status',
-                ExpressionAttributeNames={'#status': 'status'},
-                ExpressionAttributeValues={':status': status}
-            )
+            read_method = discount_codes_table.query
+            read_kwargs = {
+                'IndexName': 'status-index',
+                'KeyConditionExpression': '#status = :status',
+                'ExpressionAttributeNames': {'#status': 'status'},
+                'ExpressionAttributeValues': {':status': status}
+            }
         else:
-            response = discount_codes_table.scan()
+            read_method = discount_codes_table.scan
+            # Skip code claim items, which have no `code` attribute
+            read_kwargs = {'FilterExpression': 'attribute_exists(code)'}
         
-        codes = response.get('Items', [])
+        codes = []
+        while True:
+            response = read_method(**read_kwargs)
+            codes.extend(response.get('Items', []))
+            last_key = response.get('LastEvaluatedKey')
+            if not last_key:
+                break
+            read_kwargs['ExclusiveStartKey'] = last_key
         
-        # Filter out expired codes
+        # Hide expired codes; flipping their status is left to the expiry sweeper
         current_time = datetime.utcnow()
-        active_codes = []
-        
-        for code in codes:
-            expiry_date = datetime.fromisoformat(code['expiry_date'])
-            if expiry_date > current_time:
-                active_codes.append(code)
-            elif code['status'] == 'active':
-                # Automatically deactivate expired codes
-                discount_codes_table.update_item(
-                    Key={'codeId': code['codeId']},
-                    UpdateExpression='SET #status = :status',
-                    ExpressionAttributeNames={'#status': 'status'},
-                    ExpressionAttributeValues={':status': 'expired'}
-                )
+        active_codes = [
+            code for code in codes
+            if datetime.fromisoformat(code['expiry_date']) > current_time
+        ]
         
         return {
             'statusCode': 200,
@@ -201,91 +648,120 @@ def handle_create_discount_code(event):
     try:
         body = json.loads(event['body'])
         
-        # Validate required fields
-        required_fields = ['discountPercentage', 'expiryHours']
-        for field in required_fields:
-            if field not in body:
-                return {
-                    'statusCode': 400,
-                    'headers': get_cors_headers(),
-                    'body': json.dumps({
-                        'success': False,
-                        'message': f'Missing required field: {field}'
-                    })
-                }
-        
-        # Validate discount percentage (5% to 15%)
-        discount_percentage = body['discountPercentage']
-        if not (5 <= discount_percentage <= 15):
+        validation_error = validate_code_settings(body)
+        if validation_error:
             return {
                 'statusCode': 400,
                 'headers': get_cors_headers(),
                 'body': json.dumps({
                     'success': False,
-                    'message': 'Discount percentage must be between 5% and 15%'
+                    'message': validation_error
                 })
             }
         
-        # Validate expiry hours (0-48 hours, 0-2 days)
-        expiry_hours = body['expiryHours']
-        if not (0 <= expiry_hours <= 48):
+        # Calculate expiry date
+        expiry_date = datetime.utcnow() + timedelta(hours=body['expiryHours'])
+        
+        # Create the code together with its claim so the value is guaranteed unique
+        code_item = build_code_item(body, generate_discount_code(), expiry_date)
+        record_code_writes([code_item['code']])
+        write_codes([code_item], {code_item['code']})
+        rebuild_code_filter(added_codes=[code_item['code']])
+        
+        return {
+            'statusCode': 201,
+            'headers': get_cors_headers(),
+            'body': json.dumps({
+                'success': True,
+                'message': 'Discount code created successfully',
+                'discountCode': code_item
+            }, default=decimal_default)
+        }
+        
+    except json.JSONDecodeError:
+        return {
+            'statusCode': 400,
+            'headers': get_cors_headers(),
+            'body': json.dumps({
+                'success': False,
+                'message': 'Invalid JSON in request body'
+            })
+        }
+    except Exception as e:
+        print(f"Error creating discount code: {str(e)}")
+        return {
+            'statusCode': 500,
+            'headers': get_cors_headers(),
+            'body': json.dumps({
+                'success': False,
+                'message': f'Error creating discount code: {str(e)}'
+            })
+        }
+
+def handle_create_campaign(event):
+    """Handle POST request to create a campaign of discount codes in bulk"""
+    try:
+        body = json.loads(event['body'])
+        
+        validation_error = validate_code_settings(body)
+        count = body.get('count')
+        if not validation_error and (not isinstance(count, int) or not (1 <= count <= MAX_CAMPAIGN_CODES)):
+            validation_error = f'count must be an integer between 1 and {MAX_CAMPAIGN_CODES}'
+        if validation_error:
             return {
                 'statusCode': 400,
                 'headers': get_cors_headers(),
                 'body': json.dumps({
                     'success': False,
-                    'message': 'Expiry time must be between 0 and 48 hours (0-2 days)'
+                    'message': validation_error
                 })
             }
         
-        # Generate unique code and ID
-        code_id = str(uuid.uuid4())
-        discount_code = generate_discount_code()
-        
-        # Calculate expiry date
-        expiry_date = datetime.utcnow() + timedelta(hours=expiry_hours)
-        expiry_timestamp = int(expiry_date.timestamp())
-        
-        # Create discount code item
-        code_item = {
-            'codeId': code_id,
-            'code': discount_code,
-            'discount_percentage': Decimal(str(discount_percentage)),  # Changed from discountPercentage
-            'status': 'active',
-            'expiry_date': expiry_date.isoformat(),  # Changed from expiryDate
-            'expiryTimestamp': expiry_timestamp,  # For TTL
-            'usageLimit': body.get('usageLimit', 100),  # Default limit
-            'usageCount': 0,
-            'description': body.get('description', f'{discount_percentage}% off DalScooter rental'),
-            'created_at': datetime.utcnow().isoformat(),  # Changed from createdAt
-            'createdBy': body.get('createdBy', 'franchise-operator'),
-            'is_active': True,  # Changed from isActive
-            'franchise_id': body.get('franchiseId', 'default'),  # Added franchise_id
-            'updated_at': datetime.utcnow().isoformat()  # Added updated_at
-        }
+        campaign_id = str(uuid.uuid4())
+        expiry_date = datetime.utcnow() + timedelta(hours=body['expiryHours'])
+        used_codes = set()
+        # Campaign codes are single-use unless a usageLimit is given
+        code_items = [
+            build_code_item(body, generate_unique_code(used_codes), expiry_date,
+                            default_usage_limit=1, campaign_id=campaign_id)
+            for _ in range(count)
+        ]
+        record_code_writes(used_codes)
+        chunks = [
+            code_items[i:i + CODES_PER_TRANSACTION]
+            for i in range(0, len(code_items), CODES_PER_TRANSACTION)
+        ]
         
-        # Check if code already exists
-        existing_code = discount_codes_table.query(
-            IndexName='code-index',
-            KeyConditionExpression='code = :code',
-            ExpressionAttributeValues={':code': discount_code}
-        )
+        def write_chunk(chunk):
+            try:
+                return write_codes(chunk, used_codes), None
+            except Exception as e:
+                print(f"Error creating campaign {campaign_id} codes: {str(e)}")
+                return [], len(chunk)
         
-        if existing_code['Items']:
-            # Generate a new code if conflict
-            discount_code = generate_discount_code()
-            code_item['code'] = discount_code
+        created = []
+        failed_count = 0
+        with ThreadPoolExecutor(max_workers=CAMPAIGN_WORKERS) as executor:
+            for written, failed in executor.map(write_chunk, chunks):
+                created.extend(item['code'] for item in written)
+                failed_count += failed or 0
         
-        # Save to DynamoDB
-        discount_codes_table.put_item(Item=code_item)
+        if created:
+            rebuild_code_filter(added_codes=created)
         
+        print(f"Campaign {campaign_id}: created {len(created)} codes, {failed_count} failed")
         return {
-            'statusCode': 201,
+            'statusCode': 201 if not failed_count else 207,
             'headers': get_cors_headers(),
             'body': json.dumps({
-                'success': True,
-                'message': 'Discount code created successfully',
-                'discountCode': code_item
+                'success': failed_count == 0,
+                'message': f'Created {len(created)} of {count} discount codes',
+                'campaignId': campaign_id,
+                'discount_percentage': body['discountPercentage'],
+                'expiry_date': expiry_date.isoformat(),
+                'createdCount': len(created),
+                'failedCount': failed_count,
+                'codes': created
             }, default=decimal_default)
         }
         
@@ -299,13 +775,97 @@ def handle_create_discount_code(event):
             })
         }
     except Exception as e:
-        print(f"Error creating discount code: {str(e)}")
+        print(f"Error creating discount campaign: {str(e)}")
         return {
             'statusCode': 500,
             'headers': get_cors_headers(),
             'body': json.dumps({
                 'success': False,
-                'message': f'Error creating discount code: {str(e)}'
+                'message': f'Error creating discount campaign: {str(e)}'
+            })
+        }
+
+def batch_get_code_details(code_ids):
+    """
+    Read report metadata for up to MAX_REPORT_CODES codes with BatchGetItem,
+    retrying unprocessed keys with exponential backoff. Returns {codeId: item};
+    raises if keys are still unprocessed after the retries.
+    """
+    request_items = {
+        DISCOUNT_CODES_TABLE: {
+            'Keys': [{'codeId': code_id} for code_id in code_ids],
+            'ProjectionExpression': 'codeId, code, discount_percentage, #status, usageCount, usageLimit, expiry_date',
+            'ExpressionAttributeNames': {'#status': 'status'}
+        }
+    }
+    code_details = {}
+    for attempt in range(BATCH_GET_MAX_RETRIES + 1):
+        if attempt:
+            time.sleep(min(BATCH_GET_BASE_DELAY * (2 ** attempt), 2))
+        response = dynamodb.batch_get_item(RequestItems=request_items)
+        for item in response.get('Responses', {}).get(DISCOUNT_CODES_TABLE, []):
+            code_details[item['codeId']] = item
+        request_items = response.get('UnprocessedKeys')
+        if not request_items:
+            return code_details
+    unprocessed = len(request_items[DISCOUNT_CODES_TABLE]['Keys'])
+    raise RuntimeError(f'Could not read metadata for {unprocessed} discount codes after {BATCH_GET_MAX_RETRIES} retries')
+
+def handle_usage_report(event):
+    """Handle GET request for redemptions, unique users and revenue impact per code over time"""
+    try:
+        params, error = parse_report_params(event.get('queryStringParameters') or {})
+        if error:
+            return {
+                'statusCode': 400,
+                'headers': get_cors_headers(),
+                'body': json.dumps({
+                    'success': False,
+                    'message': error
+                })
+            }
+        
+        # Code metadata for the report header
+        code_details = batch_get_code_details(params['codeIds'])
+        
+        user_registers = [0] * (1 << HLL_PRECISION)
+        overall = new_usage_totals()
+        code_reports = []
+        for code_id in params['codeIds']:
+            report = aggregate_code_usage(code_id, params, user_registers)
+            for field in ['redemptions', 'originalAmount', 'discountAmount', 'redemptionsWithoutAmount']:
+                overall[field] += report[field]
+            code_reports.append(dict(code_details.get(code_id, {}), codeId=code_id, **report))
+        
+        totals = format_usage_totals(overall)
+        if len(code_reports) == 1:
+            totals['uniqueUsers'] = code_reports[0]['uniqueUsers']
+            totals['uniqueUsersEstimated'] = False
+        else:
+            totals['uniqueUsers'] = hll_estimate(user_registers)
+            totals['uniqueUsersEstimated'] = True
+        
+        return {
+            'statusCode': 200,
+            'headers': get_cors_headers(),
+            'body': json.dumps({
+                'success': True,
+                'from': params['from'],
+                'to': params['to'],
+                'bucket': params['bucket'],
+                'totals': totals,
+                'codes': code_reports
+            }, default=decimal_default)
+        }
+        
+    except Exception as e:
+        print(f"Error building discount usage report: {str(e)}")
+        return {
+            'statusCode': 500,
+            'headers': get_cors_headers(),
+            'body': json.dumps({
+                'success': False,
+                'message': f'Error building discount usage report: {str(e)}'
             })
         }
 
@@ -380,6 +940,8 @@ def handle_update_discount_code(event):
             new_expiry_date = datetime.utcnow() + timedelta(hours=expiry_hours)
             update_expression += ", expiry_date = :expiry_date"
             expression_values[':expiry_date'] = new_expiry_date.isoformat()
+            update_expression += ", expiryDate = :expiry_bucket"
+            expression_values[':expiry_bucket'] = new_expiry_date.strftime(EXPIRY_BUCKET_FORMAT)
         
         # Handle isActive update (convert to status)
         if 'isActive' in body:
@@ -411,7 +973,14 @@ def handle_update_discount_code(event):
         if expression_attribute_names:
             update_params['ExpressionAttributeNames'] = expression_attribute_names
         
+        if 'isActive' in body and body['isActive']:
+            record_code_writes([existing_discount['code']])
         response = discount_codes_table.update_item(**update_params)
+        if 'isActive' in body:
+            if body['isActive']:
+                rebuild_code_filter(added_codes=[existing_discount['code']])
+            else:
+                rebuild_code_filter(removed_codes=[existing_discount['code']])
         
         return {
             'statusCode': 200,
@@ -496,6 +1065,7 @@ def handle_delete_discount_code(event):
                 ':updatedAt': datetime.utcnow().isoformat()
             }
         )
+        rebuild_code_filter(removed_codes=[existing_discount['code']])
         
         return {
             'statusCode': 200,
@@ -3,14 +3,32 @@
 #-----------------------
 import json
 import boto3
+import hashlib
 import os
+import time
+from collections import OrderedDict
 from datetime import datetime
+from decimal import Decimal, InvalidOperation
 
 # Get the Discount code table ENV.
 DISCOUNT_CODES_TABLE = os.environ['DISCOUNT_CODES_TABLE_NAME']
+USER_DISCOUNT_USAGE_TABLE = os.environ.get('USER_DISCOUNT_USAGE_TABLE_NAME')
+CACHE_TTL_SECONDS = int(os.environ.get('DISCOUNT_CACHE_TTL_SECONDS', '60'))
+NEGATIVE_CACHE_TTL_SECONDS = int(os.environ.get('DISCOUNT_NEGATIVE_CACHE_TTL_SECONDS', '10'))
+FILTER_TTL_SECONDS = int(os.environ.get('DISCOUNT_FILTER_TTL_SECONDS', '30'))
+MAX_CACHE_ENTRIES = 1024
+# Bloom filter item maintained by discount_management.rebuild_code_filter; it
+# also carries the filter's builtAt and the time of the last code write
+CODE_FILTER_ID = 'FILTER#active-codes'
 dynamodb = boto3.resource('dynamodb')
 discount_codes_table = dynamodb.Table(DISCOUNT_CODES_TABLE)
 
+# Warm-instance LRU cache: code -> (expires_at, summary or None for "not found")
+_code_cache = OrderedDict()
+
+# Warm-instance copy of the active-code Bloom filter: (expires_at, filter dict or None)
+_code_filter = (0, None)
+
 def get_cors_headers():
     """Return CORS headers for API responses"""
     return {
@@ -19,6 +37,245 @@ def get_cors_headers():
         'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS'
     }
 
+def get_authenticated_user_id(event):
+    """Return the caller's Cognito sub from the custom authorizer context"""
+    authorizer = (event.get('requestContext') or {}).get('authorizer') or {}
+    if authorizer.get('userId'):
+        return authorizer['userId']
+    claims = authorizer.get('claims') or {}
+    return claims.get('sub') or authorizer.get('principalId')
+
+def summarize_code(discount_item):
+    """Keep only the fields needed to verify a code"""
+    return {
+        'codeId': discount_item['codeId'],
+        'discount_percentage': float(discount_item.get('discount_percentage', 0)),
+        'status': discount_item.get('status'),
+        'expiry_date': discount_item['expiry_date'],
+        'usageCount': int(discount_item.get('usageCount', 0)),
+        'usageLimit': int(discount_item.get('usageLimit', 100))
+    }
+
+def cache_put(code, summary, ttl):
+    """Store a lookup result, evicting the least recently used entry when full"""
+    _code_cache[code] = (time.time() + ttl, summary)
+    _code_cache.move_to_end(code)
+    while len(_code_cache) > MAX_CACHE_ENTRIES:
+        _code_cache.popitem(last=False)
+
+def bloom_positions(code, size, hashes):
+    """Return the bit positions for a code; must match discount_management.bloom_positions"""
+    digest = hashlib.sha256(code.encode('utf-8')).digest()
+    h1 = int.from_bytes(digest[:8], 'big')
+    h2 = int.from_bytes(digest[8:16], 'big') | 1
+    return [(h1 + i * h2) % size for i in range(hashes)]
+
+def get_code_filter():
+    """Return the cached Bloom filter, re-reading the filter item every FILTER_TTL_SECONDS"""
+    global _code_filter
+    if _code_filter[0] > time.time():
+        return _code_filter[1]
+
+    item = discount_codes_table.get_item(Key={'codeId': CODE_FILTER_ID}).get('Item')
+    code_filter = None
+    if item and 'bits' in item:
+        code_filter = {
+            'bits': item['bits'].value,
+            'size': int(item['size']),
+            'hashes': int(item['hashes']),
+            'builtAt': item['builtAt'],
+            'lastCodeWriteAt': item.get('lastCodeWriteAt', '')
+        }
+    _code_filter = (time.time() + FILTER_TTL_SECONDS, code_filter)
+    return code_filter
+
+def filter_misses(code_filter, discount_code):
+    """True when the code hashes to at least one unset bit"""
+    bits = code_filter['bits']
+    return any(
+        not bits[position >> 3] & (1 << (position & 7))
+        for position in bloom_positions(discount_code, code_filter['size'], code_filter['hashes'])
+    )
+
+def definitely_absent(discount_code):
+    """
+    True when the Bloom filter proves the code is not an active code. The
+    miss is decided from the cached filter item alone: it is final only when
+    that build started after the last code write it records; otherwise the
+    caller falls through to code-index until a newer build is loaded.
+    """
+    code_filter = get_code_filter()
+    if not code_filter:
+        # No filter yet (or the last rebuild failed): cannot rule anything out
+        return False
+    if code_filter['lastCodeWriteAt'] >= code_filter['builtAt']:
+        # Codes were written after this build started: it may not hold them yet
+        return False
+    return filter_misses(code_filter, discount_code)
+
+def lookup_code(discount_code):
+    """
+    Return the cached summary for a code (None if it does not exist),
+    querying code-index only on a cache miss that the active-code Bloom filter
+    cannot rule out. Positive entries never outlive the code's own expiry_date;
+    misses are cached for a short time.
+    """
+    cached = _code_cache.get(discount_code)
+    if cached and cached[0] > time.time():
+        _code_cache.move_to_end(discount_code)
+        return cached[1]
+
+    # Typos and guesses are rejected here without touching code-index
+    if definitely_absent(discount_code):
+        return None
+
+    response = discount_codes_table.query(
+        IndexName='code-index',
+        KeyConditionExpression='code = :code',
+        ExpressionAttributeValues={':code': discount_code}
+    )
+
+    if not response.get('Items'):
+        cache_put(discount_code, None, NEGATIVE_CACHE_TTL_SECONDS)
+        return None
+
+    summary = summarize_code(response['Items'][0])
+    seconds_to_expiry = (datetime.fromisoformat(summary['expiry_date']) - datetime.utcnow()).total_seconds()
+    ttl = min(CACHE_TTL_SECONDS, seconds_to_expiry)
+    if ttl > 0:
+        cache_put(discount_code, summary, ttl)
+    else:
+        # Already expired: it will not become valid again, keep it like a miss
+        cache_put(discount_code, summary, NEGATIVE_CACHE_TTL_SECONDS)
+    return summary
+
+def redeem_code(event, discount_code):
+    """
+    Redeem a discount code for the calling user in one TransactWriteItems:
+    conditionally increment usageCount (code active, unexpired, under its
+    usageLimit) and insert the user's usage row (at most once per user).
+    """
+    user_id = get_authenticated_user_id(event)
+    if not user_id:
+        return {
+            'statusCode': 401,
+            'headers': get_cors_headers(),
+            'body': json.dumps({
+                'flag': 'error',
+                'message': 'Authentication required to redeem a discount code.'
+            })
+        }
+
+    try:
+        body = json.loads(event.get('body') or '{}')
+    except json.JSONDecodeError:
+        return {
+            'statusCode': 400,
+            'headers': get_cors_headers(),
+            'body': json.dumps({
+                'flag': 'error',
+                'message': 'Invalid JSON in request body.'
+            })
+        }
+
+    discount_item = lookup_code(discount_code)
+    if not discount_item:
+        return {
+            'statusCode': 404,
+            'headers': get_cors_headers(),
+            'body': json.dumps({
+                'flag': 'error',
+                'message': 'Discount code is not valid.'
+            })
+        }
+
+    now = datetime.utcnow().isoformat()
+    usage_item = {
+        'userId': user_id,
+        'codeId': discount_item['codeId'],
+        'code': discount_code,
+        'usedDate': now,
+        'discount_percentage': Decimal(str(discount_item['discount_percentage']))
+    }
+    if body.get('bookingId'):
+        usage_item['bookingId'] = str(body['bookingId'])
+    if body.get('amount') is not None:
+        try:
+            amount = Decimal(str(body['amount']))
+        except (InvalidOperation, ValueError):
+            return {
+                'statusCode': 400,
+                'headers': get_cors_headers(),
+                'body': json.dumps({
+                    'flag': 'error',
+                    'message': 'amount must be a number.'
+                })
+            }
+        usage_item['originalAmount'] = amount
+        usage_item['discountAmount'] = (amount * usage_item['discount_percentage'] / 100).quantize(Decimal('0.01'))
+
+    client = dynamodb.meta.client
+    try:
+        client.transact_write_items(TransactItems=[
+            {
+                'Update': {
+                    'TableName': DISCOUNT_CODES_TABLE,
+                    'Key': {'codeId': discount_item['codeId']},
+                    'UpdateExpression': 'SET usageCount = if_not_exists(usageCount, :zero) + :one, updatedAt = :now',
+                    'ConditionExpression': (
+                        '#status = :active AND expiry_date > :now AND '
+                        '(attribute_not_exists(usageLimit) OR attribute_not_exists(usageCount) '
+                        'OR usageCount < usageLimit)'
+                    ),
+                    'ExpressionAttributeNames': {'#status': 'status'},
+                    'ExpressionAttributeValues': {
+                        ':active': 'active',
+                        ':now': now,
+                        ':zero': 0,
+                        ':one': 1
+                    }
+                }
+            },
+            {
+                'Put': {
+                    'TableName': USER_DISCOUNT_USAGE_TABLE,
+                    'Item': usage_item,
+                    'ConditionExpression': 'attribute_not_exists(userId)'
+                }
+            }
+        ])
+    except client.exceptions.TransactionCanceledException as e:
+        reasons = [reason.get('Code') for reason in e.response.get('CancellationReasons', [])]
+        print(f"Redemption of {discount_code} cancelled: {reasons}")
+        if len(reasons) > 1 and reasons[1] == 'ConditionalCheckFailed':
+            message = 'You have already used this discount code.'
+        elif reasons and reasons[0] == 'ConditionalCheckFailed':
+            message = 'Discount code is expired, not active, or fully redeemed.'
+        else:
+            message = 'Discount code could not be redeemed, please try again.'
+        return {
+            'statusCode': 409,
+            'headers': get_cors_headers(),
+            'body': json.dumps({
+                'flag': 'error',
+                'message': message
+            })
+        }
+    finally:
+        # usageCount changed (or the code turned out invalid); refetch next time
+        _code_cache.pop(discount_code, None)
+
+    return {
+        'statusCode': 200,
+        'headers': get_cors_headers(),
+        'body': json.dumps({
+            'flag': 'success',
+            'message': 'Discount code redeemed.',
+            'discount_percentage': discount_item['discount_percentage'],
+            'discountAmount': float(usage_item['discountAmount']) if 'discountAmount' in usage_item else None
+        })
+    }
+
 # Extract the discount code from the request.
 def lambda_handler(event, context):
     print(f"Event: {json.dumps(event, indent=2)}")
@@ -45,16 +302,14 @@ def lambda_handler(event, context):
                     'message': 'Discount code is required in path.'
                 })
             }
+
+        if event['httpMethod'] == 'POST' and event.get('resource', '').endswith('/redeem'):
+            return redeem_code(event, discount_code)
         
-        # Check if the discount code exists in the database
-        response = discount_codes_table.query(
-            IndexName='code-index',
-            KeyConditionExpression='code = :code',
-            ExpressionAttributeValues={':code': discount_code}
-        )
+        # Check if the discount code exists (cached per warm instance)
+        discount_item = lookup_code(discount_code)
         
-        if response.get('Items'):
-            discount_item = response['Items'][0]
+        if discount_item:
             current_time = datetime.utcnow()
             expiry_date = datetime.fromisoformat(discount_item['expiry_date'])
             
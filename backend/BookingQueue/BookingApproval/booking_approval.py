@@ -2,13 +2,33 @@ import json
 import boto3
 import os
 import secrets
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from concurrent.futures import Future, ThreadPoolExecutor
+from email_templates import EmailTemplate
 
 dynamodb = boto3.resource('dynamodb')
 cognito = boto3.client('cognito-idp')
 sns = boto3.client('sns')
+sqs = boto3.client('sqs')
 
 BOOKING_TABLE = os.environ['BOOKING_TABLE_NAME']
 BIKE_TABLE = os.environ['BIKE_TABLE_NAME']
+EXPIRY_QUEUE_URL = os.environ.get('BOOKING_EXPIRY_QUEUE_URL')
+MAX_SQS_DELAY_SECONDS = 900
+# Upper bound on bookings approved in parallel within one SQS batch
+APPROVAL_WORKERS = int(os.environ.get('APPROVAL_WORKERS', '10'))
+USER_CACHE_TTL_SECONDS = int(os.environ.get('USER_CACHE_TTL_SECONDS', '300'))
+USER_NEGATIVE_CACHE_TTL_SECONDS = int(os.environ.get('USER_NEGATIVE_CACHE_TTL_SECONDS', '30'))
+MAX_USER_CACHE_ENTRIES = 1024
+
+# Warm-instance LRU cache: sub -> (expires_at, attributes)
+_user_cache = OrderedDict()
+# In-flight Cognito lookups, so concurrent workers asking for one sub share a call
+_user_lookups = {}
+_user_cache_lock = threading.Lock()
 
 # Booking confirmation email template
 BOOKING_CONFIRMATION_EMAIL_TEMPLATE = """<!DOCTYPE html>
@@ -101,20 +121,51 @@ BOOKING_CONFIRMATION_EMAIL_TEMPLATE = """<!DOCTYPE html>
 </body>
 </html>"""
 
+# Parsed once per container; rendering is a single join
+BOOKING_CONFIRMATION_EMAIL = EmailTemplate(BOOKING_CONFIRMATION_EMAIL_TEMPLATE)
+
 def get_booking_confirmation_email_template(**kwargs):
     """
     Return the booking confirmation email template with placeholders replaced with provided values
     """
-    template = BOOKING_CONFIRMATION_EMAIL_TEMPLATE
-    
-    # Replace placeholders with actual values
-    for key, value in kwargs.items():
-        template = template.replace(f"{{{key}}}", value)
-        
-    return template
+    return BOOKING_CONFIRMATION_EMAIL.render(**kwargs)
 
 def get_user_attributes(user_id):
-    """Fetches user attributes from Cognito using user ID"""
+    """
+    Return a user's Cognito attributes, served from the warm-instance cache
+    when possible. Concurrent callers for the same sub wait on one in-flight
+    lookup instead of each calling Cognito.
+    """
+    with _user_cache_lock:
+        cached = _user_cache.get(user_id)
+        if cached and cached[0] > time.time():
+            _user_cache.move_to_end(user_id)
+            return cached[1]
+        future = _user_lookups.get(user_id)
+        is_owner = future is None
+        if is_owner:
+            future = Future()
+            _user_lookups[user_id] = future
+
+    if not is_owner:
+        return future.result()
+
+    attributes, ttl = {'given_name': 'User', 'email': ''}, 0
+    try:
+        attributes, ttl = fetch_user_attributes(user_id)
+    finally:
+        with _user_cache_lock:
+            if ttl:
+                _user_cache[user_id] = (time.time() + ttl, attributes)
+                _user_cache.move_to_end(user_id)
+                while len(_user_cache) > MAX_USER_CACHE_ENTRIES:
+                    _user_cache.popitem(last=False)
+            _user_lookups.pop(user_id, None)
+        future.set_result(attributes)
+    return attributes
+
+def fetch_user_attributes(user_id):
+    """Fetches user attributes from Cognito using user ID; returns (attributes, cache ttl)"""
     try:
         # Try to get user by user ID (sub) first
         response = cognito.list_users(
@@ -128,14 +179,15 @@ def get_user_attributes(user_id):
             for attr in user['Attributes']:
                 attributes[attr['Name']] = attr['Value']
             print(f"Retrieved user attributes for {user_id}: {attributes}")
-            return attributes
+            return attributes, USER_CACHE_TTL_SECONDS
         else:
             print(f"No user found with sub: {user_id}")
-            return {'given_name': 'User', 'email': ''}
+            return {'given_name': 'User', 'email': ''}, USER_NEGATIVE_CACHE_TTL_SECONDS
             
     except Exception as e:
+        # Not cached: a throttled or failed call should be retried on the next booking
         print(f"Error fetching user attributes for {user_id}: {str(e)}")
-        return {'given_name': 'User', 'email': ''}
+        return {'given_name': 'User', 'email': ''}, 0
 
 def send_booking_confirmation_email(booking, access_code):
     """Sends booking confirmation email with access code via SNS"""
@@ -149,15 +201,20 @@ def send_booking_confirmation_email(booking, access_code):
             return
         print(f"Retrieved SNS topic ARN: {topic_arn}")
         
-        # Get user details from Cognito
         user_id = booking.get('userId')
-        if not user_id:
-            print("No userId found in booking")
-            return
-            
-        user_attributes = get_user_attributes(user_id)
-        first_name = user_attributes.get('given_name', 'User')
-        email = user_attributes.get('email', '')
+        if booking.get('recipientEmail'):
+            # Contact snapshot stored by booking_request
+            first_name = booking.get('recipientName') or 'User'
+            email = booking['recipientEmail']
+        else:
+            # Legacy booking without a snapshot: get user details from Cognito
+            if not user_id:
+                print("No userId found in booking")
+                return
+                
+            user_attributes = get_user_attributes(user_id)
+            first_name = user_attributes.get('given_name', 'User')
+            email = user_attributes.get('email', '')
         
         if not email:
             print(f"No email found for user {user_id}")
@@ -216,79 +273,119 @@ DalScooter Team
         print(f"Error sending booking confirmation email: {str(e)}")
         import traceback
         print(f"Traceback: {traceback.format_exc()}")
+
+def schedule_booking_expiry(booking):
+    """
+    Enqueue the booking's expiry timer. booking_cleanup re-enqueues it in
+    hops of at most 15 minutes and revokes the access code once endTime passes.
+    """
+    if not EXPIRY_QUEUE_URL or not booking.get('endTime'):
+        print("No expiry queue or endTime, relying on the cleanup sweep")
+        return
+    end_time = datetime.fromisoformat(booking['endTime'].replace('Z', '+00:00'))
+    if not end_time.tzinfo:
+        end_time = end_time.replace(tzinfo=timezone.utc)
+    remaining = (end_time - datetime.now(timezone.utc)).total_seconds()
+    sqs.send_message(
+        QueueUrl=EXPIRY_QUEUE_URL,
+        MessageBody=json.dumps({'bookingId': booking['bookingId'], 'endTime': booking['endTime']}),
+        DelaySeconds=max(0, min(int(remaining) + 1, MAX_SQS_DELAY_SECONDS))
+    )
+    print(f"Scheduled expiry for booking {booking['bookingId']} at {booking['endTime']}")
+
+def process_record(record):
+    """
+    Approve one booking from an SQS record. Raises on failure so the
+    message is reported back to SQS for retry.
+    """
+    # Extract booking ID from SQS message body
+    body = json.loads(record['body'])
+    booking_id = body['bookingId']
+    print(f"Processing booking approval for: {booking_id}")
+
+    # Step 1: Get booking from booking table (clients are shared across worker threads)
+    client = dynamodb.meta.client
+    booking_result = client.get_item(TableName=BOOKING_TABLE, Key={'bookingId': booking_id})
+    print(f"Booking lookup result: {booking_result}")
+
+    if 'Item' not in booking_result:
+        print(f"Booking ID {booking_id} not found in booking table.")
+        return
+
+    booking = booking_result['Item']
+    print(f"Found booking: {booking}")
+
+    # Step 2: Get bike ID from the booking
+    bike_id = booking.get('bikeId')
+    print(f"Retrieved bike_id: {bike_id} from booking: {booking_id}")
+
+    if not bike_id:
+        print(f"No bikeId found in booking {booking_id}")
+        return
+
+    # Step 3: Generate access code (reuse it when a previous attempt already stored one)
+    access_code = booking.get('accessCode') or secrets.token_hex(3).upper()
+    print(f"Generated access code: {access_code}")
+
+    # Step 4: Update booking with access code
+    client.update_item(
+        TableName=BOOKING_TABLE,
+        Key={'bookingId': booking_id},
+        UpdateExpression='SET accessCode = :ac, isUsed = :used',
+        ExpressionAttributeValues={
+            ':ac': access_code,
+            ':used': False
+        }
+    )
+    print(f"Updated booking {booking_id} with access code: {access_code}")
+
+    # Step 5: Update bike table - make bike unavailable and assign access code
+    client.update_item(
+        TableName=BIKE_TABLE,
+        Key={'bikeId': bike_id},
+        UpdateExpression='SET isActive = :inactive, accessCode = :ac',
+        ExpressionAttributeValues={
+            ':inactive': False,
+            ':ac': access_code
+        }
+    )
+    print(f"Updated bike {bike_id} - set inactive and assigned access code: {access_code}")
+
+    # Step 6: Schedule access code revocation at endTime
+    schedule_booking_expiry(booking)
+
+    # Step 7: Send booking confirmation email with access code
+    try:
+        send_booking_confirmation_email(booking, access_code)
+        print(f"Email notification sent for booking {booking_id}")
+    except Exception as email_error:
+        print(f"Failed to send email for booking {booking_id}: {email_error}")
+        # Don't fail the entire process if email fails
+        pass
+
+def process_record_safely(record):
+    """Run process_record; return the SQS messageId on failure, None on success"""
+    try:
+        process_record(record)
+        return None
+    except Exception as e:
+        print(f"Failed to process message {record.get('messageId')}: {e}")
+        import traceback
+        print(f"Traceback: {traceback.format_exc()}")
+        return record['messageId']
+
 def handler(event, context):
-    booking_table = dynamodb.Table(BOOKING_TABLE)
-    bike_table = dynamodb.Table(BIKE_TABLE)
-
-    for record in event['Records']:
-        booking_id = None
-        try:
-            # Extract booking ID from SQS message body
-            body = json.loads(record['body'])
-            booking_id = body['bookingId']
-            print(f"Processing booking approval for: {booking_id}")
-
-            # Step 1: Get booking from booking table
-            booking_result = booking_table.get_item(Key={'bookingId': booking_id})
-            print(f"Booking lookup result: {booking_result}")
-            
-            if 'Item' not in booking_result:
-                print(f"Booking ID {booking_id} not found in booking table.")
-                continue
-            
-            booking = booking_result['Item']
-            print(f"Found booking: {booking}")
+    """
+    Approve a batch of bookings concurrently. Failed messages are returned
+    as batchItemFailures (ReportBatchItemFailures) so only they are retried.
+    """
+    records = event.get('Records', [])
+    print(f"Processing {len(records)} booking approval messages")
 
-            # Step 2: Get bike ID from the booking
-            bike_id = booking.get('bikeId')
-            print(f"Retrieved bike_id: {bike_id} from booking: {booking_id}")
-            
-            if not bike_id:
-                print(f"No bikeId found in booking {booking_id}")
-                continue
-
-            # Step 3: Generate access code
-            access_code = secrets.token_hex(3).upper()
-            print(f"Generated access code: {access_code}")
-
-            # Step 4: Update booking with access code
-            booking_table.update_item(
-                Key={'bookingId': booking_id},
-                UpdateExpression='SET accessCode = :ac, isUsed = :used',
-                ExpressionAttributeValues={
-                    ':ac': access_code,
-                    ':used': False
-                }
-            )
-            print(f"Updated booking {booking_id} with access code: {access_code}")
-
-            # Step 5: Update bike table - make bike unavailable and assign access code
-            bike_table.update_item(
-                Key={'bikeId': bike_id},
-                UpdateExpression='SET isActive = :inactive, accessCode = :ac',
-                ExpressionAttributeValues={
-                    ':inactive': False,
-                    ':ac': access_code
-                }
-            )
-            print(f"Updated bike {bike_id} - set inactive and assigned access code: {access_code}")
-
-            # Step 6: Send booking confirmation email with access code
-            try:
-                send_booking_confirmation_email(booking, access_code)
-                print(f"Email notification sent for booking {booking_id}")
-            except Exception as email_error:
-                print(f"Failed to send email for booking {booking_id}: {email_error}")
-                # Don't fail the entire process if email fails
-                pass
-
-        except Exception as e:
-            booking_id_str = booking_id if booking_id else "unknown"
-            print(f"Failed to process booking {booking_id_str}: {e}")
-            import traceback
-            print(f"Traceback: {traceback.format_exc()}")
-            
+    with ThreadPoolExecutor(max_workers=max(1, min(APPROVAL_WORKERS, len(records)))) as executor:
+        failed_ids = [message_id for message_id in executor.map(process_record_safely, records) if message_id]
+
+    print(f"Approved {len(records) - len(failed_ids)} bookings, {len(failed_ids)} failed")
     return {
-        'statusCode': 200,
-        'body': json.dumps({'message': 'Processed all booking approvals.'})
-    }
\ No newline at end of file
+        'batchItemFailures': [{'itemIdentifier': message_id} for message_id in failed_ids]
+    }
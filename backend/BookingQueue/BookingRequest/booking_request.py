@@ -2,13 +2,19 @@ import json
 import uuid
 import boto3
 import os
+import time
+from datetime import datetime, timezone
 
 dynamodb = boto3.resource('dynamodb')
 sqs = boto3.client('sqs')
 
 BOOKING_TABLE = os.environ['BOOKING_TABLE_NAME']
+RESERVATIONS_TABLE = os.environ['BIKE_RESERVATIONS_TABLE_NAME']
 QUEUE_URL = os.environ['SQS_QUEUE_URL']
 
+# Optimistic retries when another request reserves the same bike concurrently
+MAX_RESERVATION_ATTEMPTS = 5
+
 def get_cors_headers():
     """Return CORS headers for API responses"""
     return {
@@ -18,6 +24,121 @@ def get_cors_headers():
         'Content-Type': 'application/json'
     }
 
+def get_recipient_snapshot(event, user_id):
+    """
+    Return the caller's contact details from the authorizer context, to be
+    stored on the booking so approval can email without a Cognito lookup.
+    Only used when the caller is the user the booking is for.
+    """
+    authorizer = (event.get('requestContext') or {}).get('authorizer') or {}
+    if authorizer.get('userId') != user_id or not authorizer.get('email'):
+        return {}
+    return {
+        'recipientEmail': authorizer['email'],
+        'recipientName': authorizer.get('givenName') or 'User'
+    }
+
+def parse_time(value):
+    """Parse an ISO timestamp (as sent by the frontend, e.g. ...Z) into naive UTC"""
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def overlaps(reservation, start, end):
+    """Half-open interval overlap: [start, end) against a reservation"""
+    return parse_time(reservation['startTime']) < end and start < parse_time(reservation['endTime'])
+
+def load_upcoming_reservations(booking_table, bike_id, now):
+    """Seed a bike's reservation list from bikeId-startTime-index (bookings not yet ended)"""
+    reservations = []
+    query_kwargs = {
+        'IndexName': 'bikeId-startTime-index',
+        'KeyConditionExpression': 'bikeId = :bikeId',
+        'ProjectionExpression': 'bookingId, startTime, endTime',
+        'ExpressionAttributeValues': {':bikeId': bike_id}
+    }
+    while True:
+        response = booking_table.query(**query_kwargs)
+        for booking in response.get('Items', []):
+            if parse_time(booking['endTime']) > now:
+                reservations.append(booking)
+        last_key = response.get('LastEvaluatedKey')
+        if not last_key:
+            return reservations
+        query_kwargs['ExclusiveStartKey'] = last_key
+
+def reserve_slot(booking_item):
+    """
+    Write the booking only if its interval is free for the bike.
+
+    Each bike has one reservations item holding its not-yet-ended intervals
+    and a version. The overlap check runs against a strongly consistent read
+    of that item, and the booking is written in the same transaction as a
+    version-conditioned update of it, so two requests racing for the same
+    bike cannot both commit. Returns the conflicting reservation, or None on
+    success.
+    """
+    booking_table = dynamodb.Table(BOOKING_TABLE)
+    reservations_table = dynamodb.Table(RESERVATIONS_TABLE)
+    client = dynamodb.meta.client
+    bike_id = booking_item['bikeId']
+    start = parse_time(booking_item['startTime'])
+    end = parse_time(booking_item['endTime'])
+
+    for attempt in range(MAX_RESERVATION_ATTEMPTS):
+        now = datetime.utcnow()
+        guard = reservations_table.get_item(Key={'bikeId': bike_id}, ConsistentRead=True).get('Item')
+        if guard:
+            reservations = guard.get('reservations', [])
+            version_condition = {
+                'ConditionExpression': '#version = :version',
+                'ExpressionAttributeNames': {'#version': 'version'},
+                'ExpressionAttributeValues': {':version': guard['version']}
+            }
+            next_version = guard['version'] + 1
+        else:
+            # First reservation for this bike since the reservations table existed
+            reservations = load_upcoming_reservations(booking_table, bike_id, now)
+            version_condition = {'ConditionExpression': 'attribute_not_exists(bikeId)'}
+            next_version = 1
+
+        # Drop reservations that have already ended
+        reservations = [r for r in reservations if parse_time(r['endTime']) > now]
+        for reservation in reservations:
+            if overlaps(reservation, start, end):
+                return reservation
+
+        reservations.append({
+            'bookingId': booking_item['bookingId'],
+            'startTime': booking_item['startTime'],
+            'endTime': booking_item['endTime']
+        })
+        try:
+            client.transact_write_items(TransactItems=[
+                {'Put': {
+                    'TableName': RESERVATIONS_TABLE,
+                    'Item': {
+                        'bikeId': bike_id,
+                        'reservations': reservations,
+                        'version': next_version,
+                        'updatedAt': now.isoformat()
+                    },
+                    **version_condition
+                }},
+                {'Put': {
+                    'TableName': BOOKING_TABLE,
+                    'Item': booking_item,
+                    'ConditionExpression': 'attribute_not_exists(bookingId)'
+                }}
+            ])
+            return None
+        except client.exceptions.TransactionCanceledException:
+            print(f"Reservation race on bike {bike_id} (attempt {attempt + 1}), retrying")
+            time.sleep(0.05 * (2 ** attempt))
+
+    raise RuntimeError(f'Could not reserve bike {bike_id} after {MAX_RESERVATION_ATTEMPTS} attempts')
+
 def handler(event, context):
     # Handle CORS preflight
     if event.get('httpMethod') == 'OPTIONS':
@@ -26,12 +147,22 @@ def handler(event, context):
             'headers': get_cors_headers(),
             'body': json.dumps({'message': 'CORS preflight successful'})
         }
-    
+
     try:
         # Parse request body
         body = json.loads(event['body'])
         booking_id = str(uuid.uuid4())
 
+        try:
+            if parse_time(body['startTime']) >= parse_time(body['endTime']):
+                raise ValueError('startTime must be before endTime')
+        except (KeyError, ValueError) as e:
+            return {
+                'statusCode': 400,
+                'headers': get_cors_headers(),
+                'body': json.dumps({'error': f'Invalid booking time: {str(e)}'})
+            }
+
         # Create booking item
         booking_item = {
             'bookingId': booking_id,
@@ -41,12 +172,26 @@ def handler(event, context):
             'endTime': body['endTime'],
             'accessCode': '',
             'price': body['price'],
-            'isUsed': False
+            'isUsed': False,
+            # Sparse pending-expiry-index key; booking_cleanup removes it on expiry
+            'pendingExpiry': 'PENDING'
         }
+        booking_item.update(get_recipient_snapshot(event, body['userId']))
 
-        # Save to DynamoDB
-        table = dynamodb.Table(BOOKING_TABLE)
-        table.put_item(Item=booking_item)
+        # Save to DynamoDB only if the bike is free for the requested slot
+        conflict = reserve_slot(booking_item)
+        if conflict:
+            return {
+                'statusCode': 409,
+                'headers': get_cors_headers(),
+                'body': json.dumps({
+                    'error': 'Bike is already booked for an overlapping time slot.',
+                    'conflict': {
+                        'startTime': conflict['startTime'],
+                        'endTime': conflict['endTime']
+                    }
+                })
+            }
 
         # Send to SQS
         sqs.send_message(
@@ -65,6 +210,7 @@ def handler(event, context):
         }
 
     except Exception as e:
+        print(f"Booking request failed: {str(e)}")
         # Return error response
         return {
             'statusCode': 500,
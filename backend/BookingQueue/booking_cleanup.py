@@ -1,58 +1,441 @@
-''' 
-This is a CloudWatch cron Lambda for scanning the bookings table 
-for the past endTime and de-activate the accessCode of the current booking
+'''
+This is a CloudWatch cron Lambda that finds bookings whose endTime has
+passed and de-activates the accessCode of the booking.
+
+Live bookings carry `pendingExpiry = 'PENDING'` (set by booking_request),
+which is the hash key of the sparse pending-expiry-index (range key endTime).
+Expiring a booking removes the attribute, so the index only ever holds
+unexpired bookings and each run costs O(live bookings), not O(history).
+
+The same function also consumes the booking expiry queue: booking_approval
+enqueues {bookingId, endTime} with an SQS delay, messages are re-enqueued in
+hops of at most 15 minutes until endTime, and the access code is revoked
+within seconds of endTime. The scheduled sweep remains as a backstop for
+bookings approved before the queue existed.
+
+Invoke with {"action": "backfill"} once to tag live bookings created before
+pendingExpiry existed. Set CLEANUP_MODE=scan (or pass {"mode": "scan"}) to
+sweep with a parallel segmented scan instead of the index, e.g. before the
+backfill has run.
+
+Sweeps read pages of at most CLEANUP_PAGE_SIZE items (never past
+CLEANUP_ITEM_BUDGET in total) and stop cleanly once the item budget is
+spent or the invocation is within CLEANUP_TIME_RESERVE_SECONDS of its
+timeout - checked between small update chunks, so even mid-page - and save
+where they stopped in the checkpoint table; the next run (or
+backfill invocation) resumes there, so a sweep of any size completes over
+several invocations. Each run logs its progress as CloudWatch metrics.
 '''
 
 import boto3
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 import os
 import json
+import math
+import random
+import threading
+import time
 
 # Initialize DynamoDB client
 dynamodb = boto3.resource('dynamodb')
 BOOKING_TABLE = os.environ['BOOKING_TABLE_NAME']
 table = dynamodb.Table(BOOKING_TABLE)
+checkpoint_table = dynamodb.Table(os.environ['CLEANUP_CHECKPOINT_TABLE_NAME'])
+sqs = boto3.client('sqs')
+EXPIRY_QUEUE_URL = os.environ.get('BOOKING_EXPIRY_QUEUE_URL')
 
-def lambda_handler(event, context):
-    now = datetime.utcnow().replace(tzinfo=timezone.utc)
-    expired_count = 0
-    errors = []
+PENDING_EXPIRY = 'PENDING'
+CLEANUP_MODE = os.environ.get('CLEANUP_MODE', 'index')
+SCAN_SEGMENTS = int(os.environ.get('CLEANUP_SCAN_SEGMENTS', '4'))
+UPDATE_WORKERS = int(os.environ.get('CLEANUP_UPDATE_WORKERS', '8'))
+MAX_THROTTLE_RETRIES = 6
+THROTTLE_ERROR_CODES = {
+    'ProvisionedThroughputExceededException',
+    'ThrottlingException',
+    'RequestLimitExceeded'
+}
+MAX_SQS_DELAY_SECONDS = 900
 
-    # Scan all bookings (pagination)
-    response = table.scan()
-    bookings = response.get('Items', [])
+# Per-invocation work budget; an unfinished sweep resumes from its checkpoint
+ITEM_BUDGET = int(os.environ.get('CLEANUP_ITEM_BUDGET', '50000'))
+TIME_RESERVE_MS = int(os.environ.get('CLEANUP_TIME_RESERVE_SECONDS', '30')) * 1000
+# Items read per query/scan call; the budget is re-checked between update chunks of a page
+PAGE_SIZE = int(os.environ.get('CLEANUP_PAGE_SIZE', '200'))
+TABLE_KEY_ATTRIBUTES = ('bookingId',)
+PENDING_EXPIRY_INDEX_KEY_ATTRIBUTES = ('bookingId', 'pendingExpiry', 'endTime')
+METRICS_NAMESPACE = 'DalScooter/BookingCleanup'
 
-    while 'LastEvaluatedKey' in response:
-        response = table.scan(ExclusiveStartKey=response['LastEvaluatedKey'])
-        bookings.extend(response.get('Items', []))
+def utc_now_iso():
+    """Current time in the frontend's toISOString() format, so it compares lexically with endTime"""
+    return datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
 
-    # Process bookings
-    for booking in bookings:
+def with_backoff(operation, **kwargs):
+    """Call a DynamoDB client operation, retrying throttling errors with jittered exponential backoff"""
+    client = table.meta.client
+    for attempt in range(MAX_THROTTLE_RETRIES):
         try:
-            end_time_str = booking.get('endTime')
-            if not end_time_str:
-                continue
-
-            end_time = datetime.fromisoformat(end_time_str).replace(tzinfo=timezone.utc)
-            is_used = booking.get('isUsed', False)
-
-            if end_time < now and not is_used:
-                table.update_item(
-                    Key={'bookingId': booking['bookingId']},
-                    UpdateExpression='SET isUsed = :used, accessCode = :code',
-                    ExpressionAttributeValues={
-                        ':used': True,
-                        ':code': ''
-                    }
-                )
-                expired_count += 1
+            return operation(**kwargs)
+        except client.exceptions.ClientError as e:
+            if e.response.get('Error', {}).get('Code') not in THROTTLE_ERROR_CODES or attempt == MAX_THROTTLE_RETRIES - 1:
+                raise
+            time.sleep(random.uniform(0, 0.05 * (2 ** attempt)))
+
+def expire_booking(booking_id, now):
+    """Revoke a booking's access code (if its endTime has passed) and drop it from pending-expiry-index"""
+    # The client (unlike the Table resource) is safe to share across worker threads
+    client = table.meta.client
+    try:
+        with_backoff(
+            client.update_item,
+            TableName=BOOKING_TABLE,
+            Key={'bookingId': booking_id},
+            UpdateExpression='SET isUsed = :used, accessCode = :code REMOVE pendingExpiry',
+            # pendingExpiry is missing on legacy bookings found by the scan mode
+            ConditionExpression='(attribute_exists(pendingExpiry) OR isUsed = :unused) AND endTime <= :now',
+            ExpressionAttributeValues={
+                ':used': True,
+                ':unused': False,
+                ':code': '',
+                ':now': now
+            }
+        )
+        return True
+    except client.exceptions.ConditionalCheckFailedException:
+        # Already expired by an overlapping run (or not yet due)
+        return False
+
+def tag_pending_expiry(booking_id):
+    """Add pendingExpiry to a live booking so pending-expiry-index can find it"""
+    client = table.meta.client
+    with_backoff(
+        client.update_item,
+        TableName=BOOKING_TABLE,
+        Key={'bookingId': booking_id},
+        UpdateExpression='SET pendingExpiry = :pending',
+        ExpressionAttributeValues={':pending': PENDING_EXPIRY}
+    )
+    return True
+
+class WorkBudget:
+    """
+    How much one invocation may do before it checkpoints and stops: items
+    examined (read from the table or index) and time left before the Lambda
+    timeout. Shared by all scan workers of the run.
+    """
+
+    def __init__(self, context, max_items=ITEM_BUDGET, reserve_ms=TIME_RESERVE_MS):
+        self._context = context
+        self._max_items = max_items
+        self._reserve_ms = reserve_ms
+        self._lock = threading.Lock()
+        self.examined = 0
+
+    def reserve(self, count, minimum=0):
+        """Claim up to count items of the budget for one read (used as its Limit)"""
+        with self._lock:
+            granted = max(min(count, self._max_items - self.examined), minimum)
+            self.examined += granted
+            return granted
+
+    def settle(self, reserved, used):
+        """Give back the part of a reservation the read did not examine"""
+        with self._lock:
+            self.examined -= reserved - used
+
+    def out_of_time(self):
+        # No context when invoked locally: only the item budget applies
+        return self._context is not None and self._context.get_remaining_time_in_millis() < self._reserve_ms
+
+    def exhausted(self):
+        return self.examined >= self._max_items or self.out_of_time()
+
+def load_checkpoint(job):
+    """Return the saved position of an unfinished sweep, or None to start from the beginning"""
+    return checkpoint_table.get_item(Key={'job': job}, ConsistentRead=True).get('Item')
+
+def save_checkpoint(job, checkpoint):
+    checkpoint_table.put_item(Item=dict(checkpoint, job=job, updatedAt=utc_now_iso()))
+
+def clear_checkpoint(job):
+    checkpoint_table.delete_item(Key={'job': job})
+
+def emit_metrics(job, metrics):
+    """Log run metrics in CloudWatch embedded metric format (no PutMetricData calls needed)"""
+    print(json.dumps({
+        '_aws': {
+            'Timestamp': int(time.time() * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': METRICS_NAMESPACE,
+                'Dimensions': [['Job']],
+                'Metrics': [{'Name': name, 'Unit': 'Count'} for name in metrics]
+            }]
+        },
+        'Job': job,
+        **metrics
+    }))
+
+def process_page(items, handle_booking, errors, budget, update_pool, key_attributes):
+    """
+    Run handle_booking over one page in chunks of UPDATE_WORKERS on the shared
+    update pool, checking the time budget between chunks. Returns (how many
+    bookings were acted on, key of the last handled item if time ran out
+    mid-page, else None) so a checkpoint can resume right after it.
+    """
+    def handle_safely(booking):
+        try:
+            return bool(handle_booking(booking['bookingId']))
         except Exception as e:
             errors.append(f"Failed for {booking.get('bookingId')}: {str(e)}")
+            return False
+
+    handled = 0
+    for start in range(0, len(items), UPDATE_WORKERS):
+        chunk = items[start:start + UPDATE_WORKERS]
+        handled += sum(update_pool.map(handle_safely, chunk))
+        if start + UPDATE_WORKERS < len(items) and budget.out_of_time():
+            return handled, {attr: chunk[-1][attr] for attr in key_attributes}
+    return handled, None
+
+def read_page(operation, read_kwargs, budget, first_page):
+    """
+    Read one page with Limit taken from the remaining item budget (at most
+    PAGE_SIZE). The first page of a sweep or segment is always read, so every
+    run makes progress. Returns the response, or None when the budget is spent.
+    """
+    limit = budget.reserve(PAGE_SIZE, minimum=1 if first_page else 0)
+    if not limit:
+        return None
+    try:
+        response = with_backoff(operation, **dict(read_kwargs, Limit=limit))
+    except Exception:
+        budget.settle(limit, 0)
+        raise
+    budget.settle(limit, response.get('ScannedCount', 0))
+    return response
+
+def sweep_pages(operation, read_kwargs, start_key, handle_booking, errors, budget, update_pool, key_attributes):
+    """
+    Page through a query or scan from start_key until it ends or the budget
+    is spent. Returns (handled, key to resume after, or None once finished).
+    """
+    handled = 0
+    first_page = True
+    while True:
+        if start_key:
+            read_kwargs['ExclusiveStartKey'] = start_key
+        if not first_page and budget.exhausted():
+            return handled, start_key
+        response = read_page(operation, read_kwargs, budget, first_page)
+        if response is None:
+            return handled, start_key
+        first_page = False
+
+        page_handled, resume_key = process_page(
+            response.get('Items', []), handle_booking, errors, budget, update_pool, key_attributes
+        )
+        handled += page_handled
+        if resume_key:
+            return handled, resume_key
+        start_key = response.get('LastEvaluatedKey')
+        if not start_key:
+            return handled, None
+
+def parallel_scan(scan_kwargs, handle_booking, errors, budget, positions=None):
+    """
+    Scan the table with SCAN_SEGMENTS Segment/TotalSegments workers. Pages
+    of at most PAGE_SIZE items are handed to a shared update pool and
+    finished before the segment reads its next page, so memory stays at
+    one page per segment.
+
+    positions maps each unfinished segment (as a string) to the key to
+    resume after ({} = from the start of the segment; every segment when
+    None). A segment stops once the budget is spent, mid-page if time runs
+    out, and always reads at least one page per run. Returns (how many
+    bookings handle_booking acted on, positions of the segments still
+    unfinished), the latter empty once the whole table has been covered.
+    """
+    client = table.meta.client
+    if positions is None:
+        positions = {str(segment): {} for segment in range(SCAN_SEGMENTS)}
+
+    def scan_segment(segment):
+        segment_kwargs = dict(scan_kwargs, TableName=BOOKING_TABLE, Segment=int(segment), TotalSegments=SCAN_SEGMENTS)
+        return sweep_pages(
+            client.scan, segment_kwargs, positions[segment], handle_booking,
+            errors, budget, update_pool, TABLE_KEY_ATTRIBUTES
+        )
+
+    segments = list(positions)
+    with ThreadPoolExecutor(max_workers=UPDATE_WORKERS) as update_pool:
+        with ThreadPoolExecutor(max_workers=max(len(segments), 1)) as segment_pool:
+            results = list(segment_pool.map(scan_segment, segments))
+
+    remaining = {segment: last_key for segment, (_, last_key) in zip(segments, results) if last_key}
+    return sum(handled for handled, _ in results), remaining
+
+def checkpointed_scan(scan_kwargs, handle_booking):
+    """Adapt parallel_scan to run_checkpointed; a checkpoint from another segment count is restarted"""
+    def sweep(errors, budget, position):
+        if position and int(position.get('totalSegments', 0)) != SCAN_SEGMENTS:
+            print(f"Checkpoint was taken with {position.get('totalSegments')} segments, restarting the scan")
+            position = None
+        handled, remaining = parallel_scan(
+            scan_kwargs, handle_booking, errors, budget,
+            position['segments'] if position else None
+        )
+        return handled, {'totalSegments': SCAN_SEGMENTS, 'segments': remaining} if remaining else None
+    return sweep
+
+def backfill_pending_expiry():
+    """Tag live bookings that predate pendingExpiry so the index can find them"""
+    return checkpointed_scan({
+        'FilterExpression': 'isUsed = :unused AND attribute_not_exists(pendingExpiry) AND attribute_exists(endTime)',
+        'ProjectionExpression': 'bookingId',
+        'ExpressionAttributeValues': {':unused': False}
+    }, tag_pending_expiry)
+
+def expire_by_scan(now):
+    """Scan mode: find unexpired bookings past endTime with a parallel segmented scan"""
+    return checkpointed_scan({
+        'FilterExpression': 'isUsed = :unused AND endTime < :now',
+        'ProjectionExpression': 'bookingId',
+        'ExpressionAttributeValues': {':unused': False, ':now': now}
+    }, lambda booking_id: expire_booking(booking_id, now))
+
+def expire_by_index(now):
+    """Index mode: page through live bookings already past endTime in pending-expiry-index"""
+    def sweep(errors, budget, position):
+        query_kwargs = {
+            'TableName': BOOKING_TABLE,
+            'IndexName': 'pending-expiry-index',
+            'KeyConditionExpression': 'pendingExpiry = :pending AND endTime < :now',
+            'ExpressionAttributeValues': {
+                ':pending': PENDING_EXPIRY,
+                ':now': now
+            }
+        }
+        with ThreadPoolExecutor(max_workers=UPDATE_WORKERS) as update_pool:
+            return sweep_pages(
+                table.meta.client.query, query_kwargs, position,
+                lambda booking_id: expire_booking(booking_id, now),
+                errors, budget, update_pool, PENDING_EXPIRY_INDEX_KEY_ATTRIBUTES
+            )
+    return sweep
+
+def run_checkpointed(job, sweep, errors, budget):
+    """
+    Run one budgeted slice of a sweep. The sweep resumes from the job's
+    checkpoint, and where it stopped is saved for the next invocation (or
+    the checkpoint is cleared once it reaches the end), so a sweep larger
+    than one invocation still completes over several. Returns progress
+    metrics for the run.
+    """
+    checkpoint = load_checkpoint(job)
+    handled, position = sweep(errors, budget, checkpoint['position'] if checkpoint else None)
+
+    # Totals for the whole sweep, carried across the invocations it spans
+    runs = int(checkpoint['runs']) + 1 if checkpoint else 1
+    sweep_examined = (int(checkpoint['examined']) if checkpoint else 0) + budget.examined
+    sweep_handled = (int(checkpoint['handled']) if checkpoint else 0) + handled
+    if position:
+        save_checkpoint(job, {
+            'position': position,
+            'startedAt': checkpoint['startedAt'] if checkpoint else utc_now_iso(),
+            'runs': runs,
+            'examined': sweep_examined,
+            'handled': sweep_handled
+        })
+    elif checkpoint:
+        clear_checkpoint(job)
+
+    metrics = {
+        'ItemsExamined': budget.examined,
+        'ItemsHandled': handled,
+        'Errors': len(errors),
+        'Resumed': int(checkpoint is not None),
+        'Completed': int(position is None),
+        'SweepRuns': runs,
+        'SweepItemsExamined': sweep_examined,
+        'SweepItemsHandled': sweep_handled
+    }
+    emit_metrics(job, metrics)
+    return metrics
+
+def seconds_until(timestamp):
+    """Seconds from now until an ISO timestamp such as endTime (negative once passed)"""
+    target = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+    if target.tzinfo:
+        target = target.astimezone(timezone.utc).replace(tzinfo=None)
+    return (target - datetime.utcnow()).total_seconds()
+
+def handle_expiry_messages(records):
+    """
+    Consume booking expiry timers. A message whose endTime has not passed
+    yet is sent back with the remaining delay (SQS allows at most 15 minutes
+    per hop); a due one expires the booking immediately.
+    """
+    failures = []
+    for record in records:
+        try:
+            body = json.loads(record['body'])
+            remaining = seconds_until(body['endTime'])
+        except (ValueError, KeyError) as e:
+            # Malformed timer: retrying cannot fix it, the sweep is the backstop
+            print(f"Dropping malformed expiry message {record.get('messageId')}: {str(e)}")
+            continue
+        try:
+            if remaining > 0:
+                sqs.send_message(
+                    QueueUrl=EXPIRY_QUEUE_URL,
+                    MessageBody=record['body'],
+                    DelaySeconds=min(math.ceil(remaining), MAX_SQS_DELAY_SECONDS)
+                )
+            elif expire_booking(body['bookingId'], utc_now_iso()):
+                print(f"Expired booking {body['bookingId']} ({-remaining:.1f}s after endTime)")
+        except Exception as e:
+            print(f"Failed to handle expiry message {record.get('messageId')}: {str(e)}")
+            failures.append({'itemIdentifier': record['messageId']})
+    return {'batchItemFailures': failures}
+
+def lambda_handler(event, context):
+    event = event or {}
+    errors = []
+
+    if event.get('Records'):
+        return handle_expiry_messages(event['Records'])
+
+    budget = WorkBudget(context)
+
+    if event.get('action') == 'backfill':
+        progress = run_checkpointed('backfill', backfill_pending_expiry(), errors, budget)
+        message = f"Tagged {progress['ItemsHandled']} live bookings with pendingExpiry"
+        if not progress['Completed']:
+            message += '; budget reached, invoke again to continue'
+        return {
+            'statusCode': 200,
+            'body': json.dumps({
+                'message': message,
+                'progress': progress,
+                'errors': errors
+            })
+        }
+
+    now = utc_now_iso()
+    mode = event.get('mode') or CLEANUP_MODE
+    if mode == 'scan':
+        progress = run_checkpointed('expire-scan', expire_by_scan(now), errors, budget)
+    else:
+        progress = run_checkpointed('expire-index', expire_by_index(now), errors, budget)
 
+    message = f"Processed bookings ({mode} mode). Expired updated: {progress['ItemsHandled']}"
+    if not progress['Completed']:
+        message += '; budget reached, resuming from checkpoint next run'
     return {
         'statusCode': 200,
         'body': json.dumps({
-            'message': f'Processed bookings. Expired updated: {expired_count}',
+            'message': message,
+            'progress': progress,
             'errors': errors
         })
     }
@@ -1,11 +1,18 @@
 import json
 import boto3
 import os
+import base64
+from datetime import datetime
 from decimal import Decimal
 
 dynamodb = boto3.resource('dynamodb')
 BOOKING_TABLE = os.environ['BOOKING_TABLE_NAME']
 
+# A user's bookings ordered by startTime
+USER_BOOKINGS_INDEX = 'userId-startTime-index'
+MAX_PAGE_SIZE = 100
+BOOKING_VIEWS = ('all', 'upcoming', 'past')
+
 def decimal_default(obj):
     """JSON serializer for objects not serializable by default json code"""
     if isinstance(obj, Decimal):
@@ -21,6 +28,94 @@ def get_cors_headers():
         'Content-Type': 'application/json'
     }
 
+def utc_now_iso():
+    """Current time in the frontend's toISOString() format, so it compares lexically with startTime"""
+    return datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+def encode_cursor(last_evaluated_key, view, boundary):
+    """
+    Encode a DynamoDB LastEvaluatedKey as an opaque, URL-safe cursor. The
+    view and its startTime boundary travel with the key, so later pages
+    query the same range the key was read from.
+    """
+    if not last_evaluated_key:
+        return None
+    payload = {'view': view, 'now': boundary, 'key': last_evaluated_key}
+    raw = json.dumps(payload, default=decimal_default, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('utf-8').rstrip('=')
+
+def decode_cursor(cursor, user_id, view):
+    """
+    Decode an opaque cursor back into (ExclusiveStartKey, startTime boundary)
+    for this user and view; (None, None) without a cursor. Raises ValueError
+    if the cursor is malformed or was issued for another user or view.
+    """
+    if not cursor:
+        return None, None
+    try:
+        # Add padding if needed
+        padding = len(cursor) % 4
+        if padding:
+            cursor += '=' * (4 - padding)
+        payload = json.loads(base64.urlsafe_b64decode(cursor).decode('utf-8'))
+    except Exception:
+        raise ValueError('Invalid pagination cursor')
+    if not isinstance(payload, dict) or payload.get('view') != view:
+        raise ValueError('Invalid pagination cursor')
+    start_key = payload.get('key')
+    boundary = payload.get('now')
+    if not isinstance(start_key, dict) or start_key.get('userId') != user_id \
+            or 'bookingId' not in start_key or 'startTime' not in start_key:
+        raise ValueError('Invalid pagination cursor')
+    if (view == 'all') != (boundary is None) or (boundary is not None and not isinstance(boundary, str)):
+        raise ValueError('Invalid pagination cursor')
+    return start_key, boundary
+
+def parse_page_size(query_params):
+    """Return the requested page size, or None when the caller wants every page"""
+    limit = query_params.get('limit')
+    if limit in (None, ''):
+        return None
+    try:
+        page_size = int(limit)
+    except (ValueError, TypeError):
+        raise ValueError('limit must be an integer')
+    if page_size < 1:
+        raise ValueError('limit must be greater than 0')
+    return min(page_size, MAX_PAGE_SIZE)
+
+def parse_view(query_params):
+    """
+    Return the requested view. Views split on startTime (the index range
+    key): upcoming = not started yet, past = already started, so a booking
+    in progress is listed under past.
+    """
+    view = (query_params.get('view') or 'all').lower()
+    if view not in BOOKING_VIEWS:
+        raise ValueError(f"view must be one of: {', '.join(BOOKING_VIEWS)}")
+    return view
+
+def build_user_bookings_query(user_id, view, boundary):
+    """
+    Query a user's bookings from userId-startTime-index, narrowed by view on
+    the range key at the given startTime boundary. Upcoming bookings are
+    listed soonest first, everything else newest first.
+    """
+    key_condition = 'userId = :uid'
+    values = {':uid': user_id}
+    if view == 'upcoming':
+        key_condition += ' AND startTime >= :now'
+        values[':now'] = boundary
+    elif view == 'past':
+        key_condition += ' AND startTime < :now'
+        values[':now'] = boundary
+    return {
+        'IndexName': USER_BOOKINGS_INDEX,
+        'KeyConditionExpression': key_condition,
+        'ExpressionAttributeValues': values,
+        'ScanIndexForward': view == 'upcoming'
+    }
+
 def lambda_handler(event, context):
     # Handle CORS preflight
     if event.get('httpMethod') == 'OPTIONS':
@@ -51,34 +146,66 @@ def lambda_handler(event, context):
                 'body': json.dumps({'error': 'userId parameter is required'}, default=decimal_default)
             }
 
+        query_params = event.get('queryStringParameters') or {}
+        try:
+            page_size = parse_page_size(query_params)
+            view = parse_view(query_params)
+            start_key, boundary = decode_cursor(query_params.get('cursor'), user_id, view)
+        except ValueError as e:
+            return {
+                'statusCode': 400,
+                'headers': get_cors_headers(),
+                'body': json.dumps({'success': False, 'error': str(e)}, default=decimal_default)
+            }
+
         # Initialize DynamoDB table
         table = dynamodb.Table(BOOKING_TABLE)
-        
-        # Scan the table to find bookings for the specific user
-        response = table.scan(
-            FilterExpression=boto3.dynamodb.conditions.Attr('userId').eq(user_id)
-        )
-        
-        bookings = response.get('Items', [])
-        
-        # Handle pagination if needed
-        while 'LastEvaluatedKey' in response:
-            response = table.scan(
-                FilterExpression=boto3.dynamodb.conditions.Attr('userId').eq(user_id),
-                ExclusiveStartKey=response['LastEvaluatedKey']
-            )
+        # The first page fixes the boundary; later pages reuse it from the cursor
+        if view != 'all' and boundary is None:
+            boundary = utc_now_iso()
+        params = build_user_bookings_query(user_id, view, boundary)
+
+        # Read until the page is full or the user's bookings are exhausted; without
+        # a limit every page is followed. Limit shrinks on each call so the cursor
+        # points at the last booking returned and never skips one.
+        bookings = []
+        while True:
+            if start_key:
+                params['ExclusiveStartKey'] = start_key
+            if page_size:
+                params['Limit'] = page_size - len(bookings)
+
+            try:
+                response = table.query(**params)
+            except table.meta.client.exceptions.ClientError as e:
+                # A well-formed cursor whose key DynamoDB still rejects (e.g. one
+                # outside the query's startTime range) is the caller's error
+                if 'ExclusiveStartKey' in params and not bookings \
+                        and e.response.get('Error', {}).get('Code') == 'ValidationException':
+                    return {
+                        'statusCode': 400,
+                        'headers': get_cors_headers(),
+                        'body': json.dumps({'success': False, 'error': 'Invalid pagination cursor'}, default=decimal_default)
+                    }
+                raise
             bookings.extend(response.get('Items', []))
-        
-        # Sort bookings by startTime (most recent first)
-        bookings.sort(key=lambda x: x.get('startTime', ''), reverse=True)
-        
+            start_key = response.get('LastEvaluatedKey')
+
+            if not start_key or (page_size and len(bookings) >= page_size):
+                break
+
+        next_cursor = encode_cursor(start_key, view, boundary)
+
         return {
             'statusCode': 200,
             'headers': get_cors_headers(),
             'body': json.dumps({
                 'success': True,
                 'bookings': bookings,
-                'count': len(bookings)
+                'count': len(bookings),
+                'view': view,
+                'nextCursor': next_cursor,
+                'hasMore': next_cursor is not None
             }, default=decimal_default)
         }
         
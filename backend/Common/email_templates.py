@@ -0,0 +1,39 @@
+"""
+Email Template Engine
+=====================
+Shared by the Lambdas that send HTML email (Registration, admin_creation,
+booking_approval); packaged next to each handler by Terraform.
+
+A template is parsed once at import into alternating literal and
+placeholder segments, so rendering is a single join instead of one
+str.replace pass over the whole document per placeholder. Placeholders are
+`{name}` with an identifier inside; CSS blocks such as `body { ... }` are
+left untouched. Values are HTML-escaped.
+"""
+import html
+import re
+
+PLACEHOLDER_PATTERN = re.compile(r'\{([A-Za-z_][A-Za-z0-9_]*)\}')
+
+class MissingTemplateValuesError(KeyError):
+    """Raised when render() is called without a value for every placeholder"""
+
+class EmailTemplate:
+    """A template compiled into literal / placeholder segments"""
+
+    def __init__(self, source):
+        # Even indexes hold literals, odd indexes placeholder names
+        self._segments = PLACEHOLDER_PATTERN.split(source)
+        self.placeholders = frozenset(self._segments[1::2])
+
+    def render(self, **values):
+        """Render with HTML-escaped values; raise MissingTemplateValuesError listing absent keys"""
+        missing = self.placeholders.difference(values)
+        if missing:
+            raise MissingTemplateValuesError(f"Missing template values: {', '.join(sorted(missing))}")
+
+        escaped = {key: html.escape(str(values[key])) for key in self.placeholders}
+        parts = self._segments[:]
+        for index in range(1, len(parts), 2):
+            parts[index] = escaped[parts[index]]
+        return ''.join(parts)
@@ -3,6 +3,7 @@ import boto3
 import hashlib
 import os
 from datetime import datetime
+from email_templates import EmailTemplate
 
 cognito = boto3.client('cognito-idp')
 dynamodb = boto3.resource('dynamodb')
@@ -82,17 +83,14 @@ WELCOME_EMAIL_TEMPLATE = """<!DOCTYPE html>
 </body>
 </html>"""
 
+# Parsed once per container; rendering is a single join
+WELCOME_EMAIL = EmailTemplate(WELCOME_EMAIL_TEMPLATE)
+
 def get_email_template(**kwargs):
     """
     Return the email template with placeholders replaced with provided values
     """
-    template = WELCOME_EMAIL_TEMPLATE
-    
-    # Replace placeholders with actual values
-    for key, value in kwargs.items():
-        template = template.replace(f"{{{key}}}", value)
-        
-    return template
+    return WELCOME_EMAIL.render(**kwargs)
 
 def lambda_handler(event, context):
     print(f"Registration request: {json.dumps(event, indent=2)}")
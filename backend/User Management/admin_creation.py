@@ -2,6 +2,7 @@ import json
 import boto3
 import os
 import datetime
+from email_templates import EmailTemplate
  
 cognito = boto3.client('cognito-idp')
 dynamodb = boto3.resource('dynamodb')
@@ -113,17 +114,14 @@ FRANCHISE_PROMOTION_TEMPLATE = """<!DOCTYPE html>
 </body>
 </html>"""
 
+# Parsed once per container; rendering is a single join
+FRANCHISE_PROMOTION_EMAIL = EmailTemplate(FRANCHISE_PROMOTION_TEMPLATE)
+
 def get_franchise_promotion_email_template(**kwargs):
     """
     Return the franchise promotion email template with placeholders replaced with provided values
     """
-    template = FRANCHISE_PROMOTION_TEMPLATE
-    
-    # Replace placeholders with actual values
-    for key, value in kwargs.items():
-        template = template.replace(f"{{{key}}}", value)
-        
-    return template
+    return FRANCHISE_PROMOTION_EMAIL.render(**kwargs)
 
 def get_user_attributes(email):
     """Fetches user attributes from Cognito"""
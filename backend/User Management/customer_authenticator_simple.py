@@ -99,6 +99,7 @@ def lambda_handler(event, context):
         context_data = {
             'userId': claims.get('sub', ''),
             'email': claims.get('email', ''),
+            'givenName': claims.get('given_name', ''),
             'groups': ','.join(cognito_groups)
         }
         
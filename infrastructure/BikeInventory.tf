@@ -14,6 +14,10 @@ resource "aws_dynamodb_table" "bikes" {
   billing_mode = "PAY_PER_REQUEST"
   hash_key     = "bikeId"
 
+  # Stream feeds the availability counter aggregator
+  stream_enabled   = true
+  stream_view_type = "NEW_AND_OLD_IMAGES"
+
   attribute {
     name = "bikeId"
     type = "S"
@@ -34,6 +38,16 @@ resource "aws_dynamodb_table" "bikes" {
     type = "S"
   }
 
+  attribute {
+    name = "geoCell"
+    type = "S"
+  }
+
+  attribute {
+    name = "geohash"
+    type = "S"
+  }
+
   # Global Secondary Index for querying by bike type
   global_secondary_index {
     name            = "bikeType-index"
@@ -55,6 +69,14 @@ resource "aws_dynamodb_table" "bikes" {
     projection_type = "ALL"
   }
 
+  # Global Secondary Index for nearby search: coarse geohash cell + full geohash
+  global_secondary_index {
+    name            = "geoCell-geohash-index"
+    hash_key        = "geoCell"
+    range_key       = "geohash"
+    projection_type = "ALL"
+  }
+
   tags = {
     Name    = "DALScooter Bikes"
     Project = "DALScooter"
@@ -101,7 +123,8 @@ resource "aws_dynamodb_table" "discount_codes" {
     projection_type = "ALL"
   }
 
-  # Global Secondary Index for querying by expiry date
+  # Global Secondary Index for querying by expiry hour bucket (YYYY-MM-DDTHH),
+  # used by the discount expiry sweeper
   global_secondary_index {
     name            = "expiryDate-index"
     hash_key        = "expiryDate"
@@ -156,7 +179,22 @@ resource "aws_dynamodb_table" "user_discount_usage" {
   }
 }
 
+# Bike Availability Counters Table - Materialized counts per franchiseId x bikeType
+resource "aws_dynamodb_table" "bike_availability_counters" {
+  name         = "dalscooter-bike-availability-counters"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "counterId"
 
+  attribute {
+    name = "counterId"
+    type = "S"
+  }
+
+  tags = {
+    Name    = "DALScooter Bike Availability Counters"
+    Project = "DALScooter"
+  }
+}
 
 # ================================
 # OUTPUT VALUES
@@ -191,3 +229,13 @@ output "user_discount_usage_table_arn" {
   description = "ARN of the user discount usage DynamoDB table"
   value       = aws_dynamodb_table.user_discount_usage.arn
 }
+
+output "bike_availability_counters_table_name" {
+  description = "Name of the bike availability counters DynamoDB table"
+  value       = aws_dynamodb_table.bike_availability_counters.name
+}
+
+output "bike_availability_counters_table_arn" {
+  description = "ARN of the bike availability counters DynamoDB table"
+  value       = aws_dynamodb_table.bike_availability_counters.arn
+}
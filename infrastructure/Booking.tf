@@ -79,6 +79,24 @@ resource "aws_sqs_queue" "booking_queue" {
   delay_seconds              = 0
 }
 
+# Bike Reservations Table - one item per bike holding its not-yet-ended booking
+# intervals and a version, so booking_request can reserve slots with a conditional write
+resource "aws_dynamodb_table" "bike_reservations" {
+  name         = "dalscooter-bike-reservations"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "bikeId"
+
+  attribute {
+    name = "bikeId"
+    type = "S"
+  }
+
+  tags = {
+    Name    = "DALScooter Bike Reservations"
+    Project = "DALScooter"
+  }
+}
+
 data "archive_file" "booking_request" {
   type        = "zip"
   source_file = "${path.module}/../backend/BookingQueue/BookingRequest/booking_request.py"
@@ -87,8 +105,17 @@ data "archive_file" "booking_request" {
 
 data "archive_file" "booking_approval" {
   type        = "zip"
-  source_file = "${path.module}/../backend/BookingQueue/BookingApproval/booking_approval.py"
   output_path = "${path.module}/packages/booking_approve.zip"
+
+  source {
+    content  = file("${path.module}/../backend/BookingQueue/BookingApproval/booking_approval.py")
+    filename = "booking_approval.py"
+  }
+
+  source {
+    content  = file("${path.module}/../backend/Common/email_templates.py")
+    filename = "email_templates.py"
+  }
 }
 # BookingRequest Lambda 
 resource "aws_lambda_function" "booking_request" {
@@ -101,8 +128,9 @@ resource "aws_lambda_function" "booking_request" {
 
   environment {
     variables = {
-      SQS_QUEUE_URL      = aws_sqs_queue.booking_queue.id
-      BOOKING_TABLE_NAME = aws_dynamodb_table.booking_table.name
+      SQS_QUEUE_URL                = aws_sqs_queue.booking_queue.id
+      BOOKING_TABLE_NAME           = aws_dynamodb_table.booking_table.name
+      BIKE_RESERVATIONS_TABLE_NAME = aws_dynamodb_table.bike_reservations.name
     }
   }
 
@@ -123,13 +151,17 @@ resource "aws_lambda_function" "booking_approval" {
   filename         = data.archive_file.booking_approval.output_path
   source_code_hash = data.archive_file.booking_approval.output_base64sha256
   role             = aws_iam_role.lambda_exec_role.arn
+  timeout          = 30
 
   environment {
     variables = {
-      BOOKING_TABLE_NAME     = aws_dynamodb_table.booking_table.name
-      BIKE_TABLE_NAME        = aws_dynamodb_table.bikes.name
-      COGNITO_USER_POOL_ID   = aws_cognito_user_pool.pool.id
-      SIGNUP_LOGIN_TOPIC_ARN = aws_sns_topic.user_signup_login.arn
+      BOOKING_TABLE_NAME       = aws_dynamodb_table.booking_table.name
+      BIKE_TABLE_NAME          = aws_dynamodb_table.bikes.name
+      COGNITO_USER_POOL_ID     = aws_cognito_user_pool.pool.id
+      SIGNUP_LOGIN_TOPIC_ARN   = aws_sns_topic.user_signup_login.arn
+      APPROVAL_WORKERS         = "10"
+      USER_CACHE_TTL_SECONDS   = "300"
+      BOOKING_EXPIRY_QUEUE_URL = aws_sqs_queue.booking_expiry_queue.id
     }
   }
 
@@ -140,10 +172,12 @@ resource "aws_lambda_function" "booking_approval" {
 
 # SQS → BookingApproval Lambda Trigger
 resource "aws_lambda_event_source_mapping" "sqs_trigger" {
-  event_source_arn = aws_sqs_queue.booking_queue.arn
-  function_name    = aws_lambda_function.booking_approval.arn
-  batch_size       = 1
-  enabled          = true
+  event_source_arn                   = aws_sqs_queue.booking_queue.arn
+  function_name                      = aws_lambda_function.booking_approval.arn
+  batch_size                         = 10
+  maximum_batching_window_in_seconds = 1
+  function_response_types            = ["ReportBatchItemFailures"]
+  enabled                            = true
 }
 
 # ================================
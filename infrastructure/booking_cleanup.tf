@@ -25,11 +25,34 @@ resource "aws_iam_role_policy" "booking_cleanup_policy" {
         Effect = "Allow",
         Action = [
           "dynamodb:Scan",
+          "dynamodb:Query",
           "dynamodb:UpdateItem",
           "dynamodb:GetItem"
         ],
          
-        Resource = aws_dynamodb_table.booking_table.arn
+        Resource = [
+          aws_dynamodb_table.booking_table.arn,
+          "${aws_dynamodb_table.booking_table.arn}/index/*"
+        ]
+      },
+      {
+        Effect = "Allow",
+        Action = [
+          "dynamodb:GetItem",
+          "dynamodb:PutItem",
+          "dynamodb:DeleteItem"
+        ],
+        Resource = aws_dynamodb_table.booking_cleanup_checkpoints.arn
+      },
+      {
+        Effect = "Allow",
+        Action = [
+          "sqs:ReceiveMessage",
+          "sqs:DeleteMessage",
+          "sqs:GetQueueAttributes",
+          "sqs:SendMessage"
+        ],
+        Resource = aws_sqs_queue.booking_expiry_queue.arn
       },
       {
         Effect = "Allow",
@@ -57,7 +80,58 @@ resource "aws_dynamodb_table" "booking_table" {
     type = "S"
   }
 
+  attribute {
+    name = "bikeId"
+    type = "S"
+  }
+
+  attribute {
+    name = "userId"
+    type = "S"
+  }
+
+  attribute {
+    name = "startTime"
+    type = "S"
+  }
+
+  attribute {
+    name = "pendingExpiry"
+    type = "S"
+  }
+
+  attribute {
+    name = "endTime"
+    type = "S"
+  }
+
   hash_key = "bookingId"
+
+  # Global Secondary Index for a bike's bookings ordered by start time
+  global_secondary_index {
+    name               = "bikeId-startTime-index"
+    hash_key           = "bikeId"
+    range_key          = "startTime"
+    projection_type    = "INCLUDE"
+    non_key_attributes = ["endTime"]
+  }
+
+  # Global Secondary Index for a customer's booking history, queried newest first
+  global_secondary_index {
+    name            = "userId-startTime-index"
+    hash_key        = "userId"
+    range_key       = "startTime"
+    projection_type = "ALL"
+  }
+
+  # Sparse index of live bookings: pendingExpiry exists only until booking_cleanup
+  # expires the booking, so queries touch unexpired bookings only
+  global_secondary_index {
+    name            = "pending-expiry-index"
+    hash_key        = "pendingExpiry"
+    range_key       = "endTime"
+    projection_type = "KEYS_ONLY"
+  }
   
   tags = {
     Name    = "DALScooter Booking Table"
@@ -65,6 +139,24 @@ resource "aws_dynamodb_table" "booking_table" {
   }
 }
 
+# Where an unfinished cleanup sweep resumes - one item per job holding its
+# LastEvaluatedKey (per segment in scan mode), kept out of the booking table
+resource "aws_dynamodb_table" "booking_cleanup_checkpoints" {
+  name         = "dalscooter-booking-cleanup-checkpoints"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "job"
+
+  attribute {
+    name = "job"
+    type = "S"
+  }
+
+  tags = {
+    Name    = "DALScooter Booking Cleanup Checkpoints"
+    Project = "DALScooter"
+  }
+}
+
 data "archive_file" "booking_cleanup_zip" {
   type        = "zip"
   source_file = "${path.module}/../backend/BookingQueue/booking_cleanup.py"
@@ -86,15 +178,43 @@ resource "aws_lambda_function" "booking_cleanup" {
   runtime          = "python3.9"
   role             = aws_iam_role.booking_cleanup_lambda_role.arn
   source_code_hash = data.archive_file.booking_cleanup_zip.output_base64sha256
+  # Stay well inside the 5-minute schedule so runs never overlap
+  timeout          = 240
 
   environment {
     variables = {
-      BOOKING_TABLE_NAME = var.booking_table_name
+      BOOKING_TABLE_NAME            = var.booking_table_name
+      CLEANUP_MODE                  = "index"
+      CLEANUP_SCAN_SEGMENTS         = "4"
+      CLEANUP_UPDATE_WORKERS        = "8"
+      CLEANUP_CHECKPOINT_TABLE_NAME = aws_dynamodb_table.booking_cleanup_checkpoints.name
+      CLEANUP_ITEM_BUDGET           = "50000"
+      CLEANUP_TIME_RESERVE_SECONDS  = "30"
+      CLEANUP_PAGE_SIZE             = "200"
+      BOOKING_EXPIRY_QUEUE_URL      = aws_sqs_queue.booking_expiry_queue.id
     }
   }
 }
 
-# EventBridge Rule - triggers every 5 minutes
+# Booking expiry timers - booking_approval enqueues {bookingId, endTime} with a
+# delay; booking_cleanup re-enqueues until endTime and then revokes the access code
+resource "aws_sqs_queue" "booking_expiry_queue" {
+  name                       = "dal-booking-expiry-queue"
+  visibility_timeout_seconds = 300
+  message_retention_seconds  = 345600
+  receive_wait_time_seconds  = 5
+}
+
+# SQS → booking cleanup Lambda trigger for expiry timers
+resource "aws_lambda_event_source_mapping" "booking_expiry_trigger" {
+  event_source_arn        = aws_sqs_queue.booking_expiry_queue.arn
+  function_name           = aws_lambda_function.booking_cleanup.arn
+  batch_size              = 10
+  function_response_types = ["ReportBatchItemFailures"]
+  enabled                 = true
+}
+
+# EventBridge Rule - triggers every 5 minutes (backstop for bookings without an expiry timer)
 resource "aws_cloudwatch_event_rule" "booking_cleanup_schedule" {
   name                = "booking-cleanup-schedule"
   schedule_expression = "rate(5 minutes)"
@@ -47,6 +47,9 @@ module "lambda" {
   # Bike Inventory references
   bikes_table_name               = aws_dynamodb_table.bikes.name
   bikes_table_arn                = aws_dynamodb_table.bikes.arn
+  bikes_table_stream_arn         = aws_dynamodb_table.bikes.stream_arn
+  bike_counters_table_name       = aws_dynamodb_table.bike_availability_counters.name
+  bike_counters_table_arn        = aws_dynamodb_table.bike_availability_counters.arn
   discount_codes_table_name      = aws_dynamodb_table.discount_codes.name
   discount_codes_table_arn       = aws_dynamodb_table.discount_codes.arn
   user_discount_usage_table_name = aws_dynamodb_table.user_discount_usage.name
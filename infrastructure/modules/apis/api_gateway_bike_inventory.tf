@@ -29,9 +29,13 @@ resource "aws_api_gateway_method" "bikes_get" {
   authorizer_id = aws_api_gateway_authorizer.franchise_authorizer.id
 
   request_parameters = {
-    "method.request.querystring.bikeType"    = false
-    "method.request.querystring.status"      = false
-    "method.request.querystring.franchiseId" = false
+    "method.request.querystring.bikeType"        = false
+    "method.request.querystring.status"          = false
+    "method.request.querystring.franchiseId"     = false
+    "method.request.querystring.includeInactive" = false
+    "method.request.querystring.limit"           = false
+    "method.request.querystring.cursor"          = false
+    "method.request.querystring.fields"          = false
   }
 }
 
@@ -70,6 +74,15 @@ resource "aws_api_gateway_method" "bike_delete" {
   }
 }
 
+# DELETE method for retiring many bikes at once (Admin only)
+resource "aws_api_gateway_method" "bikes_delete" {
+  rest_api_id   = aws_api_gateway_rest_api.dalscooter_apis.id
+  resource_id   = aws_api_gateway_resource.bikes.id
+  http_method   = "DELETE"
+  authorization = "CUSTOM"
+  authorizer_id = aws_api_gateway_authorizer.franchise_authorizer.id
+}
+
 # Integration for GET bikes
 resource "aws_api_gateway_integration" "bikes_get_integration" {
   rest_api_id = aws_api_gateway_rest_api.dalscooter_apis.id
@@ -81,9 +94,13 @@ resource "aws_api_gateway_integration" "bikes_get_integration" {
   uri                     = var.bike_management_lambda_invoke_arn
 
   request_parameters = {
-    "integration.request.querystring.bikeType"    = "method.request.querystring.bikeType"
-    "integration.request.querystring.status"      = "method.request.querystring.status"
-    "integration.request.querystring.franchiseId" = "method.request.querystring.franchiseId"
+    "integration.request.querystring.bikeType"        = "method.request.querystring.bikeType"
+    "integration.request.querystring.status"          = "method.request.querystring.status"
+    "integration.request.querystring.franchiseId"     = "method.request.querystring.franchiseId"
+    "integration.request.querystring.includeInactive" = "method.request.querystring.includeInactive"
+    "integration.request.querystring.limit"           = "method.request.querystring.limit"
+    "integration.request.querystring.cursor"          = "method.request.querystring.cursor"
+    "integration.request.querystring.fields"          = "method.request.querystring.fields"
   }
 }
 
@@ -98,6 +115,17 @@ resource "aws_api_gateway_integration" "bikes_post_integration" {
   uri                     = var.bike_management_lambda_invoke_arn
 }
 
+# Integration for batch DELETE bikes
+resource "aws_api_gateway_integration" "bikes_delete_integration" {
+  rest_api_id = aws_api_gateway_rest_api.dalscooter_apis.id
+  resource_id = aws_api_gateway_resource.bikes.id
+  http_method = aws_api_gateway_method.bikes_delete.http_method
+
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = var.bike_management_lambda_invoke_arn
+}
+
 # Integration for PUT bike
 resource "aws_api_gateway_integration" "bike_put_integration" {
   rest_api_id = aws_api_gateway_rest_api.dalscooter_apis.id
@@ -128,6 +156,80 @@ resource "aws_api_gateway_integration" "bike_delete_integration" {
   }
 }
 
+# API Gateway Resource for bulk bike import
+resource "aws_api_gateway_resource" "bikes_bulk" {
+  rest_api_id = aws_api_gateway_rest_api.dalscooter_apis.id
+  parent_id   = aws_api_gateway_resource.bikes.id
+  path_part   = "bulk"
+}
+
+# POST method for bulk bike import (Admin only)
+resource "aws_api_gateway_method" "bikes_bulk_post" {
+  rest_api_id   = aws_api_gateway_rest_api.dalscooter_apis.id
+  resource_id   = aws_api_gateway_resource.bikes_bulk.id
+  http_method   = "POST"
+  authorization = "CUSTOM"
+  authorizer_id = aws_api_gateway_authorizer.franchise_authorizer.id
+}
+
+# Integration for POST bulk bike import
+resource "aws_api_gateway_integration" "bikes_bulk_post_integration" {
+  rest_api_id = aws_api_gateway_rest_api.dalscooter_apis.id
+  resource_id = aws_api_gateway_resource.bikes_bulk.id
+  http_method = aws_api_gateway_method.bikes_bulk_post.http_method
+
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = var.bike_management_lambda_invoke_arn
+}
+
+# OPTIONS method for bulk bike import
+resource "aws_api_gateway_method" "bikes_bulk_options" {
+  rest_api_id   = aws_api_gateway_rest_api.dalscooter_apis.id
+  resource_id   = aws_api_gateway_resource.bikes_bulk.id
+  http_method   = "OPTIONS"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "bikes_bulk_options_integration" {
+  rest_api_id = aws_api_gateway_rest_api.dalscooter_apis.id
+  resource_id = aws_api_gateway_resource.bikes_bulk.id
+  http_method = aws_api_gateway_method.bikes_bulk_options.http_method
+  type        = "MOCK"
+
+  request_templates = {
+    "application/json" = "{\"statusCode\": 200}"
+  }
+}
+
+resource "aws_api_gateway_method_response" "bikes_bulk_options_response" {
+  rest_api_id = aws_api_gateway_rest_api.dalscooter_apis.id
+  resource_id = aws_api_gateway_resource.bikes_bulk.id
+  http_method = aws_api_gateway_method.bikes_bulk_options.http_method
+  status_code = "200"
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Headers" = true
+    "method.response.header.Access-Control-Allow-Methods" = true
+    "method.response.header.Access-Control-Allow-Origin"  = true
+  }
+}
+
+resource "aws_api_gateway_integration_response" "bikes_bulk_options_integration_response" {
+  rest_api_id = aws_api_gateway_rest_api.dalscooter_apis.id
+  resource_id = aws_api_gateway_resource.bikes_bulk.id
+  http_method = aws_api_gateway_method.bikes_bulk_options.http_method
+  status_code = aws_api_gateway_method_response.bikes_bulk_options_response.status_code
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token'"
+    "method.response.header.Access-Control-Allow-Methods" = "'POST,OPTIONS'"
+    "method.response.header.Access-Control-Allow-Origin"  = "'*'"
+  }
+
+  depends_on = [aws_api_gateway_integration.bikes_bulk_options_integration]
+}
+
 # ================================
 # BIKE AVAILABILITY ENDPOINTS (PUBLIC)
 # ================================
@@ -149,6 +251,7 @@ resource "aws_api_gateway_method" "bike_availability_get" {
   request_parameters = {
     "method.request.querystring.bikeType" = false
     "method.request.querystring.location" = false
+    "method.request.querystring.fields"   = false
   }
 }
 
@@ -165,9 +268,169 @@ resource "aws_api_gateway_integration" "bike_availability_integration" {
   request_parameters = {
     "integration.request.querystring.bikeType" = "method.request.querystring.bikeType"
     "integration.request.querystring.location" = "method.request.querystring.location"
+    "integration.request.querystring.fields"   = "method.request.querystring.fields"
+  }
+}
+
+# API Gateway Resource for nearby bike search (geohash index)
+resource "aws_api_gateway_resource" "bike_availability_nearby" {
+  rest_api_id = aws_api_gateway_rest_api.dalscooter_apis.id
+  parent_id   = aws_api_gateway_resource.bike_availability.id
+  path_part   = "nearby"
+}
+
+# GET method for nearby bikes (No authentication required)
+resource "aws_api_gateway_method" "bike_availability_nearby_get" {
+  rest_api_id   = aws_api_gateway_rest_api.dalscooter_apis.id
+  resource_id   = aws_api_gateway_resource.bike_availability_nearby.id
+  http_method   = "GET"
+  authorization = "NONE"
+
+  request_parameters = {
+    "method.request.querystring.latitude"  = true
+    "method.request.querystring.longitude" = true
+    "method.request.querystring.radiusKm"  = false
+    "method.request.querystring.limit"     = false
+    "method.request.querystring.fields"    = false
+  }
+}
+
+# Integration for GET nearby bikes
+resource "aws_api_gateway_integration" "bike_availability_nearby_integration" {
+  rest_api_id = aws_api_gateway_rest_api.dalscooter_apis.id
+  resource_id = aws_api_gateway_resource.bike_availability_nearby.id
+  http_method = aws_api_gateway_method.bike_availability_nearby_get.http_method
+
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = var.bike_availability_lambda_invoke_arn
+}
+
+# OPTIONS method for nearby bikes
+resource "aws_api_gateway_method" "bike_availability_nearby_options" {
+  rest_api_id   = aws_api_gateway_rest_api.dalscooter_apis.id
+  resource_id   = aws_api_gateway_resource.bike_availability_nearby.id
+  http_method   = "OPTIONS"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "bike_availability_nearby_options_integration" {
+  rest_api_id = aws_api_gateway_rest_api.dalscooter_apis.id
+  resource_id = aws_api_gateway_resource.bike_availability_nearby.id
+  http_method = aws_api_gateway_method.bike_availability_nearby_options.http_method
+  type        = "MOCK"
+
+  request_templates = {
+    "application/json" = "{\"statusCode\": 200}"
+  }
+}
+
+resource "aws_api_gateway_method_response" "bike_availability_nearby_options_response" {
+  rest_api_id = aws_api_gateway_rest_api.dalscooter_apis.id
+  resource_id = aws_api_gateway_resource.bike_availability_nearby.id
+  http_method = aws_api_gateway_method.bike_availability_nearby_options.http_method
+  status_code = "200"
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Headers" = true
+    "method.response.header.Access-Control-Allow-Methods" = true
+    "method.response.header.Access-Control-Allow-Origin"  = true
+  }
+}
+
+resource "aws_api_gateway_integration_response" "bike_availability_nearby_options_integration_response" {
+  rest_api_id = aws_api_gateway_rest_api.dalscooter_apis.id
+  resource_id = aws_api_gateway_resource.bike_availability_nearby.id
+  http_method = aws_api_gateway_method.bike_availability_nearby_options.http_method
+  status_code = aws_api_gateway_method_response.bike_availability_nearby_options_response.status_code
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token'"
+    "method.response.header.Access-Control-Allow-Methods" = "'GET,OPTIONS'"
+    "method.response.header.Access-Control-Allow-Origin"  = "'*'"
+  }
+
+  depends_on = [aws_api_gateway_integration.bike_availability_nearby_options_integration]
+}
+
+# API Gateway Resource for availability summary (materialized counters)
+resource "aws_api_gateway_resource" "bike_availability_summary" {
+  rest_api_id = aws_api_gateway_rest_api.dalscooter_apis.id
+  parent_id   = aws_api_gateway_resource.bike_availability.id
+  path_part   = "summary"
+}
+
+# GET method for availability summary (No authentication required)
+resource "aws_api_gateway_method" "bike_availability_summary_get" {
+  rest_api_id   = aws_api_gateway_rest_api.dalscooter_apis.id
+  resource_id   = aws_api_gateway_resource.bike_availability_summary.id
+  http_method   = "GET"
+  authorization = "NONE"
+
+  request_parameters = {
+    "method.request.querystring.franchiseId" = false
+    "method.request.querystring.bikeType"    = false
   }
 }
 
+# Integration for GET availability summary
+resource "aws_api_gateway_integration" "bike_availability_summary_integration" {
+  rest_api_id = aws_api_gateway_rest_api.dalscooter_apis.id
+  resource_id = aws_api_gateway_resource.bike_availability_summary.id
+  http_method = aws_api_gateway_method.bike_availability_summary_get.http_method
+
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = var.bike_availability_lambda_invoke_arn
+}
+
+# OPTIONS method for availability summary
+resource "aws_api_gateway_method" "bike_availability_summary_options" {
+  rest_api_id   = aws_api_gateway_rest_api.dalscooter_apis.id
+  resource_id   = aws_api_gateway_resource.bike_availability_summary.id
+  http_method   = "OPTIONS"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "bike_availability_summary_options_integration" {
+  rest_api_id = aws_api_gateway_rest_api.dalscooter_apis.id
+  resource_id = aws_api_gateway_resource.bike_availability_summary.id
+  http_method = aws_api_gateway_method.bike_availability_summary_options.http_method
+  type        = "MOCK"
+
+  request_templates = {
+    "application/json" = "{\"statusCode\": 200}"
+  }
+}
+
+resource "aws_api_gateway_method_response" "bike_availability_summary_options_response" {
+  rest_api_id = aws_api_gateway_rest_api.dalscooter_apis.id
+  resource_id = aws_api_gateway_resource.bike_availability_summary.id
+  http_method = aws_api_gateway_method.bike_availability_summary_options.http_method
+  status_code = "200"
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Headers" = true
+    "method.response.header.Access-Control-Allow-Methods" = true
+    "method.response.header.Access-Control-Allow-Origin"  = true
+  }
+}
+
+resource "aws_api_gateway_integration_response" "bike_availability_summary_options_integration_response" {
+  rest_api_id = aws_api_gateway_rest_api.dalscooter_apis.id
+  resource_id = aws_api_gateway_resource.bike_availability_summary.id
+  http_method = aws_api_gateway_method.bike_availability_summary_options.http_method
+  status_code = aws_api_gateway_method_response.bike_availability_summary_options_response.status_code
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token'"
+    "method.response.header.Access-Control-Allow-Methods" = "'GET,OPTIONS'"
+    "method.response.header.Access-Control-Allow-Origin"  = "'*'"
+  }
+
+  depends_on = [aws_api_gateway_integration.bike_availability_summary_options_integration]
+}
+
 # ================================
 # DISCOUNT CODE ENDPOINTS
 # ================================
@@ -290,6 +553,161 @@ resource "aws_api_gateway_integration" "discount_code_delete_integration" {
   }
 }
 
+# API Gateway Resource for bulk discount code campaigns
+resource "aws_api_gateway_resource" "discount_codes_campaign" {
+  rest_api_id = aws_api_gateway_rest_api.dalscooter_apis.id
+  parent_id   = aws_api_gateway_resource.discount_codes.id
+  path_part   = "campaign"
+}
+
+# POST method for creating a discount code campaign (Admin only)
+resource "aws_api_gateway_method" "discount_codes_campaign_post" {
+  rest_api_id   = aws_api_gateway_rest_api.dalscooter_apis.id
+  resource_id   = aws_api_gateway_resource.discount_codes_campaign.id
+  http_method   = "POST"
+  authorization = "CUSTOM"
+  authorizer_id = aws_api_gateway_authorizer.franchise_authorizer.id
+}
+
+# Integration for POST discount code campaign
+resource "aws_api_gateway_integration" "discount_codes_campaign_post_integration" {
+  rest_api_id = aws_api_gateway_rest_api.dalscooter_apis.id
+  resource_id = aws_api_gateway_resource.discount_codes_campaign.id
+  http_method = aws_api_gateway_method.discount_codes_campaign_post.http_method
+
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = var.discount_management_lambda_invoke_arn
+}
+
+# OPTIONS method for discount code campaigns
+resource "aws_api_gateway_method" "discount_codes_campaign_options" {
+  rest_api_id   = aws_api_gateway_rest_api.dalscooter_apis.id
+  resource_id   = aws_api_gateway_resource.discount_codes_campaign.id
+  http_method   = "OPTIONS"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "discount_codes_campaign_options_integration" {
+  rest_api_id = aws_api_gateway_rest_api.dalscooter_apis.id
+  resource_id = aws_api_gateway_resource.discount_codes_campaign.id
+  http_method = aws_api_gateway_method.discount_codes_campaign_options.http_method
+  type        = "MOCK"
+
+  request_templates = {
+    "application/json" = "{\"statusCode\": 200}"
+  }
+}
+
+resource "aws_api_gateway_method_response" "discount_codes_campaign_options_response" {
+  rest_api_id = aws_api_gateway_rest_api.dalscooter_apis.id
+  resource_id = aws_api_gateway_resource.discount_codes_campaign.id
+  http_method = aws_api_gateway_method.discount_codes_campaign_options.http_method
+  status_code = "200"
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Headers" = true
+    "method.response.header.Access-Control-Allow-Methods" = true
+    "method.response.header.Access-Control-Allow-Origin"  = true
+  }
+}
+
+resource "aws_api_gateway_integration_response" "discount_codes_campaign_options_integration_response" {
+  rest_api_id = aws_api_gateway_rest_api.dalscooter_apis.id
+  resource_id = aws_api_gateway_resource.discount_codes_campaign.id
+  http_method = aws_api_gateway_method.discount_codes_campaign_options.http_method
+  status_code = aws_api_gateway_method_response.discount_codes_campaign_options_response.status_code
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token'"
+    "method.response.header.Access-Control-Allow-Methods" = "'POST,OPTIONS'"
+    "method.response.header.Access-Control-Allow-Origin"  = "'*'"
+  }
+
+  depends_on = [aws_api_gateway_integration.discount_codes_campaign_options_integration]
+}
+
+# API Gateway Resource for discount usage reports
+resource "aws_api_gateway_resource" "discount_codes_report" {
+  rest_api_id = aws_api_gateway_rest_api.dalscooter_apis.id
+  parent_id   = aws_api_gateway_resource.discount_codes.id
+  path_part   = "report"
+}
+
+# GET method for discount usage analytics (Admin only)
+resource "aws_api_gateway_method" "discount_codes_report_get" {
+  rest_api_id   = aws_api_gateway_rest_api.dalscooter_apis.id
+  resource_id   = aws_api_gateway_resource.discount_codes_report.id
+  http_method   = "GET"
+  authorization = "CUSTOM"
+  authorizer_id = aws_api_gateway_authorizer.franchise_authorizer.id
+
+  request_parameters = {
+    "method.request.querystring.codeId" = true
+    "method.request.querystring.from"   = false
+    "method.request.querystring.to"     = false
+    "method.request.querystring.bucket" = false
+  }
+}
+
+# Integration for GET discount usage report
+resource "aws_api_gateway_integration" "discount_codes_report_get_integration" {
+  rest_api_id = aws_api_gateway_rest_api.dalscooter_apis.id
+  resource_id = aws_api_gateway_resource.discount_codes_report.id
+  http_method = aws_api_gateway_method.discount_codes_report_get.http_method
+
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = var.discount_management_lambda_invoke_arn
+}
+
+# OPTIONS method for discount usage reports
+resource "aws_api_gateway_method" "discount_codes_report_options" {
+  rest_api_id   = aws_api_gateway_rest_api.dalscooter_apis.id
+  resource_id   = aws_api_gateway_resource.discount_codes_report.id
+  http_method   = "OPTIONS"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "discount_codes_report_options_integration" {
+  rest_api_id = aws_api_gateway_rest_api.dalscooter_apis.id
+  resource_id = aws_api_gateway_resource.discount_codes_report.id
+  http_method = aws_api_gateway_method.discount_codes_report_options.http_method
+  type        = "MOCK"
+
+  request_templates = {
+    "application/json" = "{\"statusCode\": 200}"
+  }
+}
+
+resource "aws_api_gateway_method_response" "discount_codes_report_options_response" {
+  rest_api_id = aws_api_gateway_rest_api.dalscooter_apis.id
+  resource_id = aws_api_gateway_resource.discount_codes_report.id
+  http_method = aws_api_gateway_method.discount_codes_report_options.http_method
+  status_code = "200"
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Headers" = true
+    "method.response.header.Access-Control-Allow-Methods" = true
+    "method.response.header.Access-Control-Allow-Origin"  = true
+  }
+}
+
+resource "aws_api_gateway_integration_response" "discount_codes_report_options_integration_response" {
+  rest_api_id = aws_api_gateway_rest_api.dalscooter_apis.id
+  resource_id = aws_api_gateway_resource.discount_codes_report.id
+  http_method = aws_api_gateway_method.discount_codes_report_options.http_method
+  status_code = aws_api_gateway_method_response.discount_codes_report_options_response.status_code
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token'"
+    "method.response.header.Access-Control-Allow-Methods" = "'GET,OPTIONS'"
+    "method.response.header.Access-Control-Allow-Origin"  = "'*'"
+  }
+
+  depends_on = [aws_api_gateway_integration.discount_codes_report_options_integration]
+}
+
 # ================================
 # VERIFY DISCOUNT CODE ENDPOINT (PUBLIC)
 # ================================
@@ -335,6 +753,88 @@ resource "aws_api_gateway_integration" "verify_discount_integration" {
   }
 }
 
+# API Gateway Resource for redeeming a discount code
+resource "aws_api_gateway_resource" "verify_discount_redeem" {
+  rest_api_id = aws_api_gateway_rest_api.dalscooter_apis.id
+  parent_id   = aws_api_gateway_resource.verify_discount_by_code.id
+  path_part   = "redeem"
+}
+
+# POST method for discount redemption (Customer only)
+resource "aws_api_gateway_method" "verify_discount_redeem_post" {
+  rest_api_id   = aws_api_gateway_rest_api.dalscooter_apis.id
+  resource_id   = aws_api_gateway_resource.verify_discount_redeem.id
+  http_method   = "POST"
+  authorization = "CUSTOM"
+  authorizer_id = aws_api_gateway_authorizer.customer_authorizer.id
+
+  request_parameters = {
+    "method.request.path.code" = true
+  }
+}
+
+# Integration for POST discount redemption
+resource "aws_api_gateway_integration" "verify_discount_redeem_integration" {
+  rest_api_id = aws_api_gateway_rest_api.dalscooter_apis.id
+  resource_id = aws_api_gateway_resource.verify_discount_redeem.id
+  http_method = aws_api_gateway_method.verify_discount_redeem_post.http_method
+
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = var.verify_discount_lambda_invoke_arn
+
+  request_parameters = {
+    "integration.request.path.code" = "method.request.path.code"
+  }
+}
+
+# OPTIONS method for discount redemption
+resource "aws_api_gateway_method" "verify_discount_redeem_options" {
+  rest_api_id   = aws_api_gateway_rest_api.dalscooter_apis.id
+  resource_id   = aws_api_gateway_resource.verify_discount_redeem.id
+  http_method   = "OPTIONS"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "verify_discount_redeem_options_integration" {
+  rest_api_id = aws_api_gateway_rest_api.dalscooter_apis.id
+  resource_id = aws_api_gateway_resource.verify_discount_redeem.id
+  http_method = aws_api_gateway_method.verify_discount_redeem_options.http_method
+  type        = "MOCK"
+
+  request_templates = {
+    "application/json" = "{\"statusCode\": 200}"
+  }
+}
+
+resource "aws_api_gateway_method_response" "verify_discount_redeem_options_response" {
+  rest_api_id = aws_api_gateway_rest_api.dalscooter_apis.id
+  resource_id = aws_api_gateway_resource.verify_discount_redeem.id
+  http_method = aws_api_gateway_method.verify_discount_redeem_options.http_method
+  status_code = "200"
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Headers" = true
+    "method.response.header.Access-Control-Allow-Methods" = true
+    "method.response.header.Access-Control-Allow-Origin"  = true
+  }
+}
+
+resource "aws_api_gateway_integration_response" "verify_discount_redeem_options_integration_response" {
+  rest_api_id = aws_api_gateway_rest_api.dalscooter_apis.id
+  resource_id = aws_api_gateway_resource.verify_discount_redeem.id
+  http_method = aws_api_gateway_method.verify_discount_redeem_options.http_method
+  status_code = aws_api_gateway_method_response.verify_discount_redeem_options_response.status_code
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token'"
+    "method.response.header.Access-Control-Allow-Methods" = "'POST,OPTIONS'"
+    "method.response.header.Access-Control-Allow-Origin"  = "'*'"
+  }
+
+  depends_on = [aws_api_gateway_integration.verify_discount_redeem_options_integration]
+}
+
 # ================================
 # CORS SUPPORT
 # ================================
@@ -129,6 +129,10 @@ resource "aws_api_gateway_method" "my_bookings_get" {
 
   request_parameters = {
     "method.request.header.Authorization" = true
+    "method.request.querystring.userId"   = false
+    "method.request.querystring.limit"    = false
+    "method.request.querystring.cursor"   = false
+    "method.request.querystring.view"     = false
   }
 }
 
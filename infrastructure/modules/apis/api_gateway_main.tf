@@ -52,8 +52,22 @@ resource "aws_api_gateway_deployment" "registration_deployment" {
     aws_api_gateway_integration.bike_put_integration,
     aws_api_gateway_method.bike_delete,
     aws_api_gateway_integration.bike_delete_integration,
+    aws_api_gateway_method.bikes_delete,
+    aws_api_gateway_integration.bikes_delete_integration,
+    aws_api_gateway_method.bikes_bulk_post,
+    aws_api_gateway_integration.bikes_bulk_post_integration,
+    aws_api_gateway_method.bikes_bulk_options,
+    aws_api_gateway_integration.bikes_bulk_options_integration,
     aws_api_gateway_method.bike_availability_get,
     aws_api_gateway_integration.bike_availability_integration,
+    aws_api_gateway_method.bike_availability_nearby_get,
+    aws_api_gateway_integration.bike_availability_nearby_integration,
+    aws_api_gateway_method.bike_availability_nearby_options,
+    aws_api_gateway_integration.bike_availability_nearby_options_integration,
+    aws_api_gateway_method.bike_availability_summary_get,
+    aws_api_gateway_integration.bike_availability_summary_integration,
+    aws_api_gateway_method.bike_availability_summary_options,
+    aws_api_gateway_integration.bike_availability_summary_options_integration,
     aws_api_gateway_method.discount_codes_get,
     aws_api_gateway_integration.discount_codes_get_integration,
     aws_api_gateway_method.discount_codes_post,
@@ -62,6 +76,18 @@ resource "aws_api_gateway_deployment" "registration_deployment" {
     aws_api_gateway_integration.discount_code_put_integration,
     aws_api_gateway_method.discount_code_delete,
     aws_api_gateway_integration.discount_code_delete_integration,
+    aws_api_gateway_method.discount_codes_campaign_post,
+    aws_api_gateway_integration.discount_codes_campaign_post_integration,
+    aws_api_gateway_method.discount_codes_campaign_options,
+    aws_api_gateway_integration.discount_codes_campaign_options_integration,
+    aws_api_gateway_method.discount_codes_report_get,
+    aws_api_gateway_integration.discount_codes_report_get_integration,
+    aws_api_gateway_method.discount_codes_report_options,
+    aws_api_gateway_integration.discount_codes_report_options_integration,
+    aws_api_gateway_method.verify_discount_redeem_post,
+    aws_api_gateway_integration.verify_discount_redeem_integration,
+    aws_api_gateway_method.verify_discount_redeem_options,
+    aws_api_gateway_integration.verify_discount_redeem_options_integration,
     aws_api_gateway_method.bikes_options,
     aws_api_gateway_integration.bikes_options_integration,
     aws_api_gateway_method.bike_availability_options,
@@ -50,11 +50,14 @@ resource "aws_iam_role_policy" "bike_inventory_lambda_policy" {
           "dynamodb:UpdateItem",
           "dynamodb:DeleteItem",
           "dynamodb:Query",
-          "dynamodb:Scan"
+          "dynamodb:Scan",
+          "dynamodb:BatchGetItem",
+          "dynamodb:BatchWriteItem"
         ]
         Resource = [
           var.bikes_table_arn,
           "${var.bikes_table_arn}/index/*",
+          var.bike_counters_table_arn,
           var.discount_codes_table_arn,
           "${var.discount_codes_table_arn}/index/*",
           var.user_discount_usage_table_arn,
@@ -69,6 +72,21 @@ resource "aws_iam_role_policy" "bike_inventory_lambda_policy" {
           "cognito-idp:AdminListGroupsForUser"
         ]
         Resource = var.cognito_user_pool_arn
+      },
+      {
+        Effect = "Allow"
+        Action = [
+          "dynamodb:DescribeStream",
+          "dynamodb:GetRecords",
+          "dynamodb:GetShardIterator",
+          "dynamodb:ListStreams"
+        ]
+        Resource = var.bikes_table_stream_arn
+      },
+      {
+        Effect   = "Allow"
+        Action   = ["sqs:SendMessage"]
+        Resource = aws_sqs_queue.bike_availability_counters_failures.arn
       }
     ]
   })
@@ -157,6 +175,68 @@ resource "aws_cloudwatch_log_group" "discount_management_log_group" {
   retention_in_days = 14
 }
 
+# ================================
+# DISCOUNT EXPIRY SWEEPER LAMBDA (SCHEDULED)
+# ================================
+
+# Create a zip file for the Discount Expiry Sweeper Lambda function
+data "archive_file" "discount_expiry_sweeper_zip" {
+  type        = "zip"
+  source_file = "${path.module}/../../../backend/BikeInventory/discount_expiry_sweeper.py"
+  output_path = "${path.module}/../../packages/discount_expiry_sweeper.zip"
+  depends_on  = [local_file.create_bike_packages_dir]
+}
+
+# Discount Expiry Sweeper Lambda Function
+resource "aws_lambda_function" "discount_expiry_sweeper" {
+  filename         = data.archive_file.discount_expiry_sweeper_zip.output_path
+  function_name    = "dalscooter-discount-expiry-sweeper"
+  role             = aws_iam_role.bike_inventory_lambda_role.arn
+  handler          = "discount_expiry_sweeper.lambda_handler"
+  runtime          = "python3.9"
+  timeout          = 60
+  source_code_hash = data.archive_file.discount_expiry_sweeper_zip.output_base64sha256
+
+  environment {
+    variables = {
+      DISCOUNT_CODES_TABLE_NAME   = var.discount_codes_table_name
+      EXPIRY_SWEEP_LOOKBACK_HOURS = "72"
+    }
+  }
+
+  depends_on = [
+    aws_cloudwatch_log_group.discount_expiry_sweeper_log_group,
+  ]
+}
+
+# CloudWatch Log Group for Discount Expiry Sweeper Lambda
+resource "aws_cloudwatch_log_group" "discount_expiry_sweeper_log_group" {
+  name              = "/aws/lambda/dalscooter-discount-expiry-sweeper"
+  retention_in_days = 14
+}
+
+# EventBridge Rule - sweeps expired discount codes every 15 minutes
+resource "aws_cloudwatch_event_rule" "discount_expiry_sweeper_schedule" {
+  name                = "discount-expiry-sweeper-schedule"
+  schedule_expression = "rate(15 minutes)"
+}
+
+# Permission for EventBridge to invoke Lambda
+resource "aws_lambda_permission" "discount_expiry_sweeper_eventbridge" {
+  statement_id  = "AllowExecutionFromEventBridge"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.discount_expiry_sweeper.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.discount_expiry_sweeper_schedule.arn
+}
+
+# Attach Lambda to EventBridge Rule
+resource "aws_cloudwatch_event_target" "discount_expiry_sweeper_target" {
+  rule      = aws_cloudwatch_event_rule.discount_expiry_sweeper_schedule.name
+  target_id = "discount-expiry-sweeper-lambda"
+  arn       = aws_lambda_function.discount_expiry_sweeper.arn
+}
+
 # ================================
 # BIKE AVAILABILITY LAMBDA (PUBLIC)
 # ================================
@@ -181,7 +261,9 @@ resource "aws_lambda_function" "bike_availability" {
 
   environment {
     variables = {
-      BIKES_TABLE_NAME = var.bikes_table_name
+      BIKES_TABLE_NAME               = var.bikes_table_name
+      BIKE_COUNTERS_TABLE_NAME       = var.bike_counters_table_name
+      AVAILABILITY_CACHE_TTL_SECONDS = "30"
     }
   }
 
@@ -196,6 +278,76 @@ resource "aws_cloudwatch_log_group" "bike_availability_log_group" {
   retention_in_days = 14
 }
 
+# ================================
+# BIKE AVAILABILITY COUNTERS LAMBDA (STREAM)
+# ================================
+
+# Create a zip file for the Bike Availability Counters Lambda function
+data "archive_file" "bike_availability_counters_zip" {
+  type        = "zip"
+  source_file = "${path.module}/../../../backend/BikeInventory/bike_availability_counters.py"
+  output_path = "${path.module}/../../packages/bike_availability_counters.zip"
+  depends_on  = [local_file.create_bike_packages_dir]
+}
+
+# Bike Availability Counters Lambda Function (bikes table stream consumer)
+resource "aws_lambda_function" "bike_availability_counters" {
+  filename         = data.archive_file.bike_availability_counters_zip.output_path
+  function_name    = "dalscooter-bike-availability-counters"
+  role             = aws_iam_role.bike_inventory_lambda_role.arn
+  handler          = "bike_availability_counters.lambda_handler"
+  runtime          = "python3.9"
+  timeout          = 60
+  source_code_hash = data.archive_file.bike_availability_counters_zip.output_base64sha256
+
+  environment {
+    variables = {
+      BIKES_TABLE_NAME         = var.bikes_table_name
+      BIKE_COUNTERS_TABLE_NAME = var.bike_counters_table_name
+    }
+  }
+
+  depends_on = [
+    aws_iam_role_policy.bike_inventory_lambda_policy,
+    aws_cloudwatch_log_group.bike_availability_counters_log_group,
+  ]
+}
+
+# CloudWatch Log Group for Bike Availability Counters Lambda
+resource "aws_cloudwatch_log_group" "bike_availability_counters_log_group" {
+  name              = "/aws/lambda/dalscooter-bike-availability-counters"
+  retention_in_days = 14
+}
+
+# Records the counters Lambda gave up on (retries exhausted). Anything landing
+# here means the counters missed changes: invoke the Lambda with {"action": "rebuild"}
+resource "aws_sqs_queue" "bike_availability_counters_failures" {
+  name                      = "dalscooter-bike-availability-counters-failures"
+  message_retention_seconds = 1209600
+}
+
+# Event Source Mapping - bikes table stream to counters Lambda
+resource "aws_lambda_event_source_mapping" "bike_availability_counters_mapping" {
+  event_source_arn  = var.bikes_table_stream_arn
+  function_name     = aws_lambda_function.bike_availability_counters.arn
+  starting_position = "LATEST"
+  batch_size        = 100
+
+  # Retry from the first failed record only, split batches to isolate a poison
+  # record, and stop retrying it after a bounded number of attempts so the
+  # shard is not blocked until the records expire
+  function_response_types        = ["ReportBatchItemFailures"]
+  bisect_batch_on_function_error = true
+  maximum_retry_attempts         = 5
+  maximum_record_age_in_seconds  = 3600
+
+  destination_config {
+    on_failure {
+      destination_arn = aws_sqs_queue.bike_availability_counters_failures.arn
+    }
+  }
+}
+
 # ================================
 # VERIFY DISCOUNT CODE LAMBDA (PUBLIC)
 # ================================
@@ -221,7 +373,11 @@ resource "aws_lambda_function" "verify_discount" {
 
   environment {
     variables = {
-      DISCOUNT_CODES_TABLE_NAME = var.discount_codes_table_name
+      DISCOUNT_CODES_TABLE_NAME           = var.discount_codes_table_name
+      USER_DISCOUNT_USAGE_TABLE_NAME      = var.user_discount_usage_table_name
+      DISCOUNT_CACHE_TTL_SECONDS          = "60"
+      DISCOUNT_NEGATIVE_CACHE_TTL_SECONDS = "10"
+      DISCOUNT_FILTER_TTL_SECONDS         = "30"
     }
   }
 
@@ -45,7 +45,10 @@ resource "aws_iam_role_policy" "get_my_bookings_lambda_policy" {
           "dynamodb:Query",
           "dynamodb:GetItem"
         ]
-        Resource = var.booking_table_arn
+        Resource = [
+          var.booking_table_arn,
+          "${var.booking_table_arn}/index/*"
+        ]
       }
     ]
   })
@@ -67,12 +67,21 @@ resource "aws_iam_role_policy" "registration_lambda_policy" {
   })
 }
 
-# Create a zip file for the Lambda function from the Registration.py file
+# Create a zip file for the Lambda function from Registration.py and the shared email template engine
 data "archive_file" "user_registration_zip" {
   type        = "zip"
-  source_file = "${path.module}/../../../backend/User Management/Registration.py"
   output_path = "${path.module}/../../packages/user_registration.zip"
   depends_on  = [local_file.create_packages_dir]
+
+  source {
+    content  = file("${path.module}/../../../backend/User Management/Registration.py")
+    filename = "Registration.py"
+  }
+
+  source {
+    content  = file("${path.module}/../../../backend/Common/email_templates.py")
+    filename = "email_templates.py"
+  }
 }
 
 resource "aws_lambda_function" "user_registration" {
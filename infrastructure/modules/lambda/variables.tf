@@ -94,6 +94,21 @@ variable "bikes_table_arn" {
   type        = string
 }
 
+variable "bikes_table_stream_arn" {
+  description = "Stream ARN of the bikes DynamoDB table"
+  type        = string
+}
+
+variable "bike_counters_table_name" {
+  description = "Name of the bike availability counters DynamoDB table"
+  type        = string
+}
+
+variable "bike_counters_table_arn" {
+  description = "ARN of the bike availability counters DynamoDB table"
+  type        = string
+}
+
 variable "discount_codes_table_name" {
   description = "Name of the discount codes DynamoDB table"
   type        = string